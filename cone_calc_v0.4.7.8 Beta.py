@@ -1,7 +1,21 @@
 # === КОНФИГУРАЦИЯ И ИМПОРТЫ ===
 import os
+import sys
 os.environ['KIVY_NO_ARGS'] = '1'
 
+# Консольные режимы работают без окна: отключаем провайдер окна Kivy до импорта
+HEADLESS_COMMANDS = ('bench', 'batch', 'nest', 'drawing', 'toolpath', 'history', 'serve', 'loadtest', 'stress')
+HEADLESS = len(sys.argv) > 1 and sys.argv[1] in HEADLESS_COMMANDS
+if HEADLESS:
+    os.environ.setdefault('KIVY_WINDOW', '')
+    os.environ.setdefault('KIVY_DPI', '96')
+    os.environ.setdefault('KIVY_METRICS_DENSITY', '1')
+    os.environ.setdefault('KIVY_METRICS_FONTSCALE', '1')
+    os.environ.setdefault('KIVY_NO_CONSOLELOG', '1')
+    os.environ.setdefault('KIVY_LOG_MODE', 'MIXED')  # не перехватывать stderr
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
 from kivy.config import Config
 Config.set('graphics', 'multisamples', '0')
 Config.set('kivy', 'log_level', 'warning')
@@ -18,6 +32,8 @@ from kivy.uix.scrollview import ScrollView
 from kivy.uix.screenmanager import ScreenManager, Screen, FadeTransition
 from kivy.uix.popup import Popup
 from kivy.uix.progressbar import ProgressBar
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
 from kivy.metrics import dp, sp
 from kivy.clock import Clock
 from kivy.graphics import Color, RoundedRectangle, Rectangle
@@ -26,12 +42,54 @@ from kivy.storage.jsonstore import JsonStore
 from kivy.animation import Animation
 from kivy.core.window import Window
 from kivy.utils import get_color_from_hex
+import argparse
+import asyncio
+import atexit
+import base64
+import bisect
+import contextlib
+import csv
+import functools
+import hashlib
+import heapq
+import itertools
 import math
+import multiprocessing
+import platform
 import random
+import shutil
+import signal
+import sqlite3
+import tempfile
+import threading
+import time
+import tracemalloc
+import weakref
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import json
-import sys
 import traceback
+import zlib
+from array import array
+
+# PyGame подключается лениво в PyGameScene.load_pygame
+pygame = None
+PYGAME_AVAILABLE = False
+
+# PyArrow (Parquet в переносе истории) подключается лениво в HistoryTransfer.arrow
+pa = pq = None
+
+# NumPy опционален: без него пакетные расчеты идут по чистому Python
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+# Хранилище истории создается в ConeCalculator.build
+store = None
 
 # === КОНФИГУРАЦИЯ ПРИЛОЖЕНИЯ ===
 class AppConfig:
@@ -59,16 +117,124 @@ class AppConfig:
         'max_particles_small': 20,
         'max_particles_medium': 35,
         'max_particles_large': 50,
-        'texture_cache_size': 5
+        'texture_cache_budget_mb': 64,
+        'resize_debounce': 0.15,
+        'surface_headroom': 1.25,
+        'surface_bucket': 64,
+        'surface_shrink_ratio': 0.5,
+        'adaptive_render_scale': True,
+        'min_render_scale': 0.6,  # 24px подписи не мельче ~14px в исходнике
+        'render_scale_step': 0.1,
+        'render_time_budget': 0.008,
+        'render_scale_interval': 1.0,
+        'progress_update_interval': 1 / 30,
+        'preview_latency_budget': 0.016,  # пересчет при вводе укладывается в кадр
+        'hud_refresh_interval': 0.5,
+        'hud_frame_window': 120,
+        'io_workers': 1,            # фоновая запись файлов: на SD-карте параллельная запись не быстрее
+        'widget_pool_size': 24      # свободных виджетов одного вида в пуле (строк истории видно 20)
+    }
+    
+    # Очередь уведомлений
+    TOAST = {
+        'max_queue': 4,             # ждущих сообщений; при переполнении отбрасываются самые старые
+        'min_duration': 0.8,        # с - сообщение при непустой очереди не сменяется раньше
+        'swap_animation': True      # смена текста коротким миганием, если у toast нет другой анимации
+    }
+    
+    # Геометрия расчета
+    GEOMETRY = {
+        'slant_cut_model': 'approximate',  # approximate - прежняя формула; exact - сечение плоскостью
+                                           # через диаметр основания (другие длины и ключи кэша истории)
+        'k_factor': 0.5,             # положение нейтрального слоя в толщине листа (0 - внутри, 1 - снаружи)
+        'diameter_reference': 'outer'  # outer / inner / neutral - к чему относится заданный диаметр
+    }
+    
+    # Хранение истории
+    HISTORY = {
+        'backend': 'sqlite',        # sqlite - общий файл для нескольких окон и процессов, json - JsonStore
+        'json_file': 'cone_calculator_data.json',
+        'shared_file': 'cone_calculator_history.db',
+        'busy_timeout': 10.0,       # с - ожидание записи другого процесса, затем ошибка
+        'l_values_dtype': 'f8',     # f8 - без потерь, f4 - вдвое меньше (погрешность ~0.1 мкм на 1 м)
+        'l_values_delta': True,     # XOR соседних значений: у плавных кривых общие старшие биты
+        'l_values_compress': True,  # zlib поверх дельт
+        'write_behind': True,       # запись файла истории фоновым потоком, пачками
+        'flush_interval': 2.0,      # с - наибольшее окно потери записей при SIGKILL или сбое питания
+        'flush_batch': 50           # столько изменений сбрасываются, не дожидаясь flush_interval
     }
     
     # Ограничения данных
     LIMITS = {
         'max_history_items': 100,
-        'max_segments': 36,
+        'max_segments': 10000,      # высокое разрешение для раскроя на ЧПУ
+        'high_res_segments': 36,    # выше - векторный расчет и таблица вместо списка
         'min_segments': 8,
         'max_diameter': 10000,
-        'min_diameter': 1
+        'min_diameter': 1,
+        'min_slant_angle': 0.1,     # градусы; при 0 срез идет по основанию и развертка без материала
+        'max_thickness': 100,
+        'max_kerf': 20
+    }
+    
+    # Пакетная обработка заданий из файла
+    BATCH = {
+        'chunk_size': 256,         # заданий в одной пачке валидации и передаче в воркер
+        'window_per_worker': 16,   # чанков в полете на воркер (ограничивает память)
+        'report_interval': 2.0,    # секунд между отчетами о пропускной способности
+        'csv_precision': 3         # знаков после запятой в CSV-выводе
+    }
+    
+    # Локальный HTTP-сервис расчетов
+    SERVER = {
+        'host': '127.0.0.1',       # только локальные подключения по умолчанию
+        'port': 8765,
+        'max_concurrent': 16,      # одновременно обрабатываемых запросов
+        'queue_timeout': 2.0,      # ожидание свободного слота до ответа 503
+        'keepalive_timeout': 15.0,
+        'max_body_bytes': 4 * 1024 * 1024,
+        'max_batch_jobs': 10000,
+        'result_cache_size': 4096
+    }
+    
+    # Раскрой разверток на листах
+    NESTING = {
+        'sheet_width': 3000,       # стандартный лист 3000×1500 мм
+        'sheet_height': 1500,
+        'grid_step': 10.0,         # мм на ячейку растра: мельче - плотнее, но медленнее
+        'part_gap': 5.0,           # перемычка между деталями без общего реза, мм
+        'common_edge_parts': 4,    # деталей в веере с общим резом (--common-edge)
+        'rotation_step': 90,       # шаг перебора поворотов, градусы
+        'outline_points': 91,      # точек на дугу и линию среза контура детали
+        'time_budget': 10.0,       # секунд на перебор стратегий
+        'max_runs': 200
+    }
+    
+    # Векторный экспорт разверток (DXF/SVG)
+    EXPORT = {
+        'precision': 4,            # знаков после запятой в координатах, мм
+        'arc_points': 361,         # точек на дугу контура
+        'max_marking_lines': 360,  # линий разметки на деталь (остальные прореживаются)
+        'part_spacing': 20.0,      # зазор между деталями и листами на чертеже, мм
+        'row_width': 3000.0        # ширина ряда при раскладке нескольких деталей
+    }
+    
+    # Траектории реза и G-код
+    TOOLPATH = {
+        'lead_in': 5.0,            # подвод от точки прокола до контура, мм (со стороны отхода)
+        'lead_out': 2.0,           # отвод после замыкания контура, мм
+        'direction': 'cw',         # обход наружных контуров: по часовой стрелке
+        'cut_feed': 2000.0,        # подача резки, мм/мин
+        'mark_feed': 6000.0,       # подача разметки, мм/мин
+        'rapid_feed': 15000.0,     # холостой ход для оценки времени, мм/мин
+        'pierce_dwell': 0.5,       # выдержка на прокол, с
+        'tool_on': 'M03',
+        'tool_off': 'M05',
+        'mark_on': 'M07',          # коды инструмента разметки зависят от стойки
+        'mark_off': 'M09',
+        'precision': 3,
+        'shared_tolerance': 0.01,  # отклонение ребра от общего реза, при котором он считается общим, мм
+        'time_budget': 5.0         # секунд на оптимизацию порядка резки
     }
 
 # === УЛУЧШЕННАЯ СИСТЕМА ЛОГИРОВАНИЯ ===
@@ -140,6 +306,59 @@ class ErrorLogger:
 # Инициализация логгера
 error_logger = ErrorLogger()
 
+# === МОНИТОР ПРОИЗВОДИТЕЛЬНОСТИ ===
+class PerformanceMonitor:
+    """Сбор живых метрик производительности для HUD"""
+    _instance = None
+    
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(PerformanceMonitor, cls).__new__(cls)
+            cls._instance._setup()
+        return cls._instance
+    
+    def _setup(self):
+        """Инициализация скользящих окон метрик"""
+        window = AppConfig.PERFORMANCE['hud_frame_window']
+        self._render_times = deque(maxlen=window)
+        self._frame_intervals = deque(maxlen=window)
+        self._last_frame_time = None
+        self._latencies = {}
+    
+    def record_frame(self, render_time):
+        """Регистрация отрисованного кадра (время рендера в секундах)"""
+        now = time.perf_counter()
+        if self._last_frame_time is not None:
+            interval = now - self._last_frame_time
+            # Паузы простоя рендер-цикла не считаем просадкой FPS
+            if interval < 1.0:
+                self._frame_intervals.append(interval)
+        self._last_frame_time = now
+        self._render_times.append(render_time)
+    
+    def get_frame_time(self):
+        """Среднее время рендера кадра в секундах"""
+        if not self._render_times:
+            return None
+        return sum(self._render_times) / len(self._render_times)
+    
+    def get_fps(self):
+        """Фактический FPS по интервалам между кадрами"""
+        if not self._frame_intervals:
+            return None
+        average = sum(self._frame_intervals) / len(self._frame_intervals)
+        return 1.0 / average if average > 0 else None
+    
+    def record_latency(self, name, seconds):
+        """Запись длительности последней операции"""
+        self._latencies[name] = seconds
+    
+    def get_latency(self, name):
+        """Длительность последней операции в секундах"""
+        return self._latencies.get(name)
+
+performance_monitor = PerformanceMonitor()
+
 # === АДАПТИВНЫЕ МЕТРИКИ ПРОФЕССИОНАЛЬНОГО УРОВНЯ ===
 class AdaptiveMetrics:
     """Умная система адаптации под разные экраны"""
@@ -151,6 +370,10 @@ class AdaptiveMetrics:
     def get_screen_profile():
         """Детальный профиль экрана для точной адаптации"""
         try:
+            if Window is None:
+                # Консольный режим без окна
+                return {"name": "large", "scale_factor": 1.0, "base_font_size": 16}
+            
             width, height = Window.size
             diagonal = math.sqrt(width**2 + height**2) / 96  # Диагональ в дюймах
             
@@ -209,28 +432,125 @@ class AdaptiveMetrics:
         """Идеальная высота кнопок для touch-интерфейса"""
         return AdaptiveMetrics.adaptive_dp(50)
 
+# === ОБЩИЙ КЭШ ТЕКСТУР И ПОВЕРХНОСТЕЙ ===
+class TextureCache:
+    """Единый на процесс LRU-кэш текстур Kivy и поверхностей PyGame с бюджетом памяти
+    
+    Ключ - содержимое (вид, имя, размер), поэтому рендереры с одинаковыми ресурсами
+    используют один объект. Пользователи учитываются счетчиком ссылок (retain/release):
+    ресурс без пользователей освобождается сразу.
+    """
+    _instance = None
+    
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(TextureCache, cls).__new__(cls)
+            cls._instance._setup()
+        return cls._instance
+    
+    def _setup(self):
+        """Инициализация кэша и счетчиков"""
+        self._entries = OrderedDict()  # key -> (ресурс, байты)
+        self._refs = Counter()         # key -> число пользователей
+        self.budget_bytes = AppConfig.PERFORMANCE['texture_cache_budget_mb'] * 1024 * 1024
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, key, factory, nbytes):
+        """Ресурс из кэша или созданный фабрикой (с вытеснением давно не используемых)"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+        
+        self.misses += 1
+        resource = factory()
+        self._entries[key] = (resource, nbytes)
+        self.used_bytes += nbytes
+        self._evict()
+        return resource
+    
+    def _evict(self):
+        """Вытеснение LRU-записей сверх бюджета (последняя запись остается всегда)"""
+        while self.used_bytes > self.budget_bytes and len(self._entries) > 1:
+            key, (resource, nbytes) = self._entries.popitem(last=False)
+            self.used_bytes -= nbytes
+            self.evictions += 1
+            error_logger.log_event(f"Texture cache evicted {key} ({nbytes // 1024} KB)")
+    
+    def discard(self, key):
+        """Удаление одной записи"""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.used_bytes -= entry[1]
+    
+    def retain(self, key):
+        """Новый пользователь ресурса key (вытесненный ресурс get создаст заново)"""
+        self._refs[key] += 1
+    
+    def release(self, key):
+        """Пользователь больше не нужен ресурс; последний освобождает его"""
+        if self._refs[key] > 1:
+            self._refs[key] -= 1
+            return
+        del self._refs[key]
+        self.discard(key)
+    
+    def stats(self):
+        """Метрики заполненности и эффективности кэша"""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'shared': sum(1 for count in self._refs.values() if count > 1),
+            'used_bytes': self.used_bytes,
+            'budget_bytes': self.budget_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else None
+        }
+
+texture_cache = TextureCache()
+
 # === УМНАЯ СИСТЕМА РЕНДЕРИНГА KIVY + PYGAME ===
 class UnifiedRenderer:
     """Объединяет Kivy и PyGame в единую систему рендеринга"""
     
     def __init__(self):
-        self._kivy_textures = {}
-        self._pygame_surfaces = {}
+        self._active_keys = {}  # (тип, имя) -> ключ удерживаемого ресурса в общем кэше
         self._current_fps = AppConfig.PERFORMANCE['fps_active']
         self._is_animating = False
         self._frame_count = 0
-        
+    
+    def _get_cached(self, kind, name, size, factory):
+        """Ресурс из общего кэша; при смене размера прежний ресурс отпускается"""
+        key = (kind, name, size[0], size[1])
+        previous_key = self._active_keys.get((kind, name))
+        if previous_key != key:
+            if previous_key is not None:
+                texture_cache.release(previous_key)
+            texture_cache.retain(key)
+            self._active_keys[(kind, name)] = key
+        return texture_cache.get(key, factory, size[0] * size[1] * 4)
+    
     def get_kivy_texture(self, name, size):
         """Кэширование Kivy текстур"""
-        key = f"{name}_{size[0]}_{size[1]}"
-        if key not in self._kivy_textures:
-            texture = Texture.create(size=size)
-            self._kivy_textures[key] = texture
-            # Ограничение размера кэша
-            if len(self._kivy_textures) > AppConfig.PERFORMANCE['texture_cache_size']:
-                oldest_key = next(iter(self._kivy_textures))
-                del self._kivy_textures[oldest_key]
-        return self._kivy_textures[key]
+        return self._get_cached('texture', name, size, lambda: Texture.create(size=size))
+    
+    def get_pygame_surface(self, name, size):
+        """Кэширование поверхностей PyGame"""
+        return self._get_cached('surface', name, size, lambda: pygame.Surface(size, pygame.SRCALPHA))
+    
+    def release_resources(self):
+        """Отпуск всех текстур и поверхностей этого рендерера"""
+        keys = list(self._active_keys.values())
+        self._active_keys.clear()
+        for key in keys:
+            texture_cache.release(key)
+        return len(keys)
     
     def optimize_fps(self, is_user_active=True, has_animations=False):
         """Автоматическая оптимизация FPS"""
@@ -257,6 +577,7 @@ class ProfessionalScreen(Screen):
         self._renderer = UnifiedRenderer()
         self._keyboard = None
         self._is_active = False
+        self._performance_hud = None
         
         # Единая система анимаций
         self._animations = {}
@@ -291,6 +612,7 @@ class ProfessionalScreen(Screen):
                 'escape': self.on_back_press,
                 'enter': self._trigger_calculation,
                 'f1': self.show_help,
+                'f3': self.toggle_performance_hud,
                 's': self._trigger_export if 'ctrl' in modifiers else None
             }
             
@@ -320,10 +642,63 @@ class ProfessionalScreen(Screen):
         if hasattr(self, 'export_calculation'):
             self.export_calculation(None)
     
+    def on_back_press(self, *args):
+        """Возврат к калькулятору"""
+        if self.manager and self.manager.current != 'calculator':
+            self.manager.current = 'calculator'
+    
+    def show_help(self, *args):
+        """Краткая справка по горячим клавишам"""
+        self.show_toast(
+            "Enter - расчет • Esc - назад • Ctrl+S - экспорт • F3 - монитор",
+            4.0, "info"
+        )
+    
+    def toggle_performance_hud(self, *args):
+        """Показ/скрытие оверлея производительности"""
+        if self._performance_hud:
+            self._performance_hud.hide()
+            self._performance_hud = None
+        else:
+            self._performance_hud = PerformanceHUD(self)
+            self._performance_hud.show()
+    
+    def get_performance_metrics(self):
+        """Снимок метрик экрана для HUD"""
+        metrics = {
+            'frame_time': performance_monitor.get_frame_time(),
+            'fps': performance_monitor.get_fps(),
+            'target_fps': self._renderer._current_fps,
+            'particles': None,
+            'performance_level': None,
+            'texture_cache': texture_cache.stats(),
+            'calculation_latency': performance_monitor.get_latency('calculation'),
+            'history_write_latency': performance_monitor.get_latency('history_write'),
+            'history_pending': store.stats()['pending'] if store is not None else None,
+            'render_scale': None
+        }
+        
+        scene = getattr(self, 'renderer', None)
+        if scene is not None:
+            metrics['render_scale'] = scene._render_scale
+            particle_system = getattr(scene, '_particle_system', None)
+            if particle_system is not None:
+                metrics['particles'] = len(particle_system.particles)
+                metrics['performance_level'] = particle_system._performance_level
+        
+        return metrics
+    
     def on_enter(self):
         """При активации экрана"""
         self._is_active = True
         self._renderer.optimize_fps(is_user_active=True, has_animations=True)
+        
+        scene = getattr(self, 'renderer', None)
+        if scene is not None:
+            scene.resume_rendering()
+        
+        if self._performance_hud:
+            self._performance_hud.show()
     
     def on_leave(self):
         """При деактивации экрана"""
@@ -333,6 +708,15 @@ class ProfessionalScreen(Screen):
         # Останавливаем анимации для экономии ресурсов
         for anim in self._animations.values():
             anim.cancel(self)
+        
+        # Явно освобождаем текстуры и поверхности экрана в общем кэше
+        self._renderer.release_resources()
+        scene = getattr(self, 'renderer', None)
+        if scene is not None:
+            scene.release_resources()
+        
+        if self._performance_hud:
+            self._performance_hud.hide()
     
     def create_professional_button(self, text, color_name, on_press=None, size_hint=(1, None)):
         """Создание кнопки профессионального уровня"""
@@ -361,21 +745,89 @@ class ProfessionalScreen(Screen):
                 "error": (0.8, 0.3, 0.3, 0.95)
             }.get(message_type, (0.2, 0.5, 0.8, 0.95))
             
-            toast = Toast(
-                text=message,
-                background_color=toast_color,
-                duration=duration
-            )
-            
-            toast.show(self)
-            return toast
+            return toast_manager.show(self, message, toast_color, duration)
             
         except Exception as e:
             error_logger.log_error(e, "ProfessionalScreen.show_toast")
+    
+    def show_progress(self, text, on_cancel=None):
+        """Показ оверлея прогресса"""
+        self.hide_progress()
+        self._progress_overlay = ProgressOverlay(text=text, on_cancel=on_cancel)
+        self.add_widget(self._progress_overlay)
+        return self._progress_overlay
+    
+    def hide_progress(self):
+        """Скрытие оверлея прогресса"""
+        overlay = getattr(self, '_progress_overlay', None)
+        if overlay is not None and overlay.parent:
+            overlay.parent.remove_widget(overlay)
+        self._progress_overlay = None
+    
+    def track_progress(self, text, total=None):
+        """Оверлей с кнопкой отмены и ProgressReporter к нему для операции в фоне
+        
+        Оверлей скрывает вызывающий (hide_progress), когда операция завершится.
+        """
+        token = CancellationToken()
+        overlay = self.show_progress(text, on_cancel=token.cancel)
+        
+        def show(value, message):
+            if overlay.parent is not None and not token.cancelled:
+                overlay.set_progress(reporter.fraction * overlay.progress_bar.max, message)
+        
+        reporter = ProgressReporter(show, total, token=token)
+        return reporter
+
+# === ПУЛ ВИДЖЕТОВ ===
+class WidgetPool:
+    """Повторное использование однотипных виджетов: при показе перепривязываются
+    данные, а дерево виджетов и инструкции canvas не строятся заново"""
+    _instance = None
+    
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(WidgetPool, cls).__new__(cls)
+            cls._instance._free = {}
+            cls._instance._counters = {}
+        return cls._instance
+    
+    def _count(self, kind, counter):
+        counters = self._counters.setdefault(kind, {'created': 0, 'reused': 0, 'released': 0})
+        counters[counter] += 1
+    
+    def acquire(self, kind, factory):
+        """Свободный виджет вида kind или новый из factory()"""
+        free = self._free.get(kind)
+        if free:
+            self._count(kind, 'reused')
+            return free.pop()
+        self._count(kind, 'created')
+        return factory()
+    
+    def release(self, kind, widget):
+        """Возврат отсоединенного виджета; сверх widget_pool_size он отдается сборщику мусора"""
+        free = self._free.setdefault(kind, [])
+        if widget.parent is None and widget not in free and len(free) < AppConfig.PERFORMANCE['widget_pool_size']:
+            free.append(widget)
+            self._count(kind, 'released')
+    
+    def created(self, kind):
+        """Сколько виджетов вида kind построено с нуля"""
+        return self._counters.get(kind, {}).get('created', 0)
+    
+    def stats(self):
+        """Счетчики по видам виджетов"""
+        return {kind: dict(counters, free=len(self._free.get(kind, ()))) for kind, counters in self._counters.items()}
+
+widget_pool = WidgetPool()
 
 # === УЛУЧШЕННЫЙ КОМПОНЕНТ TOAST ===
 class Toast(FloatLayout):
-    """Профессиональные уведомления с физикой"""
+    """Профессиональные уведомления с физикой
+    
+    Скрытый toast возвращается в widget_pool и показывается снова через bind_message.
+    """
     
     def __init__(self, text="", background_color=None, duration=2.0, **kwargs):
         super().__init__(**kwargs)
@@ -384,9 +836,10 @@ class Toast(FloatLayout):
         self.size = (AdaptiveMetrics.adaptive_dp(300), AdaptiveMetrics.adaptive_dp(50))
         self.pos_hint = {'center_x': 0.5, 'top': 0.95}
         self.duration = duration
+        self._dismiss_event = None
         
         with self.canvas.before:
-            Color(*background_color if background_color else AppConfig.COLORS['primary'])
+            self.color = Color(*background_color if background_color else AppConfig.COLORS['primary'])
             self.rect = RoundedRectangle(
                 pos=self.pos, 
                 size=self.size,
@@ -413,8 +866,23 @@ class Toast(FloatLayout):
         self.label.size = self.size
         self.label.text_size = (self.size[0] - AdaptiveMetrics.adaptive_dp(20), self.size[1])
     
-    def show(self, parent):
-        """Показ с физической анимацией"""
+    def bind_message(self, text, background_color=None, duration=2.0):
+        """Новые текст, цвет и длительность; исходное состояние как у только что созданного"""
+        Animation.cancel_all(self)
+        if self._dismiss_event is not None:
+            self._dismiss_event.cancel()
+            self._dismiss_event = None
+        self.label.text = text
+        self.color.rgba = background_color if background_color else AppConfig.COLORS['primary']
+        self.duration = duration
+        self.opacity = 1
+        self.pos = (0, 0)
+    
+    def show(self, parent, auto_dismiss=True):
+        """Показ с физической анимацией; возвращает запущенную Animation
+        
+        auto_dismiss=False - скрытием по времени управляет вызывающий (ToastManager).
+        """
         parent.add_widget(self)
         
         # Анимация с физикой (пружина)
@@ -437,18 +905,507 @@ class Toast(FloatLayout):
         anim.start(self)
         
         # Автоматическое скрытие
-        Clock.schedule_once(lambda dt: self.dismiss(), self.duration)
+        if auto_dismiss:
+            self._dismiss_event = Clock.schedule_once(lambda dt: self.dismiss(), self.duration)
+        return anim
     
-    def dismiss(self):
-        """Плавное скрытие"""
+    def dismiss(self, on_complete=None):
+        """Плавное скрытие; по окончании on_complete() вместо возврата в пул"""
+        self._dismiss_event = None
         anim = Animation(
             center_y=self.center_y + 100,
             opacity=0,
             duration=0.3,
             transition='in_back'
         )
-        anim.bind(on_complete=lambda *args: self.parent.remove_widget(self) if self.parent else None)
+        anim.bind(on_complete=lambda *args: on_complete() if on_complete else self.recycle())
         anim.start(self)
+        return anim
+    
+    def recycle(self):
+        """Снятие с экрана и возврат в пул"""
+        if self.parent:
+            self.parent.remove_widget(self)
+        widget_pool.release('toast', self)
+
+class ToastManager:
+    """Очередь уведомлений на одном виджете Toast
+    
+    Сообщение, совпадающее с показанным, только продлевает его показ, а совпадающее
+    с ждущим в очереди не добавляется. Пока очередь не пуста, текущее сообщение
+    держится min_duration и сменяется следующим без анимации появления и скрытия.
+    На экране не больше одного toast и не больше одной его анимации, поэтому при
+    потоке сообщений стоимость анимаций не растет.
+    """
+    _instance = None
+    
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(ToastManager, cls).__new__(cls)
+            cls._instance._setup()
+        return cls._instance
+    
+    def _setup(self):
+        self._queue = deque()
+        self._toast = None
+        self._current = None      # (parent, message, color, duration) на экране
+        self._hiding = False      # идет анимация скрытия
+        self._animating = False
+        self._shown_at = 0.0
+        self._deadline = 0.0
+        self._timeout = None
+        self.counters = {'requested': 0, 'shown': 0, 'coalesced': 0, 'dropped': 0, 'animations': 0}
+    
+    def _widget(self):
+        if self._toast is None:
+            self._toast = widget_pool.acquire('toast', Toast)
+        return self._toast
+    
+    def show(self, parent, message, background_color=None, duration=2.0):
+        """Постановка сообщения в очередь; возвращает единственный виджет toast"""
+        self.counters['requested'] += 1
+        color = tuple(background_color if background_color else AppConfig.COLORS['primary'])
+        request = (parent, message, color, duration)
+        
+        if self._current is not None and self._current[:3] == request[:3]:
+            # Повтор показанного сообщения: продлеваем, если за ним никто не ждет
+            self.counters['coalesced'] += 1
+            if not self._queue:
+                self._schedule(duration)
+            return self._widget()
+        if any(queued[:3] == request[:3] for queued in self._queue):
+            self.counters['coalesced'] += 1
+            return self._widget()
+        
+        if len(self._queue) >= AppConfig.TOAST['max_queue']:
+            self._queue.popleft()
+            self.counters['dropped'] += 1
+        self._queue.append(request)
+        
+        if self._current is None:
+            if not self._hiding:
+                self._show_next()
+        else:
+            self._hurry()
+        return self._widget()
+    
+    def _schedule(self, delay):
+        if self._timeout is not None:
+            self._timeout.cancel()
+        self._deadline = time.monotonic() + delay
+        self._timeout = Clock.schedule_once(lambda dt: self._on_timeout(), delay)
+    
+    def _hurry(self):
+        """Текущее сообщение уступает очереди по истечении min_duration"""
+        deadline = self._shown_at + AppConfig.TOAST['min_duration']
+        if deadline < self._deadline:
+            self._schedule(max(0.0, deadline - time.monotonic()))
+    
+    def _track(self, anim):
+        """Учет единственной анимации toast: новая не запускается, пока идет эта
+        
+        Флаг сбрасывают завершение анимации и ее прерывание (_cancel). Kivy 2.x
+        при cancel/cancel_all событий не рассылает, поэтому on_cancel
+        подписывается, только если Animation его объявляет.
+        """
+        self.counters['animations'] += 1
+        self._animating = True
+        anim.bind(on_complete=self._on_animation_end)
+        if 'on_cancel' in getattr(Animation, '__events__', ()):
+            anim.bind(on_cancel=self._on_animation_end)
+    
+    def _on_animation_end(self, *args):
+        self._animating = False
+    
+    def _cancel(self, toast):
+        """Прерывание анимаций toast: on_complete после этого не придет"""
+        Animation.cancel_all(toast)
+        self._animating = False
+    
+    def _show_next(self):
+        request = self._queue.popleft()
+        parent, message, color, duration = request
+        toast = self._widget()
+        
+        if self._current is not None and toast.parent is parent:
+            # Смена текста на уже показанном toast
+            toast.label.text = message
+            toast.color.rgba = color
+            toast.duration = duration
+            if AppConfig.TOAST['swap_animation'] and not self._animating:
+                pulse = Animation(opacity=0.5, duration=0.08) + Animation(opacity=1, duration=0.08)
+                self._track(pulse)
+                pulse.start(toast)
+        else:
+            if toast.parent is not None:
+                toast.parent.remove_widget(toast)
+            self._cancel(toast)
+            toast.bind_message(message, color, duration)
+            self._track(toast.show(parent, auto_dismiss=False))
+        
+        self.counters['shown'] += 1
+        self._current = request
+        self._shown_at = time.monotonic()
+        self._schedule(AppConfig.TOAST['min_duration'] if self._queue else duration)
+    
+    def _on_timeout(self):
+        self._timeout = None
+        if self._queue:
+            self._show_next()
+            return
+        self._current = None
+        self._hiding = True
+        toast = self._widget()
+        self._cancel(toast)
+        self._track(toast.dismiss(on_complete=self._on_hidden))
+    
+    def _on_hidden(self):
+        """Скрытие закончено: снимаем с экрана, виджет остается у менеджера"""
+        self._hiding = False
+        toast = self._widget()
+        if toast.parent is not None:
+            toast.parent.remove_widget(toast)
+        if self._queue:
+            self._show_next()
+    
+    def stats(self):
+        """Счетчики и длина очереди"""
+        return dict(self.counters, queued=len(self._queue))
+
+toast_manager = ToastManager()
+
+# === ОТЧЕТ О ХОДЕ ОПЕРАЦИЙ ===
+class OperationCancelled(Exception):
+    """Длительная операция прервана через CancellationToken"""
+
+class CancellationToken:
+    """Флаг отмены длительной операции; выставляется из любого потока"""
+    
+    def __init__(self):
+        self._event = threading.Event()
+    
+    def cancel(self):
+        self._event.set()
+    
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+    
+    def check(self):
+        """OperationCancelled, если операция отменена"""
+        if self._event.is_set():
+            raise OperationCancelled()
+
+class ProgressReporter:
+    """Ход длительной операции для любого потока
+    
+    update() только запоминает значение под блокировкой, поэтому вызывать его можно
+    на каждом шаге работы. callback(value, text) получает последнее значение не чаще
+    interval (по умолчанию - период кадра): в UI-потоке через Clock или, при
+    ui_thread=False (консоль), прямо в вызвавшем потоке.
+    """
+    
+    def __init__(self, callback, total=None, interval=None, token=None, ui_thread=True):
+        self.callback = callback
+        self.total = total
+        self.interval = AppConfig.PERFORMANCE['progress_update_interval'] if interval is None else interval
+        self.token = token or CancellationToken()
+        self.ui_thread = ui_thread
+        self.value = 0
+        self.text = None
+        self.updates = 0
+        self.delivered = 0
+        self.started = time.perf_counter()
+        self._last = self.started
+        self._scheduled = False
+        self._lock = threading.Lock()
+    
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+    
+    @property
+    def fraction(self):
+        """Доля выполненного (0 без total)"""
+        return min(1.0, self.value / self.total) if self.total else 0.0
+    
+    @property
+    def cancelled(self):
+        return self.token.cancelled
+    
+    def cancel(self):
+        self.token.cancel()
+    
+    def update(self, value, text=None):
+        """Новое значение хода; False - операция отменена и ее пора остановить"""
+        if self.token.cancelled:
+            return False
+        with self._lock:
+            self.value = value
+            if text is not None:
+                self.text = text
+            self.updates += 1
+            if self._scheduled:
+                # Доставка уже запланирована и возьмет это значение
+                return True
+            now = time.perf_counter()
+            delay = self._last + self.interval - now
+            if self.ui_thread:
+                self._scheduled = True
+            elif delay > 0:
+                return True
+            else:
+                self._last = now
+        if self.ui_thread:
+            Clock.schedule_once(self._deliver, max(0.0, delay))
+        else:
+            self._deliver()
+        return True
+    
+    def _deliver(self, *args):
+        with self._lock:
+            self._scheduled = False
+            self._last = time.perf_counter()
+            value, text = self.value, self.text
+            self.delivered += 1
+        try:
+            self.callback(value, text)
+        except Exception as e:
+            error_logger.log_error(e, "ProgressReporter._deliver")
+
+# === ОВЕРЛЕЙ ПРОГРЕССА ===
+class ProgressOverlay(FloatLayout):
+    """Затемняющий оверлей с прогресс-баром для длительных операций
+    
+    on_cancel - добавляет кнопку отмены (обычно CancellationToken.cancel).
+    """
+    
+    def __init__(self, text="", on_cancel=None, **kwargs):
+        super().__init__(**kwargs)
+        
+        with self.canvas.before:
+            Color(0, 0, 0, 0.6)
+            self.rect = Rectangle(pos=self.pos, size=self.size)
+        
+        box = BoxLayout(
+            orientation='vertical',
+            size_hint=(0.7, None),
+            height=AdaptiveMetrics.adaptive_dp(90),
+            spacing=AdaptiveMetrics.adaptive_dp(10),
+            pos_hint={'center_x': 0.5, 'center_y': 0.5}
+        )
+        
+        self.label = Label(
+            text=text,
+            color=AppConfig.COLORS['light'],
+            font_size=AdaptiveMetrics.adaptive_sp(16)
+        )
+        self.progress_bar = ProgressBar(max=100, value=0)
+        self._last_update = 0.0
+        
+        box.add_widget(self.label)
+        box.add_widget(self.progress_bar)
+        
+        self.cancel_button = None
+        if on_cancel is not None:
+            self.cancel_button = AnimatedButton(
+                text='ОТМЕНА',
+                size_hint_y=None,
+                height=AdaptiveMetrics.get_button_height(),
+                background_color=AppConfig.COLORS['secondary'],
+                background_normal='',
+                font_size=AdaptiveMetrics.adaptive_sp(16),
+                bold=True
+            )
+            self.cancel_button.bind(on_press=lambda *args: self._cancel(on_cancel))
+            box.height += self.cancel_button.height + box.spacing
+            box.add_widget(self.cancel_button)
+        
+        self.add_widget(box)
+        self.bind(pos=self._update_rect, size=self._update_rect)
+    
+    def _update_rect(self, *args):
+        self.rect.pos = self.pos
+        self.rect.size = self.size
+    
+    def _cancel(self, on_cancel):
+        on_cancel()
+        self.cancel_button.disabled = True
+        self.label.text = "Отмена..."
+    
+    def update_progress(self, value, text=None):
+        """Обновление значения и подписи прогресса (не чаще интервала из конфигурации)"""
+        now = time.perf_counter()
+        if value < self.progress_bar.max and now - self._last_update < AppConfig.PERFORMANCE['progress_update_interval']:
+            return
+        self._last_update = now
+        self.set_progress(value, text)
+    
+    def set_progress(self, value, text=None):
+        """Значение и подпись без ограничения частоты (его обеспечивает ProgressReporter)"""
+        self.progress_bar.value = value
+        if text:
+            self.label.text = text
+
+# === ВИРТУАЛИЗИРОВАННАЯ ТАБЛИЦА ТОЧЕК ===
+class PointsTablePopup(Popup):
+    """Таблица длин разметки: RecycleView создает виджеты только для видимых строк"""
+    
+    def __init__(self, calculation, **kwargs):
+        super().__init__(**kwargs)
+        L_values = calculation['L_values']
+        
+        self.title = f"Точки разметки: {len(L_values)}"
+        self.size_hint = (0.85, 0.85)
+        self.background_color = (0.1, 0.1, 0.2, 0.95)
+        
+        content = BoxLayout(
+            orientation='vertical',
+            spacing=AdaptiveMetrics.adaptive_dp(8),
+            padding=AdaptiveMetrics.adaptive_dp(10)
+        )
+        
+        row_height = AdaptiveMetrics.adaptive_dp(26)
+        header = Label(
+            text='[b]№          θ, °          L, мм[/b]',
+            markup=True,
+            size_hint_y=None,
+            height=row_height,
+            font_size=AdaptiveMetrics.adaptive_sp(14),
+            color=AppConfig.COLORS['light']
+        )
+        
+        table = RecycleView(do_scroll_x=False, bar_width=AdaptiveMetrics.adaptive_dp(8),
+                            scroll_type=['bars', 'content'])
+        rows_layout = RecycleBoxLayout(
+            orientation='vertical',
+            default_size=(None, row_height),
+            default_size_hint=(1, None),
+            size_hint_y=None
+        )
+        rows_layout.bind(minimum_height=rows_layout.setter('height'))
+        table.add_widget(rows_layout)
+        table.viewclass = 'Label'
+        table.data = PointsTablePopup.rows(L_values, AdaptiveMetrics.adaptive_sp(14))
+        
+        close_btn = AnimatedButton(
+            text='ЗАКРЫТЬ',
+            size_hint_y=None,
+            height=AdaptiveMetrics.get_button_height(),
+            background_color=AppConfig.COLORS['primary']
+        )
+        close_btn.bind(on_press=self.dismiss)
+        
+        content.add_widget(header)
+        content.add_widget(table)
+        content.add_widget(close_btn)
+        self.content = content
+    
+    @staticmethod
+    def rows(L_values, font_size):
+        """Данные строк RecycleView (угол точки на окружности основания)"""
+        step = 360 / max(1, len(L_values) - 1)
+        color = AppConfig.COLORS['light'][:3] + (0.9,)
+        return [
+            {'text': f"{i:5d}          {i * step:8.2f}          {length:10.2f}",
+             'font_size': font_size, 'color': color}
+            for i, length in enumerate(L_values)
+        ]
+
+# === HUD ПРОИЗВОДИТЕЛЬНОСТИ ===
+class PerformanceHUD(Label):
+    """Оверлей с живыми метриками для диагностики медленных рабочих мест"""
+    
+    def __init__(self, screen, **kwargs):
+        super().__init__(**kwargs)
+        self._screen = screen
+        self._refresh_event = None
+        
+        self.size_hint = (None, None)
+        self.size = (AdaptiveMetrics.adaptive_dp(280), AdaptiveMetrics.adaptive_dp(170))
+        self.pos_hint = {'x': 0.01, 'top': 0.99}
+        self.markup = True
+        self.font_size = AdaptiveMetrics.adaptive_sp(12)
+        self.color = AppConfig.COLORS['light']
+        self.halign = 'left'
+        self.valign = 'top'
+        self.padding = (AdaptiveMetrics.adaptive_dp(8), AdaptiveMetrics.adaptive_dp(6))
+        self.text_size = self.size
+        
+        with self.canvas.before:
+            Color(0, 0, 0, 0.7)
+            self.rect = RoundedRectangle(
+                pos=self.pos,
+                size=self.size,
+                radius=[AdaptiveMetrics.adaptive_dp(8)]
+            )
+        
+        self.bind(pos=self._update_rect, size=self._update_rect)
+    
+    def _update_rect(self, *args):
+        self.rect.pos = self.pos
+        self.rect.size = self.size
+        self.text_size = self.size
+    
+    def show(self):
+        """Показ поверх экрана с периодическим обновлением"""
+        if not self.parent:
+            self._screen.add_widget(self)
+        self.refresh()
+        if self._refresh_event is None:
+            self._refresh_event = Clock.schedule_interval(
+                self.refresh, AppConfig.PERFORMANCE['hud_refresh_interval']
+            )
+    
+    def hide(self):
+        """Скрытие и остановка обновления"""
+        if self._refresh_event is not None:
+            self._refresh_event.cancel()
+            self._refresh_event = None
+        if self.parent:
+            self.parent.remove_widget(self)
+    
+    def refresh(self, dt=None):
+        """Обновление текста метрик"""
+        try:
+            metrics = self._screen.get_performance_metrics()
+            
+            def fmt_ms(seconds):
+                return f"{seconds * 1000:.1f} мс" if seconds is not None else "—"
+            
+            fps = metrics['fps']
+            fps_text = f"{fps:.0f}" if fps is not None else "—"
+            
+            particles = metrics['particles']
+            particles_text = (
+                f"{particles} ({metrics['performance_level']})"
+                if particles is not None else "—"
+            )
+            
+            render_scale = metrics['render_scale']
+            render_scale_text = f"{render_scale:.0%}" if render_scale is not None else "—"
+            
+            cache = metrics['texture_cache']
+            hit_rate = f"{cache['hit_rate']:.0%}" if cache['hit_rate'] is not None else "—"
+            cache_text = (
+                f"{cache['entries']} • {cache['used_bytes'] / 1048576:.1f}/"
+                f"{cache['budget_bytes'] / 1048576:.0f} МБ • попаданий {hit_rate}"
+            )
+            
+            self.text = "\n".join([
+                "[b]МОНИТОР (F3)[/b]",
+                f"Кадр: {fmt_ms(metrics['frame_time'])}",
+                f"FPS: {fps_text} / цель {metrics['target_fps']}",
+                f"Разрешение рендера: {render_scale_text}",
+                f"Частицы: {particles_text}",
+                f"Текстуры: {cache_text}",
+                f"Расчет: {fmt_ms(metrics['calculation_latency'])}",
+                f"Запись истории: {fmt_ms(metrics['history_write_latency'])} • "
+                f"в очереди {metrics['history_pending'] if metrics['history_pending'] is not None else '—'}"
+            ])
+            
+        except Exception as e:
+            error_logger.log_error(e, "PerformanceHUD.refresh")
 
 # === ПРОДВИНУТАЯ АНИМИРОВАННАЯ КНОПКА ===
 class AnimatedButton(Button):
@@ -499,159 +1456,16 @@ class AnimatedButton(Button):
         except Exception as e:
             error_logger.log_error(e, "AnimatedButton._play_click_feedback", recoverable=True)
 
-# === УЛУЧШЕННЫЙ PYGAME РЕНДЕРЕР С ИНТЕГРАЦИЕЙ KIVY ===
-class HybridPyGameRenderer(FloatLayout):
-    """Идеальная интеграция PyGame в Kivy с единым циклом рендеринга"""
+# === УМНАЯ СИСТЕМА ЧАСТИЦ С АВТОБАЛАНСИРОВКОЙ ===
+class SmartParticleSystem:
+    """Интеллектуальная система частиц с автобалансировкой производительности"""
     
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        self.size_hint = (1, 1)
-        
-        # Единая система управления ресурсами
-        self._renderer = UnifiedRenderer()
-        self._texture = None
-        self._last_size = (0, 0)
-        
-        # Умные частицы
-        self._particles = []
-        self._particle_timer = 0
-        self._max_particles = self._get_optimal_particle_count()
-        
-        # Анимации
-        self._animation_phase = 0
-        self._is_rendering = False
-        
-        # Данные для визуализации
-        self.calculation_data = None
-        self.visualization_mode = "cone"  # cone, development, hybrid
-        
-        # Запуск единого цикла рендеринга
-        Clock.schedule_once(self._initialize, 0.1)
-    
-    def _get_optimal_particle_count(self):
-        """Автоматическая оптимизация количества частиц"""
-        screen_profile = AdaptiveMetrics.get_screen_profile()
-        screen_size = screen_profile["name"]
-        
-        particle_limits = {
-            "small": AppConfig.PERFORMANCE['max_particles_small'],
-            "medium": AppConfig.PERFORMANCE['max_particles_medium'], 
-            "large": AppConfig.PERFORMANCE['max_particles_large'],
-            "xlarge": AppConfig.PERFORMANCE['max_particles_large']
-        }
-        
-        return particle_limits.get(screen_size, 30)
-    
-    def _initialize(self, dt):
-        """Инициализация с отложенной загрузкой"""
-        try:
-            # Проверяем доступность PyGame
-            global PYGAME_AVAILABLE
-            try:
-                import pygame
-                PYGAME_AVAILABLE = True
-                pygame.init()
-                error_logger.log_event("PyGame initialized successfully")
-            except ImportError:
-                PYGAME_AVAILABLE = False
-                error_logger.log_event("PyGame not available - using fallback")
-            
-            # Создаем поверхность для рендеринга
-            self._create_render_surface()
-            
-            # Запускаем оптимизированный цикл рендеринга
-            Clock.schedule_interval(self._unified_render, 1/60)
-            
-        except Exception as e:
-            error_logger.log_error(e, "HybridPyGameRenderer._initialize")
-            self._create_kivy_fallback()
-    
-    def _create_render_surface(self):
-        """Создание поверхности для рендеринга"""
-        if not PYGAME_AVAILABLE:
-            return
-            
-        try:
-            width = max(100, int(self.width))
-            height = max(100, int(self.height))
-            
-            self._pg_surface = pygame.Surface((width, height), pygame.SRCALPHA)
-            self._last_size = (width, height)
-            
-        except Exception as e:
-            error_logger.log_error(e, "HybridPyGameRenderer._create_render_surface")
-    
-    def _create_kivy_fallback(self):
-        """Создание fallback на чистом Kivy"""
-        with self.canvas:
-            Color(*AppConfig.COLORS['background'])
-            Rectangle(pos=self.pos, size=self.size)
-    
-    def on_size(self, *args):
-        """Обработка изменения размера с оптимизацией"""
-        if self.width > 0 and self.height > 0:
-            if PYGAME_AVAILABLE:
-                self._create_render_surface()
-            self._texture = None
-    
-    def _unified_render(self, dt):
-        """Единый цикл рендеринга Kivy + PyGame"""
-        if not PYGAME_AVAILABLE or not hasattr(self, '_pg_surface'):
-            return
-        
-        try:
-            # Оптимизация: пропускаем кадры если не активно
-            if not any([self.calculation_data, self._particles, self._is_rendering]):
-                return
-            
-            # Обновление анимаций
-            self._animation_phase = (self._animation_phase + 0.015) % (2 * math.pi)
-            
-            # Очистка поверхности
-            self._pg_surface.fill((0, 0, 0, 0))
-            
-            # Рендеринг компонентов
-            self._render_gradient_background()
-            self._render_particles()
-            self._render_visualization()
-            
-            # Обновление текстуры Kivy
-            self._update_kivy_texture()
-            
-        except Exception as e:
-            error_logger.log_error(e, "HybridPyGameRenderer._unified_render")
-    
-    def _render_gradient_background(self):
-        """Рендеринг градиентного фона"""
-        try:
-            width, height = self._pg_surface.get_size()
-            
-            # Адаптивный градиент based on screen size
-            for y in range(0, height, 3):  # Оптимизация: рисуем каждую 3-ю линию
-                progress = y / height
-                r = int(30 + progress * 25)
-                g = int(40 + progress * 20) 
-                b = int(80 + progress * 50)
-                
-                pygame.draw.line(
-                    self._pg_surface, 
-                    (r, g, b), 
-                    (0, y), 
-                    (width, y)
-                )
-                
-        except Exception as e:
-            error_logger.log_error(e, "HybridPyGameRenderer._render_gradient_background")
-            # === УМНАЯ СИСТЕМА ЧАСТИЦ С АВТОБАЛАНСИРОВКОЙ ===
-class SmartParticleSystem:
-    """Интеллектуальная система частиц с автобалансировкой производительности"""
-    
-    def __init__(self, max_particles=50):
-        self.max_particles = max_particles
-        self.particles = []
-        self._performance_level = "high"  # high, medium, low
-        self._frame_skip_counter = 0
-        self._last_performance_check = 0
+    def __init__(self, max_particles=50):
+        self.max_particles = max_particles
+        self.particles = []
+        self._performance_level = "high"  # high, medium, low
+        self._frame_skip_counter = 0
+        self._last_performance_check = 0
         
     def update_performance_level(self, fps, delta_time):
         """Автоматическая настройка производительности"""
@@ -749,14 +1563,119 @@ class SmartParticleSystem:
             else:
                 pygame.draw.circle(surface, color, (int(p['x']), int(p['y'])), int(p['size']))
 
-# === ПРОДОЛЖЕНИЕ HYBRID PYGAME RENDERER ===
+# === ОФФСКРИН-СЦЕНА PYGAME ===
+class PyGameScene:
+    """Фазы рендеринга PyGame без зависимости от окна Kivy"""
+    
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        
+        # Умные частицы
+        self._particle_timer = 0
+        self._max_particles = self._get_optimal_particle_count()
+        
+        # Анимации
+        self._animation_phase = 0
+        
+        # Доля разрешения виджета, в которой рисуется сцена (GPU растягивает текстуру)
+        self._render_scale = 1.0
+        self._fonts = {}
+        
+        # Данные для визуализации
+        self.calculation_data = None
+        self.visualization_mode = "cone"  # cone, development, hybrid
+    
+    def _px(self, value):
+        """Размер в пикселях с учетом масштаба рендеринга"""
+        return int(round(value * self._render_scale))
+    
+    def _get_font(self, size):
+        """Шрифт PyGame с кэшированием по итоговому размеру"""
+        size = max(1, self._px(size))
+        font = self._fonts.get(size)
+        if font is None:
+            font = self._fonts[size] = pygame.font.Font(None, size)
+        return font
+    
+    @staticmethod
+    def load_pygame():
+        """Ленивая загрузка и инициализация PyGame"""
+        global PYGAME_AVAILABLE, pygame
+        if PYGAME_AVAILABLE:
+            return True
+        
+        try:
+            import pygame as pygame_module
+            pygame = pygame_module
+            pygame.init()
+            PYGAME_AVAILABLE = True
+            error_logger.log_event("PyGame initialized successfully")
+        except ImportError:
+            PYGAME_AVAILABLE = False
+            error_logger.log_event("PyGame not available - using fallback")
+        
+        return PYGAME_AVAILABLE
+    
+    def create_offscreen_surface(self, size):
+        """Поверхность для рендеринга без окна (бенчмарки, экспорт)"""
+        self._pg_surface = pygame.Surface(size, pygame.SRCALPHA)
+        return self._pg_surface
+    
+    def _get_optimal_particle_count(self):
+        """Автоматическая оптимизация количества частиц"""
+        screen_profile = AdaptiveMetrics.get_screen_profile()
+        screen_size = screen_profile["name"]
+        
+        particle_limits = {
+            "small": AppConfig.PERFORMANCE['max_particles_small'],
+            "medium": AppConfig.PERFORMANCE['max_particles_medium'], 
+            "large": AppConfig.PERFORMANCE['max_particles_large'],
+            "xlarge": AppConfig.PERFORMANCE['max_particles_large']
+        }
+        
+        return particle_limits.get(screen_size, 30)
+    
+    def render_frame(self):
+        """Отрисовка одного кадра всех фаз на поверхность"""
+        # Обновление анимаций
+        self._animation_phase = (self._animation_phase + 0.015) % (2 * math.pi)
+        
+        # Очистка поверхности
+        self._pg_surface.fill((0, 0, 0, 0))
+        
+        self._render_gradient_background()
+        self._render_particles()
+        self._render_visualization()
+    
+    def _render_gradient_background(self):
+        """Рендеринг градиентного фона"""
+        try:
+            width, height = self._pg_surface.get_size()
+            
+            # Адаптивный градиент based on screen size
+            for y in range(0, height, 3):  # Оптимизация: рисуем каждую 3-ю линию
+                progress = y / height
+                r = int(30 + progress * 25)
+                g = int(40 + progress * 20) 
+                b = int(80 + progress * 50)
+                
+                pygame.draw.line(
+                    self._pg_surface, 
+                    (r, g, b), 
+                    (0, y), 
+                    (width, y)
+                )
+                
+        except Exception as e:
+            error_logger.log_error(e, "PyGameScene._render_gradient_background")
+    
     def _render_particles(self):
         """Рендеринг умных частиц"""
         if not hasattr(self, '_particle_system'):
             self._particle_system = SmartParticleSystem(self._max_particles)
         
         # Автобалансировка производительности
-        self._particle_system.update_performance_level(60, 1/60)  # TODO: реальные значения FPS
+        self._particle_system.update_performance_level(performance_monitor.get_fps() or 60, 1/60)
         
         # Добавление новых частиц
         current_time = datetime.now().timestamp()
@@ -789,7 +1708,7 @@ class SmartParticleSystem:
                 self._render_hybrid_scheme(center_x, center_y)
                 
         except Exception as e:
-            error_logger.log_error(e, "HybridPyGameRenderer._render_visualization")
+            error_logger.log_error(e, "PyGameScene._render_visualization")
             self._render_default_cone()
     
     def _render_default_cone(self):
@@ -799,7 +1718,7 @@ class SmartParticleSystem:
             center_x, center_y = width // 2, height // 2
             
             # Анимированный конус
-            scale = AdaptiveMetrics.get_scale_factor()
+            scale = AdaptiveMetrics.get_scale_factor() * self._render_scale
             base_width = int(80 * scale + 8 * math.sin(self._animation_phase * 2))
             cone_height = int(100 * scale)
             
@@ -815,10 +1734,10 @@ class SmartParticleSystem:
                 pygame.draw.polygon(self._pg_surface, (100, color_value, 255, 100), points)
             
             # Контур
-            pygame.draw.polygon(self._pg_surface, (80, 130, 235), points, 2)
+            pygame.draw.polygon(self._pg_surface, (80, 130, 235), points, max(1, self._px(2)))
             
         except Exception as e:
-            error_logger.log_error(e, "HybridPyGameRenderer._render_default_cone")
+            error_logger.log_error(e, "PyGameScene._render_default_cone")
     
     def _render_cone_scheme(self, center_x, center_y):
         """Схема конуса с расчетными параметрами"""
@@ -840,18 +1759,28 @@ class SmartParticleSystem:
             
             # Рисуем конус
             pygame.draw.polygon(self._pg_surface, (100, 180, 255, 80), points)
-            pygame.draw.polygon(self._pg_surface, (80, 160, 235), points, 2)
+            pygame.draw.polygon(self._pg_surface, (80, 160, 235), points, max(1, self._px(2)))
             
             # Подписи размеров
-            font = pygame.font.Font(None, 24)
+            font = self._get_font(24)
             diameter_text = font.render(f"D: {D}mm", True, (255, 255, 255))
             height_text = font.render(f"H: {H}mm", True, (255, 255, 255))
             
-            self._pg_surface.blit(diameter_text, (center_x - 30, center_y + cone_height // 2 + 10))
-            self._pg_surface.blit(height_text, (center_x + base_radius + 5, center_y - 10))
+            self._pg_surface.blit(diameter_text, (center_x - self._px(30), center_y + cone_height // 2 + self._px(10)))
+            self._pg_surface.blit(height_text, (center_x + base_radius + self._px(5), center_y - self._px(10)))
             
         except Exception as e:
-            error_logger.log_error(e, "HybridPyGameRenderer._render_cone_scheme")
+            error_logger.log_error(e, "PyGameScene._render_cone_scheme")
+    
+    @staticmethod
+    def cut_profile(L_values, generatrix, max_points=181):
+        """Пары (доля угла сектора, L/g) не более чем из max_points точек"""
+        if not L_values or not generatrix:
+            return None
+        n = len(L_values) - 1
+        stride = max(1, math.ceil(n / (max_points - 1)))
+        indices = list(range(0, n, stride)) + [n]
+        return [(i / n, L_values[i] / generatrix) for i in indices]
     
     def _render_development_scheme(self, center_x, center_y):
         """Схема развертки конуса"""
@@ -871,16 +1800,18 @@ class SmartParticleSystem:
             start_angle = math.radians(-display_angle / 2)
             end_angle = math.radians(display_angle / 2)
             
+            line_width = max(1, self._px(2))
+            
             # Радиальные линии
             pygame.draw.line(self._pg_surface, (100, 200, 255),
                             (center_x, center_y),
                             (center_x + display_radius * math.cos(start_angle), 
-                             center_y + display_radius * math.sin(start_angle)), 2)
+                             center_y + display_radius * math.sin(start_angle)), line_width)
             
             pygame.draw.line(self._pg_surface, (100, 200, 255),
                             (center_x, center_y),
                             (center_x + display_radius * math.cos(end_angle), 
-                             center_y + display_radius * math.sin(end_angle)), 2)
+                             center_y + display_radius * math.sin(end_angle)), line_width)
             
             # Дуга развертки
             points = []
@@ -894,74 +1825,325 @@ class SmartParticleSystem:
                 ))
             
             if len(points) > 1:
-                pygame.draw.lines(self._pg_surface, (100, 200, 255), False, points, 2)
+                pygame.draw.lines(self._pg_surface, (100, 200, 255), False, points, line_width)
+            
+            # Линия среза: дуга усеченного конуса или кривая косого среза
+            profile = self.calculation_data.get('cut_profile')
+            if profile:
+                cut_points = [(
+                    center_x + display_radius * share * math.cos(start_angle + t * (end_angle - start_angle)),
+                    center_y + display_radius * share * math.sin(start_angle + t * (end_angle - start_angle))
+                ) for t, share in profile]
+                pygame.draw.lines(self._pg_surface, (255, 180, 90), False, cut_points, line_width)
             
             # Подписи
-            font = pygame.font.Font(None, 24)
+            font = self._get_font(24)
             angle_text = font.render(f"φ: {angle:.1f}°", True, (255, 255, 255))
             radius_text = font.render(f"R: {radius:.1f}mm", True, (255, 255, 255))
             
-            self._pg_surface.blit(angle_text, (center_x - 30, center_y - display_radius - 30))
-            self._pg_surface.blit(radius_text, (center_x + 10, center_y - 20))
+            self._pg_surface.blit(angle_text, (center_x - self._px(30), center_y - display_radius - self._px(30)))
+            self._pg_surface.blit(radius_text, (center_x + self._px(10), center_y - self._px(20)))
             
         except Exception as e:
-            error_logger.log_error(e, "HybridPyGameRenderer._render_development_scheme")
+            error_logger.log_error(e, "PyGameScene._render_development_scheme")
     
     def _render_hybrid_scheme(self, center_x, center_y):
         """Гибридная схема - конус и развертка вместе"""
         try:
             # Рисуем оба представления с смещением
-            self._render_cone_scheme(center_x - 100, center_y)
-            self._render_development_scheme(center_x + 100, center_y)
+            self._render_cone_scheme(center_x - self._px(100), center_y)
+            self._render_development_scheme(center_x + self._px(100), center_y)
             
             # Соединительная линия
             pygame.draw.line(self._pg_surface, (150, 150, 255, 100),
-                            (center_x - 50, center_y),
-                            (center_x + 50, center_y), 2)
+                            (center_x - self._px(50), center_y),
+                            (center_x + self._px(50), center_y), max(1, self._px(2)))
                             
         except Exception as e:
-            error_logger.log_error(e, "HybridPyGameRenderer._render_hybrid_scheme")
+            error_logger.log_error(e, "PyGameScene._render_hybrid_scheme")
+
+# === ПОВЕРХНОСТЬ С ЗАПАСОМ ЕМКОСТИ ===
+class RenderSurfaceAllocator:
+    """Поверхность рендеринга с запасом: изменение размера без переаллокации полного кадра"""
     
-    def _update_kivy_texture(self):
-        """Обновление Kivy текстуры с оптимизацией"""
-        if not PYGAME_AVAILABLE or not hasattr(self, '_pg_surface'):
-            return
-            
+    def __init__(self, renderer, name='render'):
+        self._renderer = renderer
+        self._name = name
+        self._backing = None
+        self.surface = None
+        self.size = (0, 0)
+        self.capacity = (0, 0)
+        
+        # Счетчики для измерения «дребезга» памяти
+        self.allocations = 0
+        self.allocated_bytes = 0
+    
+    @staticmethod
+    def capacity_for(size):
+        """Емкость с запасом, округленная вверх до шага bucket"""
+        bucket = AppConfig.PERFORMANCE['surface_bucket']
+        headroom = AppConfig.PERFORMANCE['surface_headroom']
+        return tuple(int(math.ceil(side * headroom / bucket)) * bucket for side in size)
+    
+    def resize(self, size):
+        """Смена видимого размера; True если размер действительно изменился"""
+        if size == self.size:
+            return False
+        
+        fits = size[0] <= self.capacity[0] and size[1] <= self.capacity[1]
+        capacity_area = self.capacity[0] * self.capacity[1]
+        too_sparse = size[0] * size[1] < capacity_area * AppConfig.PERFORMANCE['surface_shrink_ratio']
+        if not fits or too_sparse:
+            self.capacity = self.capacity_for(size)
+        
+        self.size = size
+        self.surface = None
+        return True
+    
+    def acquire(self):
+        """Поверхность видимого размера (подобласть общей поверхности-емкости)"""
+        backing = self._renderer.get_pygame_surface(self._name, self.capacity)
+        if backing is not self._backing:
+            self._backing = backing
+            self.surface = None
+            self.allocations += 1
+            self.allocated_bytes += self.capacity[0] * self.capacity[1] * 4
+        
+        if self.surface is None:
+            self.surface = backing.subsurface((0, 0) + tuple(self.size))
+        return self.surface
+    
+    def release(self):
+        """Сброс ссылок после освобождения ресурсов в общем кэше"""
+        self._backing = None
+        self.surface = None
+
+# === АДАПТИВНОЕ РАЗРЕШЕНИЕ РЕНДЕРИНГА ===
+class RenderScaleController:
+    """Автовыбор доли разрешения рендеринга по измеренному времени кадра"""
+    
+    def __init__(self):
+        self.scale = 1.0
+        self._samples = []
+        self._last_update = time.perf_counter()
+    
+    def record(self, render_time):
+        """Учет времени рендера очередного кадра"""
+        self._samples.append(render_time)
+    
+    def update(self):
+        """Новый масштаб, если его пора и нужно изменить; иначе None"""
+        config = AppConfig.PERFORMANCE
+        if not config['adaptive_render_scale'] or not self._samples:
+            return None
+        
+        now = time.perf_counter()
+        if now - self._last_update < config['render_scale_interval']:
+            return None
+        
+        average = sum(self._samples) / len(self._samples)
+        self._samples = []
+        self._last_update = now
+        
+        budget = config['render_time_budget']
+        step = config['render_scale_step']
+        if average > budget and self.scale > config['min_render_scale']:
+            new_scale = max(config['min_render_scale'], round(self.scale - step, 2))
+        elif average < budget * 0.5 and self.scale < 1.0:
+            # Запас x2: шаг вверх увеличивает площадь кадра не более чем в ~1.4 раза
+            new_scale = min(1.0, round(self.scale + step, 2))
+        else:
+            return None
+        
+        error_logger.log_event(f"Render scale: {self.scale:.2f} -> {new_scale:.2f} (frame {average * 1000:.1f} ms)")
+        self.scale = new_scale
+        return new_scale
+
+# === УЛУЧШЕННЫЙ PYGAME РЕНДЕРЕР С ИНТЕГРАЦИЕЙ KIVY ===
+class HybridPyGameRenderer(PyGameScene, FloatLayout):
+    """Идеальная интеграция PyGame в Kivy с единым циклом рендеринга"""
+    
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.size_hint = (1, 1)
+        
+        # Единая система управления ресурсами
+        self._renderer = UnifiedRenderer()
+        self._surface_allocator = RenderSurfaceAllocator(self._renderer)
+        self._scale_controller = RenderScaleController()
+        self._texture = None
+        self._last_size = (0, 0)
+        self._paused = False
+        
+        # Переаллокация только после завершения серии событий изменения размера
+        self._resize_trigger = Clock.create_trigger(
+            self._apply_resize, AppConfig.PERFORMANCE['resize_debounce']
+        )
+        
+        # Умные частицы
+        self._particles = []
+        self._is_rendering = False
+        
+        # Запуск единого цикла рендеринга
+        Clock.schedule_once(self._initialize, 0.1)
+    
+    def _initialize(self, dt):
+        """Инициализация с отложенной загрузкой"""
         try:
-            # Создаем или обновляем текстуру
-            if self._texture is None:
-                self._texture = Texture.create(size=self._pg_surface.get_size())
-                with self.canvas:
-                    Color(1, 1, 1, 1)
-                    self.rect = Rectangle(texture=self._texture, pos=self.pos, size=self.size)
+            # Проверяем доступность PyGame
+            PyGameScene.load_pygame()
             
-            # Конвертируем PyGame surface в Kivy texture
-            pg_string = pygame.image.tostring(self._pg_surface, 'RGBA')
-            self._texture.blit_buffer(pg_string, colorfmt='rgba', bufferfmt='ubyte')
+            # Создаем поверхность для рендеринга
+            self._create_render_surface()
             
-            # Обновляем позицию и размер
-            self.rect.pos = self.pos
-            self.rect.size = self.size
+            # Запускаем оптимизированный цикл рендеринга
+            Clock.schedule_interval(self._unified_render, 1/60)
             
         except Exception as e:
-            error_logger.log_error(e, "HybridPyGameRenderer._update_kivy_texture")
+            error_logger.log_error(e, "HybridPyGameRenderer._initialize")
             self._create_kivy_fallback()
     
-    def show_calculation(self, diameter, height, generatrix=None, angle=None, mode="cone"):
-        """Отображение расчетных данных"""
-        self.calculation_data = {
-            'diameter': diameter,
-            'height': height,
-            'generatrix': generatrix,
-            'angle': angle
-        }
-        self.visualization_mode = mode
-        self._is_rendering = True
-
-# === СИСТЕМА ВАЛИДАЦИИ ВХОДНЫХ ДАННЫХ ===
+    def _create_render_surface(self):
+        """Создание поверхности для рендеринга"""
+        if not PYGAME_AVAILABLE:
+            return
+            
+        try:
+            # Сцена рисуется в доле разрешения виджета, Rectangle растягивает ее на GPU
+            width = max(100, int(self.width * self._render_scale))
+            height = max(100, int(self.height * self._render_scale))
+            
+            self._surface_allocator.resize((width, height))
+            self._last_size = (width, height)
+            self._pg_surface = self._surface_allocator.acquire()
+            
+        except Exception as e:
+            error_logger.log_error(e, "HybridPyGameRenderer._create_render_surface")
+    
+    def _create_kivy_fallback(self):
+        """Создание fallback на чистом Kivy"""
+        with self.canvas:
+            Color(*AppConfig.COLORS['background'])
+            Rectangle(pos=self.pos, size=self.size)
+    
+    def on_size(self, *args):
+        """Обработка изменения размера с оптимизацией"""
+        if self.width > 0 and self.height > 0 and PYGAME_AVAILABLE:
+            # Debounce: каждое новое событие откладывает переаллокацию
+            self._resize_trigger.cancel()
+            self._resize_trigger()
+    
+    def _apply_resize(self, dt):
+        """Применение итогового размера после паузы в событиях"""
+        self._create_render_surface()
+    
+    def release_resources(self):
+        """Остановка рендеринга и возврат текстуры/поверхности в общий кэш"""
+        self._paused = True
+        self._texture = None
+        if hasattr(self, 'rect'):
+            self.rect.texture = None
+        if hasattr(self, '_pg_surface'):
+            del self._pg_surface
+        self._renderer.release_resources()
+        self._surface_allocator.release()
+    
+    def resume_rendering(self):
+        """Возобновление рендеринга (ресурсы создаются лениво)"""
+        self._paused = False
+    
+    def _unified_render(self, dt):
+        """Единый цикл рендеринга Kivy + PyGame"""
+        if not PYGAME_AVAILABLE or self._paused or self._last_size == (0, 0):
+            return
+        
+        try:
+            # Оптимизация: пропускаем кадры если не активно
+            if not any([self.calculation_data, self._particles, self._is_rendering]):
+                return
+            
+            frame_start = time.perf_counter()
+            
+            # Поверхность берется из общего кэша (LRU-отметка или пересоздание после вытеснения)
+            self._pg_surface = self._surface_allocator.acquire()
+            
+            # Рендеринг компонентов
+            self.render_frame()
+            
+            # Обновление текстуры Kivy
+            self._update_kivy_texture()
+            
+            render_time = time.perf_counter() - frame_start
+            performance_monitor.record_frame(render_time)
+            
+            # Подстройка разрешения под бюджет кадра
+            self._scale_controller.record(render_time)
+            new_scale = self._scale_controller.update()
+            if new_scale is not None:
+                self._render_scale = new_scale
+                self._create_render_surface()
+            
+        except Exception as e:
+            error_logger.log_error(e, "HybridPyGameRenderer._unified_render")
+    
+    def _update_kivy_texture(self):
+        """Обновление Kivy текстуры с оптимизацией"""
+        if not PYGAME_AVAILABLE or not hasattr(self, '_pg_surface'):
+            return
+            
+        try:
+            # Текстура из общего кэша; при смене объекта перепривязываем прямоугольник
+            texture = self._renderer.get_kivy_texture('render', self._pg_surface.get_size())
+            if texture is not self._texture:
+                self._texture = texture
+                if hasattr(self, 'rect'):
+                    self.rect.texture = texture
+                else:
+                    with self.canvas:
+                        Color(1, 1, 1, 1)
+                        self.rect = Rectangle(texture=texture, pos=self.pos, size=self.size)
+            
+            # Конвертируем PyGame surface в Kivy texture
+            pg_string = pygame.image.tostring(self._pg_surface, 'RGBA')
+            self._texture.blit_buffer(pg_string, colorfmt='rgba', bufferfmt='ubyte')
+            
+            # Обновляем позицию и размер
+            self.rect.pos = self.pos
+            self.rect.size = self.size
+            
+        except Exception as e:
+            error_logger.log_error(e, "HybridPyGameRenderer._update_kivy_texture")
+            self._create_kivy_fallback()
+    
+    def show_calculation(self, diameter, height, generatrix=None, angle=None, mode="cone", L_values=None):
+        """Отображение расчетных данных"""
+        self.calculation_data = {
+            'diameter': diameter,
+            'height': height,
+            'generatrix': generatrix,
+            'angle': angle,
+            # Линия среза в долях образующей, прореженная для отрисовки каждый кадр
+            'cut_profile': PyGameScene.cut_profile(L_values, generatrix)
+        }
+        self.visualization_mode = mode
+        self._is_rendering = True
+
+# === СИСТЕМА ВАЛИДАЦИИ ВХОДНЫХ ДАННЫХ ===
 class InputValidator:
     """Комплексная система валидации входных данных"""
     
+    # Биты ошибок колоночной валидации: по 4 бита на поле + общие проверки
+    ERR_NOT_NUMBER = 0x1
+    ERR_NOT_FINITE = 0x2
+    ERR_BELOW_MIN = 0x4
+    ERR_ABOVE_MAX = 0x8
+    FIELD_SHIFTS = {'diameter': 0, 'height': 4, 'cut_param': 8, 'segments': 12, 'thickness': 20, 'kerf': 24}
+    ERR_CUT_TYPE = 1 << 16
+    ERR_RATIO_HIGH = 1 << 17
+    ERR_RATIO_LOW = 1 << 18
+    ERR_THICKNESS_TOO_LARGE = 1 << 28
+    CUT_TYPES = ('slant', 'parallel')
+    
     @staticmethod
     def validate_number(value, field_name, min_val=None, max_val=None):
         """Валидация числового значения"""
@@ -989,7 +2171,7 @@ class InputValidator:
             return False, f"Ошибка проверки {field_name}"
     
     @staticmethod
-    def validate_cone_parameters(diameter, height, cut_param, segments, cut_type):
+    def validate_cone_parameters(diameter, height, cut_param, segments, cut_type, thickness=0, kerf=0):
         """Комплексная валидация параметров конуса"""
         errors = []
         validated_data = {}
@@ -1017,11 +2199,11 @@ class InputValidator:
         # Валидация параметра среза
         if cut_type == "slant":
             success, result = InputValidator.validate_number(
-                cut_param, "Угол среза", min_val=0, max_val=90
+                cut_param, "Угол среза", min_val=AppConfig.LIMITS['min_slant_angle'], max_val=90
             )
         else:
             success, result = InputValidator.validate_number(
-                cut_param, "Высота среза", min_val=0, max_val=float(height) if height else 10000
+                cut_param, "Высота среза", min_val=0, max_val=validated_data.get('height', 10000)
             )
         
         if success:
@@ -1040,6 +2222,15 @@ class InputValidator:
         else:
             errors.append(result)
         
+        # Толщина материала и ширина реза
+        for field, value in (('thickness', thickness), ('kerf', kerf)):
+            field_name, min_val, max_val = InputValidator._field_limits(field)
+            success, result = InputValidator.validate_number(value, field_name, min_val=min_val, max_val=max_val)
+            if success:
+                validated_data[field] = result
+            else:
+                errors.append(result)
+        
         # Дополнительные проверки
         if not errors:
             # Проверка соотношения размеров
@@ -1048,122 +2239,2113 @@ class InputValidator:
             
             if validated_data['diameter'] / validated_data['height'] < 0.1:
                 errors.append("Слишком маленькое соотношение диаметра к высоте")
+            
+            # Нейтральный слой должен остаться внутри конуса
+            neutral_radius, _ = ConeGeometry.neutral_cone(
+                validated_data['diameter'] / 2, validated_data['height'], validated_data['thickness']
+            )
+            if neutral_radius <= 0:
+                errors.append("Толщина материала слишком велика для диаметра конуса")
         
         return validated_data, errors
-
-# === УЛУЧШЕННЫЙ ЭКРАН КАЛЬКУЛЯТОРА ===
-class ProfessionalCalculatorScreen(ProfessionalScreen):
-    """Профессиональный экран калькулятора с идеальной интеграцией"""
     
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        self.name = 'calculator'
-        self.cut_type = "slant"
-        self.current_calculation = None
-        self.validator = InputValidator()
-        
-    def setup_ui(self):
-        """Создание профессионального интерфейса"""
-        main_layout = FloatLayout()
-        
-        # Фон с интегрированным рендерером
-        self.renderer = HybridPyGameRenderer()
-        main_layout.add_widget(self.renderer)
-        
-        # Основной контент
-        content = self._create_content_layout()
-        main_layout.add_widget(content)
-        
-        self.add_widget(main_layout)
-        self._setup_default_values()
+    @staticmethod
+    def _field_limits(field, cut_type="slant", height=None):
+        """Имя поля и допустимый диапазон, как в validate_cone_parameters"""
+        if field == 'diameter':
+            return "Диаметр", AppConfig.LIMITS['min_diameter'], AppConfig.LIMITS['max_diameter']
+        if field == 'height':
+            return "Высота", 1, 10000
+        if field == 'segments':
+            return "Количество сегментов", AppConfig.LIMITS['min_segments'], AppConfig.LIMITS['max_segments']
+        if field == 'thickness':
+            return "Толщина материала", 0, AppConfig.LIMITS['max_thickness']
+        if field == 'kerf':
+            return "Ширина реза", 0, AppConfig.LIMITS['max_kerf']
+        if cut_type == "slant":
+            return "Угол среза", AppConfig.LIMITS['min_slant_angle'], 90
+        return "Высота среза", 0, height if height is not None else 10000
     
-    def _create_content_layout(self):
-        """Создание основного контента"""
-        content = BoxLayout(
-            orientation='vertical',
-            padding=AdaptiveMetrics.get_padding(),
-            spacing=AdaptiveMetrics.adaptive_dp(15),
-            size_hint=(0.95, 0.95),
-            pos_hint={'center_x': 0.5, 'center_y': 0.5}
-        )
-        
-        # Заголовок
-        content.add_widget(self._create_header())
-        
-        # Карточка типа среза
-        content.add_widget(self._create_cut_type_card())
-        
-        # Карточка ввода параметров
-        content.add_widget(self._create_input_card())
-        
-        # Панель действий
-        content.add_widget(self._create_action_panel())
-        
-        # Карточка результатов
-        self.results_card = self._create_results_card()
-        content.add_widget(self.results_card)
+    @staticmethod
+    def _parse_column(values):
+        """Колонка в float-массив и маска нечисловых значений"""
+        # map(float) по списку строк заметно быстрее, чем astype(float) у строкового массива
+        try:
+            return np.fromiter(map(float, values), dtype=float, count=len(values)), np.zeros(len(values), dtype=bool)
+        except (TypeError, ValueError):
+            pass
         
-        return content
+        # Есть нечисловые значения (пустые строки, None, текст): поэлементно
+        parsed = np.empty(len(values), dtype=float)
+        bad = np.zeros(len(values), dtype=bool)
+        for i, value in enumerate(values):
+            try:
+                parsed[i] = float(value)
+            except (TypeError, ValueError):
+                parsed[i] = np.nan
+                bad[i] = True
+        return parsed, bad
     
-    def _create_header(self):
-        """Создание профессионального заголовка"""
-        header = BoxLayout(
-            orientation='horizontal',
-            size_hint_y=None,
-            height=AdaptiveMetrics.get_button_height(),
-            spacing=AdaptiveMetrics.adaptive_dp(10)
-        )
+    @staticmethod
+    def _range_bits(values, bad, min_val, max_val):
+        """Биты ошибок поля для колонки (min/max - скаляры или массивы)"""
+        finite = np.isfinite(values)
+        below = finite & (values < min_val)
+        above = finite & ~below & (values > max_val)
+        bits = np.where(bad, InputValidator.ERR_NOT_NUMBER, 0)
+        bits |= np.where(~bad & ~finite, InputValidator.ERR_NOT_FINITE, 0)
+        bits |= np.where(below, InputValidator.ERR_BELOW_MIN, 0)
+        bits |= np.where(above, InputValidator.ERR_ABOVE_MAX, 0)
+        return bits.astype(np.uint32)
+    
+    @staticmethod
+    def _scalar_bits(value, min_val, max_val):
+        """Биты ошибок поля для одного значения (без NumPy)"""
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return InputValidator.ERR_NOT_NUMBER, math.nan
+        if math.isnan(value) or math.isinf(value):
+            return InputValidator.ERR_NOT_FINITE, value
+        if min_val is not None and value < min_val:
+            return InputValidator.ERR_BELOW_MIN, value
+        if max_val is not None and value > max_val:
+            return InputValidator.ERR_ABOVE_MAX, value
+        return 0, value
+    
+    @staticmethod
+    def validate_columns(diameter, height, cut_param, segments, cut_type, thickness=None, kerf=None):
+        """Колоночная валидация пачки заданий
+        
+        Возвращает (колонки значений, битовая маска ошибок на строку); тексты
+        ошибок строятся лениво через describe_errors только для нужных строк.
+        cut_type - строка для всей пачки или последовательность по строкам;
+        thickness/kerf - колонки или None (нулевые значения).
+        """
+        count = len(diameter)
+        if isinstance(cut_type, str):
+            cut_type = [cut_type] * count
+        if thickness is None:
+            thickness = [0.0] * count
+        if kerf is None:
+            kerf = [0.0] * count
+        if not NUMPY_AVAILABLE:
+            return InputValidator._validate_columns_python(
+                diameter, height, cut_param, segments, cut_type, thickness, kerf
+            )
         
-        # Кнопка назад
-        back_btn = self.create_professional_button(
-            '← Назад (Esc)', 'secondary', self.on_back_press,
-            size_hint=(None, None)
+        shifts = InputValidator.FIELD_SHIFTS
+        errors = np.zeros(count, dtype=np.uint32)
+        columns = {}
+        
+        for field, values in (('diameter', diameter), ('height', height), ('segments', segments),
+                              ('thickness', thickness), ('kerf', kerf)):
+            _, min_val, max_val = InputValidator._field_limits(field)
+            parsed, bad = InputValidator._parse_column(values)
+            errors |= InputValidator._range_bits(parsed, bad, min_val, max_val) << shifts[field]
+            columns[field] = parsed
+        
+        # Диапазон среза зависит от типа среза и проверенной высоты строки
+        cut_type = np.asarray(cut_type)
+        slant = cut_type == "slant"
+        known = slant | (cut_type == "parallel")
+        errors |= np.where(known, 0, InputValidator.ERR_CUT_TYPE).astype(np.uint32)
+        
+        height_ok = (errors >> shifts['height']) & 0xF == 0
+        max_cut = np.where(slant, 90.0, np.where(height_ok, columns['height'], 10000.0))
+        max_cut = np.where(known, max_cut, np.inf)
+        min_cut = np.where(slant, AppConfig.LIMITS['min_slant_angle'], np.where(known, 0.0, -np.inf))
+        parsed, bad = InputValidator._parse_column(cut_param)
+        errors |= InputValidator._range_bits(parsed, bad, min_cut, max_cut) << shifts['cut_param']
+        columns['cut_param'] = parsed
+        
+        # Соотношение D/H проверяется только для строк без других ошибок
+        valid = errors == 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = np.where(valid, columns['diameter'] / columns['height'], 1.0)
+        errors |= np.where(ratio > 10, InputValidator.ERR_RATIO_HIGH, 0).astype(np.uint32)
+        errors |= np.where(ratio < 0.1, InputValidator.ERR_RATIO_LOW, 0).astype(np.uint32)
+        
+        neutral_radius, _ = ConeGeometry.neutral_cone(
+            np.where(valid, columns['diameter'] / 2, 1.0), np.where(valid, columns['height'], 1.0),
+            np.where(valid, columns['thickness'], 0.0)
         )
-        back_btn.width = AdaptiveMetrics.adaptive_dp(120)
+        errors |= np.where(neutral_radius <= 0, InputValidator.ERR_THICKNESS_TOO_LARGE, 0).astype(np.uint32)
         
-        # Заголовок
-        title_layout = BoxLayout(orientation='vertical', spacing=AdaptiveMetrics.adaptive_dp(2))
-        title = Label(
-            text='[b]ПРОФЕССИОНАЛЬНЫЙ КАЛЬКУЛЯТОР[/b]',
-            font_size=AdaptiveMetrics.adaptive_sp(18),
-            markup=True,
-            color=AppConfig.COLORS['light']
-        )
-        subtitle = Label(
-            text=f'Версия {AppConfig.VERSION} • Интегрированный рендеринг',
-            font_size=AdaptiveMetrics.adaptive_sp(10),
-            color=AppConfig.COLORS['light'][:3] + (0.8,)
-        )
-        title_layout.add_widget(title)
-        title_layout.add_widget(subtitle)
+        columns['segments'] = np.where(np.isfinite(columns['segments']), columns['segments'], 0).astype(np.int64)
+        return columns, errors
+    
+    @staticmethod
+    def _validate_columns_python(diameter, height, cut_param, segments, cut_type, thickness, kerf):
+        """Запасной вариант validate_columns без NumPy"""
+        shifts = InputValidator.FIELD_SHIFTS
+        columns = {field: [] for field in shifts}
+        errors = []
         
-        # Инструменты
-        tools_layout = BoxLayout(
-            orientation='horizontal',
-            size_hint_x=None,
-            width=AdaptiveMetrics.adaptive_dp(120),
-            spacing=AdaptiveMetrics.adaptive_dp(5)
-        )
+        for row in zip(diameter, height, cut_param, segments, cut_type, thickness, kerf):
+            bits = 0
+            values = {}
+            for field, value in zip(('diameter', 'height', 'segments', 'thickness', 'kerf'),
+                                    (row[0], row[1], row[3], row[5], row[6])):
+                _, min_val, max_val = InputValidator._field_limits(field)
+                field_bits, values[field] = InputValidator._scalar_bits(value, min_val, max_val)
+                bits |= field_bits << shifts[field]
+            
+            row_cut_type = row[4]
+            if row_cut_type in InputValidator.CUT_TYPES:
+                height_ok = (bits >> shifts['height']) & 0xF == 0
+                _, min_val, max_val = InputValidator._field_limits(
+                    'cut_param', row_cut_type, values['height'] if height_ok else None
+                )
+            else:
+                bits |= InputValidator.ERR_CUT_TYPE
+                min_val = max_val = None
+            field_bits, values['cut_param'] = InputValidator._scalar_bits(row[2], min_val, max_val)
+            bits |= field_bits << shifts['cut_param']
+            
+            if bits == 0:
+                ratio = values['diameter'] / values['height']
+                if ratio > 10:
+                    bits |= InputValidator.ERR_RATIO_HIGH
+                if ratio < 0.1:
+                    bits |= InputValidator.ERR_RATIO_LOW
+                if ConeGeometry.neutral_cone(values['diameter'] / 2, values['height'], values['thickness'])[0] <= 0:
+                    bits |= InputValidator.ERR_THICKNESS_TOO_LARGE
+            
+            segments_value = values['segments']
+            values['segments'] = int(segments_value) if math.isfinite(segments_value) else 0
+            for field in columns:
+                columns[field].append(values[field])
+            errors.append(bits)
         
-        clear_btn = self.create_professional_button(
-            '🗑️ Очистить', 'danger', self.clear_all,
-            size_hint=(None, None)
+        return columns, errors
+    
+    @staticmethod
+    def describe_errors(bits, cut_type="slant", height=None):
+        """Тексты ошибок строки по битовой маске (те же, что у validate_cone_parameters)"""
+        bits = int(bits)
+        messages = []
+        shifts = InputValidator.FIELD_SHIFTS
+        if bits & InputValidator.ERR_CUT_TYPE:
+            messages.append(f"Тип среза: ожидается slant или parallel, получено '{cut_type}'")
+        
+        height_ok = not (bits >> shifts['height']) & 0xF
+        for field in ('diameter', 'height', 'cut_param', 'segments', 'thickness', 'kerf'):
+            field_bits = (bits >> shifts[field]) & 0xF
+            if not field_bits:
+                continue
+            field_name, min_val, max_val = InputValidator._field_limits(
+                field, cut_type, float(height) if height_ok and height is not None else None
+            )
+            if field_bits & InputValidator.ERR_NOT_NUMBER:
+                messages.append(f"{field_name}: должно быть числом")
+            elif field_bits & InputValidator.ERR_NOT_FINITE:
+                messages.append(f"{field_name}: недопустимое числовое значение")
+            elif field_bits & InputValidator.ERR_BELOW_MIN:
+                messages.append(f"{field_name}: должно быть не меньше {min_val}")
+            elif field_bits & InputValidator.ERR_ABOVE_MAX:
+                messages.append(f"{field_name}: должно быть не больше {max_val}")
+        
+        if bits & InputValidator.ERR_RATIO_HIGH:
+            messages.append("Слишком большое соотношение диаметра к высоте")
+        if bits & InputValidator.ERR_RATIO_LOW:
+            messages.append("Слишком маленькое соотношение диаметра к высоте")
+        if bits & InputValidator.ERR_THICKNESS_TOO_LARGE:
+            messages.append("Толщина материала слишком велика для диаметра конуса")
+        return messages
+
+# === ГЕОМЕТРИЯ КОНУСА ===
+class ConeGeometry:
+    """Расчет развертки конуса без зависимости от UI"""
+    
+    @staticmethod
+    def basic_parameters(diameter, height):
+        """Радиус, длина образующей и угол развертки"""
+        radius = diameter / 2
+        generatrix = math.sqrt(radius**2 + height**2)  # Образующая
+        angle = (radius / generatrix) * 360  # Угол развертки
+        return radius, generatrix, angle
+    
+    @staticmethod
+    def neutral_cone(radius, height, thickness=0.0, k_factor=None, reference=None):
+        """Конус нейтрального слоя листа толщины t (скаляры или ndarray)
+        
+        Заданный диаметр относится к наружной, внутренней или нейтральной поверхности
+        (AppConfig.GEOMETRY['diameter_reference']); нейтральный слой лежит на k·t от
+        внутренней. Смещение d по нормали к образующей уменьшает радиус основания на
+        d·g/H при той же плоскости основания: конус подобен исходному, угол развертки
+        не меняется. Возвращает (R_n, H_n).
+        """
+        k_factor = AppConfig.GEOMETRY['k_factor'] if k_factor is None else k_factor
+        reference = reference or AppConfig.GEOMETRY['diameter_reference']
+        if reference == 'outer':
+            offset = (1 - k_factor) * thickness
+        elif reference == 'inner':
+            offset = -k_factor * thickness
+        else:
+            offset = 0.0 * thickness
+        generatrix = (radius ** 2 + height ** 2) ** 0.5
+        neutral_radius = radius - offset * generatrix / height
+        return neutral_radius, height * neutral_radius / radius
+    
+    @staticmethod
+    def fabrication_info(thickness, kerf, neutral_radius, neutral_height):
+        """Параметры изготовления для результата и истории"""
+        return {
+            'thickness': thickness,
+            'kerf': kerf,
+            'k_factor': AppConfig.GEOMETRY['k_factor'],
+            'diameter_reference': AppConfig.GEOMETRY['diameter_reference'],
+            'neutral_diameter': 2 * neutral_radius,
+            'neutral_height': neutral_height
+        }
+    
+    @staticmethod
+    def slant_l_values(radius, height, alpha, segments, model=None):
+        """Длины для разметки при косом срезе (модель из AppConfig.GEOMETRY)"""
+        if (model or AppConfig.GEOMETRY['slant_cut_model']) == 'approximate':
+            return ConeGeometry.approximate_slant_l_values(math.hypot(radius, height), alpha, segments)
+        return ConeGeometry.exact_slant_l_values(radius, height, alpha, segments)
+    
+    @staticmethod
+    def approximate_slant_l_values(generatrix, alpha, segments):
+        """Прежняя приближенная формула g·(1 - α/90·|sin θ|)"""
+        if NUMPY_AVAILABLE and segments > AppConfig.LIMITS['high_res_segments']:
+            theta = np.radians(np.arange(segments + 1) * (360 / segments))
+            return (generatrix * (1 - (alpha / 90) * np.abs(np.sin(theta)))).tolist()
+        return [
+            generatrix * (1 - (alpha / 90) * abs(math.sin(math.radians((360 / segments) * i))))
+            for i in range(segments + 1)
+        ]
+    
+    @staticmethod
+    def exact_slant_l_values(radius, height, alpha, segments):
+        """Точное сечение плоскостью через диаметр основания под углом α (замкнутая форма)
+        
+        Плоскость z = y·tg α; образующая под азимутом θ пересекает ее на расстоянии
+        L = g·H·cos α / (H·cos α + R·sin α·max(sin θ, 0)) от вершины. На половине
+        с sin θ ≤ 0 плоскость проходит ниже основания, там L = g.
+        """
+        generatrix = math.hypot(radius, height)
+        a = math.radians(alpha)
+        h_cos = height * math.cos(a)
+        r_sin = radius * math.sin(a)
+        
+        if NUMPY_AVAILABLE and segments > AppConfig.LIMITS['high_res_segments']:
+            theta = np.radians(np.arange(segments + 1) * (360 / segments))
+            denominator = h_cos + r_sin * np.maximum(np.sin(theta), 0.0)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                L = np.where(denominator > 0, generatrix * h_cos / denominator, generatrix)
+            return L.tolist()
+        
+        L_values = []
+        for i in range(segments + 1):
+            denominator = h_cos + r_sin * max(math.sin(math.radians((360 / segments) * i)), 0.0)
+            L_values.append(generatrix * h_cos / denominator if denominator > 0 else generatrix)
+        return L_values
+    
+    @staticmethod
+    def kerf_note(kerf):
+        """Пояснение к длинам разметки при ширине реза (пустая строка без реза)
+        
+        L всегда номинальные - до кромки готовой детали, по ним размечают лист;
+        ширина реза смещает только траекторию резака (радиусы реза, CUT_PATH, G-код).
+        """
+        if not kerf:
+            return ""
+        return f"L - номинальные длины до кромки детали; траектория реза смещена наружу на {kerf / 2:.2f} мм"
+    
+    @staticmethod
+    def parallel_l_values(generatrix, height, h_cut, segments):
+        """Длины для разметки при параллельном срезе"""
+        L_cut = (generatrix / height) * h_cut
+        return [L_cut] * (segments + 1)
+    
+    @staticmethod
+    def slant_plane(alpha):
+        """Нормаль и точка плоскости косого среза z = y·tg α (через диаметр основания)"""
+        a = np.radians(np.asarray(alpha, dtype=float))
+        normal = np.stack([np.zeros_like(a), -np.sin(a), np.cos(a)], axis=-1)
+        return normal, np.zeros(normal.shape)
+    
+    @staticmethod
+    def plane_cut_lengths(radius, height, normal, point, segments):
+        """Общий решатель: пересечение образующих с произвольной плоскостью для пачки конусов
+        
+        Вершина в (0, 0, H), основание радиуса R в плоскости z = 0. Отрезается сторона
+        плоскости, куда смотрит нормаль; L - расстояние от вершины до входа образующей
+        в оставшуюся часть (0 - образующая целиком сохраняется, g - целиком срезана).
+        Формы: radius/height (m,), normal/point (m, 3) -> матрица (m, segments + 1).
+        """
+        radius = np.asarray(radius, dtype=float)[:, None]
+        height = np.asarray(height, dtype=float)[:, None]
+        normal = np.asarray(normal, dtype=float)
+        point = np.asarray(point, dtype=float)
+        generatrix = np.hypot(radius, height)
+        
+        theta = np.radians(np.arange(segments + 1) * (360 / segments))
+        # Единичные направления образующих от вершины к основанию (m, n)
+        dx = radius * np.cos(theta) / generatrix
+        dy = radius * np.sin(theta) / generatrix
+        dz = -height / generatrix
+        
+        # f(s) = n·(A + s·d - p0): знак стороны плоскости на расстоянии s от вершины
+        f0 = (normal[:, 2:3] * (height - point[:, 2:3])
+              - normal[:, 0:1] * point[:, 0:1] - normal[:, 1:2] * point[:, 1:2])
+        slope = normal[:, 0:1] * dx + normal[:, 1:2] * dy + normal[:, 2:3] * dz
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            crossing = np.maximum(f0, 0.0) / -slope
+        L = np.where(slope < 0, np.minimum(crossing, generatrix),
+                     np.where(f0 < 0, 0.0, generatrix))
+        return L
+    
+    @staticmethod
+    def slant_l_values_batch(radius, height, alpha, segments, model=None):
+        """Длины косого среза для пачки конусов с одинаковым числом сегментов
+        
+        Возвращает матрицу (конусы × точки): ndarray при наличии NumPy, иначе список списков.
+        """
+        if not NUMPY_AVAILABLE:
+            return [ConeGeometry.slant_l_values(r, h, a, segments, model)
+                    for r, h, a in zip(radius, height, alpha)]
+        
+        if (model or AppConfig.GEOMETRY['slant_cut_model']) == 'approximate':
+            generatrix = np.hypot(np.asarray(radius, dtype=float), np.asarray(height, dtype=float))[:, None]
+            alpha = np.asarray(alpha, dtype=float)[:, None]
+            theta = np.radians(np.arange(segments + 1) * (360 / segments))
+            return generatrix * (1 - (alpha / 90) * np.abs(np.sin(theta)))
+        
+        normal, point = ConeGeometry.slant_plane(alpha)
+        return ConeGeometry.plane_cut_lengths(radius, height, normal, point, segments)
+    
+    @staticmethod
+    def frustum_development(radius, height, h_cut, kerf=0.0):
+        """Развертка усеченного конуса при параллельном срезе
+        
+        Срез проходит на расстоянии L = g·h/H от вершины по образующей (как в
+        parallel_l_values): развертка - кольцевой сектор между дугами L и g.
+        Дуги реза смещены наружу от детали на половину ширины реза.
+        """
+        generatrix = math.hypot(radius, height)
+        sector_angle = radius / generatrix * 360
+        inner_radius = generatrix / height * h_cut
+        width, blank_height = ConeGeometry.sector_extent(
+            generatrix + kerf / 2, max(inner_radius - kerf / 2, 0.0), sector_angle
         )
-        clear_btn.width = AdaptiveMetrics.adaptive_dp(100)
-        tools_layout.add_widget(clear_btn)
+        return {
+            'outer_radius': generatrix,
+            'inner_radius': inner_radius,
+            'sector_angle': sector_angle,
+            'slant_height': generatrix - inner_radius,
+            'top_radius': radius * inner_radius / generatrix,
+            'frustum_height': height * (1 - inner_radius / generatrix),
+            'kerf': kerf,
+            'cut_outer_radius': generatrix + kerf / 2,
+            'cut_inner_radius': max(inner_radius - kerf / 2, 0.0),
+            'blank_width': width,
+            'blank_height': blank_height
+        }
+    
+    @staticmethod
+    def frustum_development_batch(radius, height, h_cut, kerf=0.0):
+        """Развертки пачки усеченных конусов: словарь колонок (ndarray или списки)"""
+        if not NUMPY_AVAILABLE:
+            kerf = kerf if isinstance(kerf, (list, tuple)) else [kerf] * len(radius)
+            rows = [ConeGeometry.frustum_development(r, h, c, k)
+                    for r, h, c, k in zip(radius, height, h_cut, kerf)]
+            return {key: [row[key] for row in rows] for key in (rows[0] if rows else {})}
+        
+        radius = np.asarray(radius, dtype=float)
+        height = np.asarray(height, dtype=float)
+        kerf = np.broadcast_to(np.asarray(kerf, dtype=float), radius.shape)
+        generatrix = np.hypot(radius, height)
+        inner_radius = generatrix / height * np.asarray(h_cut, dtype=float)
+        sector_angle = radius / generatrix * 360
+        cut_outer = generatrix + kerf / 2
+        cut_inner = np.maximum(inner_radius - kerf / 2, 0.0)
+        width, blank_height = ConeGeometry.sector_extent(cut_outer, cut_inner, sector_angle)
+        return {
+            'outer_radius': generatrix,
+            'inner_radius': inner_radius,
+            'sector_angle': sector_angle,
+            'slant_height': generatrix - inner_radius,
+            'top_radius': radius * inner_radius / generatrix,
+            'frustum_height': height * (1 - inner_radius / generatrix),
+            'kerf': kerf,
+            'cut_outer_radius': cut_outer,
+            'cut_inner_radius': cut_inner,
+            'blank_width': width,
+            'blank_height': blank_height
+        }
+    
+    @staticmethod
+    def sector_extent(outer_radius, inner_radius, sector_angle):
+        """Габарит кольцевого сектора, симметричного оси X (скаляры или ndarray)
+        
+        Справа дуга доходит до g при θ = 0; слева край дают концы дуг (сектор меньше
+        360°), сверху - конец внешней дуги или сама дуга, если полуугол больше 90°.
+        """
+        if NUMPY_AVAILABLE and isinstance(outer_radius, np.ndarray):
+            half = np.radians(sector_angle) / 2
+            left = np.minimum(outer_radius * np.cos(half), inner_radius * np.cos(half))
+            top = np.where(half >= math.pi / 2, outer_radius, outer_radius * np.sin(half))
+        else:
+            half = math.radians(sector_angle) / 2
+            left = min(outer_radius * math.cos(half), inner_radius * math.cos(half))
+            top = outer_radius if half >= math.pi / 2 else outer_radius * math.sin(half)
+        return outer_radius - left, 2 * top
+    
+    @staticmethod
+    def arc_polyline(radius, sector_angle, points):
+        """Дуга развертки ломаной из points точек (сектор симметричен оси X)"""
+        points = max(2, int(points))
+        start = -math.radians(sector_angle) / 2
+        step = math.radians(sector_angle) / (points - 1)
+        return [(radius * math.cos(start + i * step), radius * math.sin(start + i * step)) for i in range(points)]
+    
+    @staticmethod
+    def arc_polylines_batch(radius, sector_angle, points):
+        """Дуги для пачки деталей: ndarray (детали × точки × 2)"""
+        if not NUMPY_AVAILABLE:
+            return [ConeGeometry.arc_polyline(r, a, points) for r, a in zip(radius, sector_angle)]
+        
+        radius = np.asarray(radius, dtype=float)[:, None]
+        half = np.radians(np.asarray(sector_angle, dtype=float))[:, None] / 2
+        angles = -half + 2 * half * np.linspace(0.0, 1.0, max(2, int(points)))[None, :]
+        return np.stack([radius * np.cos(angles), radius * np.sin(angles)], axis=-1)
+    
+    @staticmethod
+    def cut_curve_points(L_values, sector_angle):
+        """Точки линии среза на развертке: образующая i лежит под углом φ·i/n"""
+        n = max(1, len(L_values) - 1)
+        start = -math.radians(sector_angle) / 2
+        step = math.radians(sector_angle) / n
+        return [(L * math.cos(start + i * step), L * math.sin(start + i * step)) for i, L in enumerate(L_values)]
+    
+    @staticmethod
+    def development_outline(outer_radius, sector_angle, L_values=None, inner_radius=0.0, points=181, kerf=0.0):
+        """Замкнутый контур заготовки: внешняя дуга, затем линия среза в обратном порядке
+        
+        Линия среза - по L_values (косой срез) или дуга inner_radius (усеченный конус).
+        При kerf > 0 возвращается траектория реза: контур, смещенный наружу на kerf/2.
+        """
+        outline = ConeGeometry.arc_polyline(outer_radius, sector_angle, points)
+        if L_values is not None:
+            cut = ConeGeometry.cut_curve_points(L_values, sector_angle)
+        elif inner_radius > 0:
+            cut = ConeGeometry.arc_polyline(inner_radius, sector_angle, points)
+        else:
+            cut = [(0.0, 0.0)]
+        outline.extend(reversed(cut))
+        outline.append(outline[0])
+        if kerf > 0:
+            return ConeGeometry.offset_polygon(outline, kerf / 2)
+        return outline
+    
+    @staticmethod
+    def part_outline(record, points=181, max_cut_points=None):
+        """Контур детали из результата расчета (без смещения на рез)
+        
+        При косом срезе полоса между линией среза и дугой основания там, где срез
+        проходит по основанию (L = g), имеет нулевую ширину: контур строится только
+        по участку с материалом, иначе вырожденная полоса закрывает место внутри детали
+        и дает двойной проход резака по дуге. max_cut_points прореживает линию среза.
+        """
+        development = record.get('development')
+        if development:
+            return ConeGeometry.development_outline(
+                development['outer_radius'], development['sector_angle'],
+                inner_radius=development['inner_radius'], points=points
+            )
         
-        header.add_widget(back_btn)
-        header.add_widget(title_layout)
-        header.add_widget(tools_layout)
+        L_values = record['L_values']
+        generatrix, sector_angle = record['generatrix'], record['angle']
+        n = len(L_values) - 1
+        band = [i for i, L in enumerate(L_values) if L < generatrix * (1 - 1e-9)]
+        if not band:
+            raise ValueError("Развертка без материала: срез проходит по основанию")
+        first, last = max(band[0] - 1, 0), min(band[-1] + 1, n)
+        
+        start = math.radians(sector_angle) * (first / n - 0.5)
+        span = math.radians(sector_angle) * (last - first) / n
+        arc = [(generatrix * math.cos(start + span * k / (points - 1)),
+                generatrix * math.sin(start + span * k / (points - 1))) for k in range(points)]
+        cut = ConeGeometry.cut_curve_points(L_values, sector_angle)[first:last + 1]
+        if max_cut_points and len(cut) > max_cut_points:
+            stride = -(-len(cut) // max_cut_points)
+            cut = cut[:-1:stride] + cut[-1:]
+        return arc + cut[::-1] + arc[:1]
+    
+    @staticmethod
+    def outline_edges(outline, points):
+        """Прямые (радиальные) края контура part_outline: ((у среза, у дуги) в начале дуги, то же в конце)
         
-        return header
+        points - число точек дуги, с которым строился контур.
+        """
+        return (outline[-2], outline[0]), (outline[points], outline[points - 1])
     
-    def _create_cut_type_card(self):
-        """Карточка выбора типа среза"""
-        card = BoxLayout(
-            orientation='vertical',
-            size_hint_y=None,
-            height=AdaptiveMetrics.adaptive_dp(100),
+    @staticmethod
+    def marking_lines(record, max_lines=None):
+        """Линии разметки на развертке: по образующим от линии среза до дуги основания"""
+        L_values = record['L_values']
+        generatrix, sector_angle = record['generatrix'], record['angle']
+        n = max(1, len(L_values) - 1)
+        stride = -(-len(L_values) // max_lines) if max_lines and len(L_values) > max_lines else 1
+        start = -math.radians(sector_angle) / 2
+        step = math.radians(sector_angle) / n
+        lines = []
+        for i in range(0, len(L_values), stride):
+            L = L_values[i]
+            if L >= generatrix * (1 - 1e-9):
+                continue
+            c, s = math.cos(start + i * step), math.sin(start + i * step)
+            lines.append(((L * c, L * s), (generatrix * c, generatrix * s)))
+        return lines
+    
+    @staticmethod
+    def transform_points(points, rotation=0.0, mirrored=False, dx=0.0, dy=0.0):
+        """Отражение относительно оси X, поворот на rotation° и перенос"""
+        a = math.radians(rotation)
+        c, s = math.cos(a), math.sin(a)
+        sign = -1.0 if mirrored else 1.0
+        return [(c * x - s * sign * y + dx, s * x + c * sign * y + dy) for x, y in points]
+    
+    @staticmethod
+    def offset_polygon(points, distance, miter_limit=4.0):
+        """Эквидистанта замкнутого контура наружу на distance (срез углов по miter_limit)"""
+        ring = []
+        for x, y in points:
+            if not ring or math.hypot(x - ring[-1][0], y - ring[-1][1]) > 1e-9:
+                ring.append((x, y))
+        if len(ring) > 1 and math.hypot(ring[0][0] - ring[-1][0], ring[0][1] - ring[-1][1]) <= 1e-9:
+            ring.pop()
+        count = len(ring)
+        if count < 3:
+            return list(points)
+        
+        # Наружная нормаль - справа от ребра для обхода против часовой стрелки
+        area = sum(ring[i - 1][0] * ring[i][1] - ring[i][0] * ring[i - 1][1] for i in range(count))
+        side = 1.0 if area > 0 else -1.0
+        normals = []
+        for i in range(count):
+            (x0, y0), (x1, y1) = ring[i], ring[(i + 1) % count]
+            length = math.hypot(x1 - x0, y1 - y0)
+            normals.append((side * (y1 - y0) / length, side * (x0 - x1) / length))
+        
+        result = []
+        for i in range(count):
+            (ax, ay), (bx, by) = normals[i - 1], normals[i]
+            x, y = ring[i]
+            cos_turn = ax * bx + ay * by
+            if 1 + cos_turn > 2 / miter_limit ** 2:
+                scale = distance / (1 + cos_turn)
+                result.append((x + (ax + bx) * scale, y + (ay + by) * scale))
+            else:
+                # Острый угол: вместо длинного уса - две точки по нормалям ребер
+                result.append((x + ax * distance, y + ay * distance))
+                result.append((x + bx * distance, y + by * distance))
+        result.append(result[0])
+        return result
+    
+    @staticmethod
+    def calculate(validated_data, cut_type):
+        """Полный расчет развертки по проверенным параметрам
+        
+        Развертка строится по нейтральному слою листа; плоскости среза заданы
+        относительно номинального конуса (общее основание).
+        """
+        D = validated_data['diameter']
+        H = validated_data['height']
+        cut_param = validated_data['cut_param']
+        n = validated_data['segments']
+        thickness = validated_data.get('thickness', 0.0)
+        kerf = validated_data.get('kerf', 0.0)
+        
+        R, _, angle = ConeGeometry.basic_parameters(D, H)
+        R_n, H_n = ConeGeometry.neutral_cone(R, H, thickness)
+        generatrix = math.hypot(R_n, H_n)
+        
+        development = None
+        if cut_type == "slant":
+            L_values = ConeGeometry.slant_l_values(R_n, H_n, cut_param, n)
+            cut_info = f"Угол косого среза: {cut_param}°"
+        else:
+            h_cut = cut_param if cut_param <= H else H * 0.7
+            # Вершина нейтрального конуса ниже на H - H_n, плоскость среза та же
+            h_neutral = min(max(h_cut - (H - H_n), 0.0), H_n)
+            L_values = ConeGeometry.parallel_l_values(generatrix, H_n, h_neutral, n)
+            development = ConeGeometry.frustum_development(R_n, H_n, h_neutral, kerf)
+            cut_info = f"Высота параллельного среза: {h_cut:.1f} мм"
+        
+        return {
+            'diameter': D,
+            'height': H,
+            'radius': R,
+            'generatrix': generatrix,
+            'angle': angle,
+            'cut_type': cut_type,
+            'cut_param': cut_param,
+            'segments': n,
+            'thickness': thickness,
+            'kerf': kerf,
+            'L_values': L_values,
+            'development': development,
+            'fabrication': ConeGeometry.fabrication_info(thickness, kerf, R_n, H_n),
+            'cut_info': cut_info
+        }
+    
+    @staticmethod
+    def calculate_columns(columns, cut_types):
+        """Расчет пачки проверенных заданий по колонкам (результаты как у calculate)
+        
+        Строки группируются по (тип среза, сегменты): длины и развертки считаются
+        матрицами, поэтому пересчет пачки для другой толщины листа или ширины реза -
+        это замена колонки и повторный вызов, без повторного ввода заданий.
+        """
+        count = len(cut_types)
+        fields = InputValidator.FIELD_SHIFTS
+        if not NUMPY_AVAILABLE:
+            return [ConeGeometry.calculate({field: columns[field][i] for field in fields}, cut_types[i])
+                    for i in range(count)]
+        
+        D = np.asarray(columns['diameter'], dtype=float)
+        H = np.asarray(columns['height'], dtype=float)
+        cut = np.asarray(columns['cut_param'], dtype=float)
+        segments = np.asarray(columns['segments'], dtype=np.int64)
+        thickness = np.asarray(columns.get('thickness', np.zeros(count)), dtype=float)
+        kerf = np.asarray(columns.get('kerf', np.zeros(count)), dtype=float)
+        
+        R = D / 2
+        angle = R / np.hypot(R, H) * 360
+        R_n, H_n = ConeGeometry.neutral_cone(R, H, thickness)
+        generatrix = np.hypot(R_n, H_n)
+        slant = np.asarray(cut_types) == "slant"
+        h_cut = np.where(cut <= H, cut, H * 0.7)
+        h_neutral = np.clip(h_cut - (H - H_n), 0.0, H_n)
+        
+        # Скаляры в числа Python одним проходом по колонке
+        D_py, H_py, cut_py, segments_py = D.tolist(), H.tolist(), cut.tolist(), segments.tolist()
+        R_py, generatrix_py, angle_py = R.tolist(), generatrix.tolist(), angle.tolist()
+        thickness_py, kerf_py, h_cut_py = thickness.tolist(), kerf.tolist(), h_cut.tolist()
+        neutral_radius_py, H_n_py = R_n.tolist(), H_n.tolist()
+        
+        results = [None] * count
+        keys = segments * 2 + slant
+        for key in np.unique(keys):
+            idx = np.nonzero(keys == key)[0]
+            n = int(key) // 2
+            developments = None
+            if key % 2:
+                L_matrix = ConeGeometry.slant_l_values_batch(R_n[idx], H_n[idx], cut[idx], n)
+            else:
+                L_cut = generatrix[idx] / H_n[idx] * h_neutral[idx]
+                L_matrix = np.repeat(L_cut[:, None], n + 1, axis=1)
+                batch = ConeGeometry.frustum_development_batch(R_n[idx], H_n[idx], h_neutral[idx], kerf[idx])
+                batch = {name: values.tolist() for name, values in batch.items()}
+                developments = [{name: values[j] for name, values in batch.items()} for j in range(len(idx))]
+            
+            for j, (i, L_values) in enumerate(zip(idx.tolist(), L_matrix.tolist())):
+                if key % 2:
+                    cut_info = f"Угол косого среза: {cut_py[i]}°"
+                else:
+                    cut_info = f"Высота параллельного среза: {h_cut_py[i]:.1f} мм"
+                results[i] = {
+                    'diameter': D_py[i],
+                    'height': H_py[i],
+                    'radius': R_py[i],
+                    'generatrix': generatrix_py[i],
+                    'angle': angle_py[i],
+                    'cut_type': cut_types[i],
+                    'cut_param': cut_py[i],
+                    'segments': segments_py[i],
+                    'thickness': thickness_py[i],
+                    'kerf': kerf_py[i],
+                    'L_values': L_values,
+                    'development': developments[j] if developments else None,
+                    'fabrication': ConeGeometry.fabrication_info(
+                        thickness_py[i], kerf_py[i], neutral_radius_py[i], H_n_py[i]
+                    ),
+                    'cut_info': cut_info
+                }
+        return results
+
+# === ХРАНИЛИЩЕ ИСТОРИИ ===
+class PackedArray:
+    """Компактная запись массива чисел для JSON-хранилища
+    
+    Значения упаковываются в float64 или float32 (little-endian), при delta
+    соседние значения XOR-ятся побитово (без потерь, в отличие от разностей
+    float), затем сжимаются zlib и кодируются base64. Метаданные хранятся рядом:
+    {'codec': 'f8+xor+zlib', 'count': n, 'data': '...'}.
+    """
+    
+    TYPECODES = {'f8': ('d', 'Q'), 'f4': ('f', 'I')}
+    
+    @staticmethod
+    def encode(values, dtype=None, delta=None, compress=None):
+        """Упакованный массив с настройками из AppConfig.HISTORY по умолчанию"""
+        config = AppConfig.HISTORY
+        dtype = dtype or config['l_values_dtype']
+        delta = config['l_values_delta'] if delta is None else delta
+        compress = config['l_values_compress'] if compress is None else compress
+        float_code, int_code = PackedArray.TYPECODES[dtype]
+        
+        packed = array(float_code, values)
+        if sys.byteorder == 'big':
+            packed.byteswap()
+        data = packed.tobytes()
+        if delta and len(values) > 1:
+            if NUMPY_AVAILABLE:
+                bits = np.frombuffer(data, dtype=f'<u{dtype[1]}')
+                data = np.concatenate((bits[:1], bits[1:] ^ bits[:-1])).tobytes()
+            else:
+                bits = array(int_code)
+                bits.frombytes(data)
+                data = array(int_code, [bits[0]] + [bits[i] ^ bits[i - 1] for i in range(1, len(bits))]).tobytes()
+        if compress:
+            data = zlib.compress(data, 6)
+        
+        codec = '+'.join([dtype] + (['xor'] if delta else []) + (['zlib'] if compress else []))
+        return {'codec': codec, 'count': len(values), 'data': base64.b64encode(data).decode('ascii')}
+    
+    @staticmethod
+    def decode(packed):
+        """Список float из упакованного массива"""
+        dtype, *steps = packed['codec'].split('+')
+        float_code, int_code = PackedArray.TYPECODES[dtype]
+        data = base64.b64decode(packed['data'])
+        if 'zlib' in steps:
+            data = zlib.decompress(data)
+        if 'xor' in steps and packed['count'] > 1:
+            if NUMPY_AVAILABLE:
+                data = np.bitwise_xor.accumulate(np.frombuffer(data, dtype=f'<u{dtype[1]}')).tobytes()
+            else:
+                bits = array(int_code)
+                bits.frombytes(data)
+                if sys.byteorder == 'big':
+                    bits.byteswap()
+                for i in range(1, len(bits)):
+                    bits[i] ^= bits[i - 1]
+                if sys.byteorder == 'big':
+                    bits.byteswap()
+                data = bits.tobytes()
+        
+        values = array(float_code)
+        values.frombytes(data)
+        if sys.byteorder == 'big':
+            values.byteswap()
+        return values.tolist()
+
+
+class HistoryEntry(dict):
+    """Запись истории: L-значения декодируются при первом обращении
+    
+    Список истории строится без распаковки массивов; entry['L_values'] и
+    entry.get('L_values') распаковывают их один раз и запоминают в записи.
+    """
+    __slots__ = ('_packed',)
+    
+    def __init__(self, fields, packed=None):
+        super().__init__(fields)
+        self._packed = packed
+    
+    def __missing__(self, key):
+        if key == 'L_values' and self._packed is not None:
+            values = self['L_values'] = PackedArray.decode(self._packed)
+            return values
+        raise KeyError(key)
+    
+    def __contains__(self, key):
+        return super().__contains__(key) or (key == 'L_values' and self._packed is not None)
+    
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+
+class HistoryStore:
+    """История расчетов поверх JsonStore
+    
+    Запись истории - только время и ссылка на результат. Результаты хранятся
+    по одному разу под ключом из нормализованных параметров, поэтому повторный
+    расчет тех же параметров добавляет в файл лишь ссылку, а не L-значения.
+    L-значения результатов хранятся упакованными (PackedArray).
+    
+    Изменения пишутся в файл отложенно (write-behind): фоновый поток сбрасывает
+    их не позже flush_interval после первого изменения или сразу по набору
+    flush_batch изменений. flush() пишет немедленно; закрытие приложения,
+    atexit и SIGTERM сбрасывают все открытые хранилища. Окно потери остается
+    только при SIGKILL и сбое питания.
+    
+    Подписчики (subscribe) получают события изменений listener(event, entries):
+    'appended' - новые записи в конце, 'pruned' - удаленные старые записи
+    (у каждой есть 'timestamp'), 'cleared' - история очищена (или перестроена
+    импортом, тогда следом 'appended' со всеми записями). События приходят
+    в потоке, изменившем историю.
+    """
+    
+    # Поля результата в порядке ConeGeometry.calculate
+    RESULT_FIELDS = ('diameter', 'height', 'radius', 'generatrix', 'angle', 'cut_type', 'cut_param',
+                     'segments', 'thickness', 'kerf', 'L_values', 'development', 'fabrication', 'cut_info')
+    
+    # Открытые хранилища для сброса при завершении процесса
+    _open_stores = weakref.WeakSet()
+    
+    def __init__(self, filename=None):
+        self.filename = filename or AppConfig.HISTORY['json_file']
+        self._refs, self._results = [], {}
+        self._entries = None
+        # _lock - данные в памяти, _write_lock - файл пишет один поток
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._write_lock = threading.Lock()
+        self._pending = 0
+        self._dirty_since = None
+        self._writer = None
+        self.flush_stats = {'flushes': 0, 'changes': 0, 'last_ms': None, 'max_ms': 0.0}
+        self._listeners = []
+        HistoryStore._open_stores.add(self)
+        self._read()
+    
+    def _read(self):
+        """Загрузка истории из файла JsonStore"""
+        json_store = JsonStore(self.filename)
+        if json_store.exists('history'):
+            data = json_store.get('history')
+            self._results = data.get('results', {})
+            if any('L_values' in ref for ref in data['calculations']):
+                # Файл прежнего формата: полные записи переводятся в ссылки
+                for entry in data['calculations']:
+                    self._add(entry)
+                self._save(now=True)
+            else:
+                self._refs = data['calculations']
+                unpacked = [result for result in self._results.values() if isinstance(result.get('L_values'), list)]
+                for result in unpacked:
+                    result['L_values'] = PackedArray.encode(result['L_values'])
+                if unpacked:
+                    self._save(now=True)
+    
+    @staticmethod
+    def open(filename=None):
+        """Хранилище по расширению файла (.db/.sqlite - общее) или по AppConfig.HISTORY['backend']
+        
+        Общее хранилище по умолчанию при первом открытии забирает историю из JSON-файла.
+        """
+        config = AppConfig.HISTORY
+        if filename is None and config['backend'] != 'sqlite':
+            return HistoryStore()
+        if filename is not None and not filename.lower().endswith(('.db', '.sqlite')):
+            return HistoryStore(filename)
+        
+        shared = SharedHistoryStore(filename)
+        if filename is None:
+            shared.migrate(config['json_file'])
+        return shared
+    
+    @staticmethod
+    def result_key(params, cut_type=None):
+        """Ключ результата: хэш нормализованных параметров и настроек геометрии"""
+        normalized = [
+            cut_type or params['cut_type'], float(params['diameter']), float(params['height']),
+            float(params['cut_param']), int(params['segments']),
+            float(params.get('thickness') or 0.0), float(params.get('kerf') or 0.0),
+            AppConfig.GEOMETRY['slant_cut_model'], AppConfig.GEOMETRY['k_factor'],
+            AppConfig.GEOMETRY['diameter_reference']
+        ]
+        return hashlib.sha256(json.dumps(normalized).encode('ascii')).hexdigest()[:32]
+    
+    def _entry(self, ref):
+        """Запись истории: общий результат и время расчета, L-значения - лениво"""
+        result = self._results[ref['result']]
+        fields = {field: value for field, value in result.items() if field != 'L_values'}
+        fields['date'], fields['timestamp'] = ref['date'], ref['timestamp']
+        return HistoryEntry(fields, result.get('L_values'))
+    
+    @classmethod
+    def _result_blob(cls, entry):
+        """Поля результата записи с упакованными L-значениями"""
+        result = {field: entry[field] for field in cls.RESULT_FIELDS if field in entry}
+        if result.get('L_values') is not None:
+            result['L_values'] = PackedArray.encode(result['L_values'])
+        return result
+    
+    def _add(self, entry, key=None):
+        """Ссылка в конец истории; результат сохраняется, только если его еще нет"""
+        key = key or HistoryStore.result_key(entry)
+        if key not in self._results:
+            self._results[key] = self._result_blob(entry)
+        ref = {'result': key, 'timestamp': entry.get('timestamp'), 'date': entry.get('date')}
+        self._refs.append(ref)
+        if self._entries is not None:
+            self._entries.append(self._entry(ref))
+    
+    def _trim(self):
+        """Ограничение размера истории и удаление результатов без ссылок; возвращает удаленные ссылки"""
+        limit = AppConfig.LIMITS['max_history_items']
+        if len(self._refs) <= limit:
+            return []
+        removed = self._refs[:-limit]
+        del self._refs[:-limit]
+        if self._entries is not None:
+            del self._entries[:-limit]
+        used = {ref['result'] for ref in self._refs}
+        for key in [key for key in self._results if key not in used]:
+            del self._results[key]
+        return removed
+    
+    def subscribe(self, listener):
+        """Подписка на события изменений истории"""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+    
+    def unsubscribe(self, listener):
+        """Отписка от событий изменений"""
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+    
+    def _publish(self, event, entries=()):
+        """Рассылка события подписчикам; ошибка подписчика не прерывает запись"""
+        for listener in list(self._listeners):
+            try:
+                listener(event, list(entries))
+            except Exception as e:
+                error_logger.log_error(e, "HistoryStore._publish")
+    
+    def _save(self, changes=1, now=False):
+        """Учет изменений; запись файла - фоновым потоком или сразу (now)"""
+        config = AppConfig.HISTORY
+        with self._changed:
+            self._pending += changes
+            if self._dirty_since is None:
+                self._dirty_since = time.monotonic()
+            now = now or not config['write_behind']
+            if not now:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_loop, name='cone-history', daemon=True)
+                    self._writer.start()
+                elif self._pending >= config['flush_batch']:
+                    self._changed.notify()
+        if now:
+            self.flush()
+    
+    def _write_loop(self):
+        """Фоновый сброс: по возрасту первого изменения или по числу изменений"""
+        config = AppConfig.HISTORY
+        while True:
+            with self._changed:
+                while self._pending:
+                    wait = self._dirty_since + config['flush_interval'] - time.monotonic()
+                    if wait <= 0 or self._pending >= config['flush_batch']:
+                        break
+                    self._changed.wait(wait)
+                if not self._pending:
+                    self._writer = None
+                    return
+            try:
+                self.flush()
+            except Exception as e:
+                error_logger.log_error(e, "HistoryStore._write_loop")
+                # Повтор через интервал, а не в цикле (например, при заполненном диске)
+                time.sleep(config['flush_interval'])
+    
+    def flush(self):
+        """Немедленная запись накопленных изменений; возвращает их число"""
+        with self._write_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                # Снимок: записи и результаты после создания не изменяются
+                refs, results = list(self._refs), dict(self._results)
+                changes, self._pending, self._dirty_since = self._pending, 0, None
+            
+            write_start = time.perf_counter()
+            try:
+                # Формат JsonStore, но с атомарной заменой файла
+                with BackgroundIO.atomic_open(self.filename) as f:
+                    json.dump({'history': {'calculations': refs, 'results': results}}, f)
+            except BaseException:
+                with self._lock:
+                    self._pending += changes
+                    if self._dirty_since is None:
+                        self._dirty_since = time.monotonic()
+                raise
+            elapsed = time.perf_counter() - write_start
+        
+        stats = self.flush_stats
+        stats['flushes'] += 1
+        stats['changes'] += changes
+        stats['last_ms'] = elapsed * 1000
+        stats['max_ms'] = max(stats['max_ms'], elapsed * 1000)
+        performance_monitor.record_latency('history_write', elapsed)
+        return changes
+    
+    @staticmethod
+    def _exit_on_signal(signum, frame):
+        """SIGTERM - обычный выход: atexit сбрасывает хранилища
+        
+        Сброс не выполняется в самом обработчике: сигнал может прийти, пока главный
+        поток держит блокировку хранилища. SystemExit раскручивает стек и освобождает ее.
+        """
+        sys.exit(128 + signum)
+    
+    def close(self):
+        """Сброс изменений; после закрытия хранилище не сбрасывается при завершении процесса"""
+        self.flush()
+        HistoryStore._open_stores.discard(self)
+    
+    @classmethod
+    def flush_all(cls):
+        """Сброс всех открытых хранилищ (закрытие приложения, atexit)"""
+        for history in list(cls._open_stores):
+            try:
+                history.flush()
+            except Exception as e:
+                error_logger.log_error(e, "HistoryStore.flush_all")
+    
+    def load(self):
+        """Все записи истории (от старых к новым); результаты общие для повторов"""
+        if self._entries is None:
+            self._entries = [self._entry(ref) for ref in self._refs]
+        return self._entries
+    
+    def cached_result(self, params, cut_type):
+        """Сохраненный результат расчета с теми же параметрами или None"""
+        result = self._results.get(HistoryStore.result_key(params, cut_type))
+        if result is None or any(field not in result for field in self.RESULT_FIELDS):
+            return None
+        return {**result, 'L_values': PackedArray.decode(result['L_values'])}
+    
+    def is_latest(self, entry):
+        """Последняя запись истории - тот же результат"""
+        return bool(self._refs) and self._refs[-1]['result'] == HistoryStore.result_key(entry)
+    
+    def stats(self):
+        """Число ссылок, уникальных результатов и еще не записанных изменений"""
+        return {'entries': len(self._refs), 'results': len(self._results), 'pending': self._pending}
+    
+    def append(self, entry):
+        """Добавление записи с ограничением размера истории"""
+        with self._lock:
+            self._add(entry)
+            removed = self._trim()
+            added = self._entry(self._refs[-1]) if self._entries is None else self._entries[-1]
+        self._save()
+        if self._listeners:
+            self._publish('appended', [added])
+            if removed:
+                self._publish('pruned', removed)
+    
+    def clear(self):
+        """Удаление всех записей"""
+        with self._lock:
+            self._refs, self._results, self._entries = [], {}, None
+        self._save()
+        self._publish('cleared')
+    
+    @staticmethod
+    def entry_key(entry):
+        """Ключ записи для отсева повторов при импорте: время и результат"""
+        return entry.get('timestamp'), HistoryStore.result_key(entry)
+    
+    @staticmethod
+    def _newest(entries, known, limit):
+        """Не больше limit самых новых записей потока, которых нет в known
+        
+        В памяти - только отобранные записи. Возвращает ([(запись, ключ результата)]
+        от старых к новым, повторов); записи с одинаковым временем - в порядке потока.
+        """
+        newest, inside, duplicates = [], set(), 0
+        for order, entry in enumerate(entries):
+            timestamp, key = HistoryStore.entry_key(entry)
+            if (timestamp, key) in known or (timestamp, key) in inside:
+                duplicates += 1
+                continue
+            item = (timestamp or '', order, entry, key)
+            if len(newest) >= limit:
+                if not newest or item < newest[0]:
+                    continue
+                _, _, dropped, dropped_key = heapq.heapreplace(newest, item)
+                inside.discard((dropped.get('timestamp'), dropped_key))
+            else:
+                heapq.heappush(newest, item)
+            inside.add((timestamp, key))
+        return [(entry, key) for _, _, entry, key in sorted(newest)], duplicates
+    
+    def extend(self, entries):
+        """Импорт потока записей с объединением по времени
+        
+        Импортированные записи встают среди имеющихся по timestamp, после чего
+        в истории остаются max_history_items самых новых: старый архив не вытесняет
+        более новые расчеты, а из длинного архива попадают только последние
+        max_history_items записей. Записи, уже имеющиеся в истории, пропускаются;
+        импорт записывается сразу. Возвращает (добавлено в историю, повторов).
+        
+        Файл читается без блокировки: добавление расчетов и фоновая запись не ждут импорт.
+        """
+        limit = AppConfig.LIMITS['max_history_items']
+        with self._lock:
+            known = {(ref['timestamp'], ref['result']) for ref in self._refs}
+        imported, duplicates = HistoryStore._newest(entries, known, limit)
+        events = []
+        with self._lock:
+            previous = self._refs
+            # Записи, добавленные, пока читался файл, тоже повторы
+            present = {(ref['timestamp'], ref['result']) for ref in previous}
+            fresh_imported = [(entry, key) for entry, key in imported if (entry.get('timestamp'), key) not in present]
+            duplicates += len(imported) - len(fresh_imported)
+            imported = fresh_imported
+            fresh = [{'result': key, 'timestamp': entry.get('timestamp'), 'date': entry.get('date')}
+                     for entry, key in imported]
+            # Слияние сохраняет порядок своих записей; при равном времени прежние идут раньше
+            merged = list(heapq.merge(previous, fresh, key=lambda ref: ref['timestamp'] or ''))[-limit:]
+            kept = {id(ref) for ref in merged}
+            added = [(entry, ref) for (entry, _), ref in zip(imported, fresh) if id(ref) in kept]
+            pruned = [ref for ref in previous if id(ref) not in kept]
+            # Новые записи только в конце - подписчикам хватает 'appended' и 'pruned'
+            in_place = all(ref is added_ref for ref, (_, added_ref) in zip(merged[len(merged) - len(added):], added))
+            if added:
+                for entry, ref in added:
+                    if ref['result'] not in self._results:
+                        self._results[ref['result']] = self._result_blob(entry)
+                self._refs = merged
+                used = {ref['result'] for ref in merged}
+                for key in [key for key in self._results if key not in used]:
+                    del self._results[key]
+                # Записи событий - под блокировкой: append после нее не попадет в 'appended'
+                if self._entries is not None or self._listeners:
+                    self._entries = [self._entry(ref) for ref in merged]
+                    if in_place:
+                        events.append(('appended', self._entries[-len(added):]))
+                        if pruned:
+                            events.append(('pruned', pruned))
+                    else:
+                        events += [('cleared', []), ('appended', list(self._entries))]
+        self._save(max(len(added), 1), now=True)
+        for event, changed in events:
+            self._publish(event, changed)
+        return len(added), duplicates
+
+
+class SharedHistoryStore(HistoryStore):
+    """История в SQLite (WAL): один файл для нескольких окон и процессов
+    
+    Каждое изменение - транзакция BEGIN IMMEDIATE: писатели ждут друг друга на
+    блокировке SQLite (busy_timeout), читатели в режиме WAL не блокируются.
+    load() дочитывает только строки новее последней прочитанной; удаление
+    старых записей другими процессами видно по MIN(id), очистку и перестройку
+    истории импортом - по счетчику generation.
+    """
+    
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, data TEXT NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS history (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+        "result TEXT NOT NULL, timestamp TEXT, date TEXT)",
+        "CREATE INDEX IF NOT EXISTS history_result ON history (result)",
+        "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+        "INSERT OR IGNORE INTO meta VALUES ('generation', 0)",
+        "INSERT OR IGNORE INTO meta VALUES ('migrated', 0)"
+    )
+    
+    def __init__(self, filename=None):
+        self.write_latency = LatencyHistogram()
+        self._generation, self._ids = None, []
+        super().__init__(filename or AppConfig.HISTORY['shared_file'])
+    
+    def _read(self):
+        """Открытие базы и создание схемы; записи читает load()"""
+        # Соединение общее для UI-потока и фонового ввода-вывода (под self._lock)
+        self._db = sqlite3.connect(self.filename, timeout=AppConfig.HISTORY['busy_timeout'],
+                                   isolation_level=None, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')  # в WAL не теряет целостность при сбое
+        with self._transaction() as db:
+            for statement in self.SCHEMA:
+                db.execute(statement)
+    
+    @contextlib.contextmanager
+    def _snapshot(self):
+        """Транзакция чтения: все запросы видят один снимок WAL, писателей не блокирует"""
+        with self._lock:
+            self._db.execute('BEGIN')
+            try:
+                yield self._db
+            finally:
+                self._db.execute('COMMIT')
+    
+    @contextlib.contextmanager
+    def _transaction(self):
+        """Транзакция записи; задержка с учетом ожидания других процессов"""
+        with self._lock:
+            start = time.perf_counter()
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                yield self._db
+                self._db.execute('COMMIT')
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+            elapsed = time.perf_counter() - start
+        self.write_latency.record(elapsed)
+        performance_monitor.record_latency('history_write', elapsed)
+    
+    def _meta(self, name):
+        return self._db.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()[0]
+    
+    def migrate(self, json_filename):
+        """Однократный перенос истории из файла JsonStore"""
+        if self._meta('migrated') or not os.path.exists(json_filename):
+            return 0
+        legacy = HistoryStore(json_filename).load()
+        added, _ = self.extend(legacy)
+        with self._transaction() as db:
+            db.execute("UPDATE meta SET value = 1 WHERE name = 'migrated'")
+        error_logger.log_event(f"History migrated from {json_filename}: {added} entries")
+        return added
+    
+    @staticmethod
+    def _trim(db):
+        """Ограничение размера истории и удаление результатов без ссылок"""
+        row = db.execute('SELECT id FROM history ORDER BY id DESC LIMIT 1 OFFSET ?',
+                         (AppConfig.LIMITS['max_history_items'],)).fetchone()
+        if row is None:
+            return
+        keys = [key for key, in db.execute('SELECT DISTINCT result FROM history WHERE id <= ?', row)]
+        db.execute('DELETE FROM history WHERE id <= ?', row)
+        db.executemany('DELETE FROM results WHERE key = ? AND NOT EXISTS '
+                       '(SELECT 1 FROM history WHERE result = ?)', [(key, key) for key in keys])
+    
+    def _insert(self, db, entry, key):
+        db.execute('INSERT OR IGNORE INTO results VALUES (?, ?)', (key, json.dumps(self._result_blob(entry))))
+        db.execute('INSERT INTO history (result, timestamp, date) VALUES (?, ?, ?)',
+                   (key, entry.get('timestamp'), entry.get('date')))
+    
+    def load(self):
+        """Записи истории; повторный вызов дочитывает только новые строки
+        
+        Изменения, найденные при дочитывании (в том числе сделанные другими
+        процессами), рассылаются подписчикам. Все запросы - одна транзакция
+        чтения: удаление старых записей другим процессом не попадает между ними.
+        """
+        events = []
+        with self._snapshot():
+            generation = self._meta('generation')
+            # Прочитанное при первой загрузке - не изменение
+            first_load = self._entries is None
+            if first_load or generation != self._generation:
+                if not first_load:
+                    events.append(('cleared', []))
+                self._generation, self._ids, self._entries, self._results = generation, [], [], {}
+            elif self._ids:
+                # Записи, удаленные ограничением размера в любом процессе
+                first = self._db.execute('SELECT MIN(id) FROM history').fetchone()[0]
+                drop = len(self._ids) if first is None else bisect.bisect_left(self._ids, first)
+                if drop:
+                    events.append(('pruned', self._entries[:drop]))
+                del self._ids[:drop], self._entries[:drop]
+            
+            last = self._ids[-1] if self._ids else 0
+            rows = self._db.execute('SELECT id, result, timestamp, date FROM history WHERE id > ? ORDER BY id',
+                                    (last,)).fetchall()
+            missing = list({key for _, key, _, _ in rows if key not in self._results})
+            for start in range(0, len(missing), 500):
+                chunk = missing[start:start + 500]
+                query = f"SELECT key, data FROM results WHERE key IN ({','.join('?' * len(chunk))})"
+                for key, data in self._db.execute(query, chunk):
+                    self._results[key] = json.loads(data)
+            for row_id, key, timestamp, date in rows:
+                self._ids.append(row_id)
+                self._entries.append(self._entry({'result': key, 'timestamp': timestamp, 'date': date}))
+            if rows and not first_load:
+                events.append(('appended', self._entries[-len(rows):]))
+            entries = self._entries
+        for event, changed in events:
+            self._publish(event, changed)
+        return entries
+    
+    def cached_result(self, params, cut_type):
+        """Сохраненный результат расчета с теми же параметрами или None"""
+        with self._lock:
+            row = self._db.execute('SELECT data FROM results WHERE key = ?',
+                                   (HistoryStore.result_key(params, cut_type),)).fetchone()
+        if row is None:
+            return None
+        result = json.loads(row[0])
+        if any(field not in result for field in self.RESULT_FIELDS):
+            return None
+        result['L_values'] = PackedArray.decode(result['L_values'])
+        return result
+    
+    def is_latest(self, entry):
+        """Последняя запись истории (в любом процессе) - тот же результат"""
+        with self._lock:
+            row = self._db.execute('SELECT result FROM history ORDER BY id DESC LIMIT 1').fetchone()
+        return row is not None and row[0] == HistoryStore.result_key(entry)
+    
+    def stats(self):
+        """Число записей и результатов; изменения записываются сразу, очереди нет"""
+        with self._lock:
+            entries = self._db.execute('SELECT COUNT(*) FROM history').fetchone()[0]
+            results = self._db.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+        return {'entries': entries, 'results': results, 'pending': 0}
+    
+    def _notify(self):
+        """События своих изменений (и попутно чужих) - дочитыванием загруженного списка"""
+        if self._listeners and self._entries is not None:
+            self.load()
+    
+    def append(self, entry):
+        """Добавление записи одной транзакцией"""
+        key = HistoryStore.result_key(entry)
+        with self._transaction() as db:
+            self._insert(db, entry, key)
+            self._trim(db)
+        self._notify()
+    
+    def clear(self):
+        """Удаление всех записей во всех процессах"""
+        with self._transaction() as db:
+            db.execute('DELETE FROM history')
+            db.execute('DELETE FROM results')
+            db.execute("UPDATE meta SET value = value + 1 WHERE name = 'generation'")
+        self._notify()
+    
+    def flush(self):
+        """Изменения уже записаны транзакциями"""
+        return 0
+    
+    def extend(self, entries):
+        """Импорт потока записей с объединением по времени, как HistoryStore.extend
+        
+        Файл читается без блокировки базы; отобранные max_history_items записей
+        пишутся одной транзакцией. Если импорт встает среди имеющихся записей,
+        история переписывается по времени, а счетчик generation заставляет
+        другие процессы перечитать ее. Возвращает (добавлено в историю, повторов).
+        """
+        limit = AppConfig.LIMITS['max_history_items']
+        with self._lock:
+            known = set(self._db.execute('SELECT timestamp, result FROM history'))
+        imported, duplicates = HistoryStore._newest(entries, known, limit)
+        added = 0
+        if imported:
+            with self._transaction() as db:
+                # Другие процессы могли изменить историю, пока читался файл
+                local = db.execute('SELECT id, result, timestamp, date FROM history ORDER BY id').fetchall()
+                present = {(timestamp, key) for _, key, timestamp, _ in local}
+                fresh = [(entry, key) for entry, key in imported if (entry.get('timestamp'), key) not in present]
+                duplicates += len(imported) - len(fresh)
+                rows = [(None, key, entry.get('timestamp'), entry.get('date')) for entry, key in fresh]
+                merged = list(heapq.merge(local, rows, key=lambda row: row[2] or ''))[-limit:]
+                added = sum(1 for row in merged if row[0] is None)
+                if added:
+                    blobs = {key: entry for entry, key in fresh}
+                    db.executemany('INSERT OR IGNORE INTO results VALUES (?, ?)',
+                                   [(key, json.dumps(self._result_blob(blobs[key])))
+                                    for key in {row[1] for row in merged if row[0] is None}])
+                    if all(row[0] is None for row in merged[len(merged) - added:]):
+                        db.executemany('INSERT INTO history (result, timestamp, date) VALUES (?, ?, ?)',
+                                       [row[1:] for row in merged[len(merged) - added:]])
+                        self._trim(db)
+                    else:
+                        db.execute('DELETE FROM history')
+                        db.executemany('INSERT INTO history (result, timestamp, date) VALUES (?, ?, ?)',
+                                       [row[1:] for row in merged])
+                        db.execute('DELETE FROM results WHERE key NOT IN (SELECT result FROM history)')
+                        db.execute("UPDATE meta SET value = value + 1 WHERE name = 'generation'")
+        self._notify()
+        return added, duplicates
+    
+    def close(self):
+        """Закрытие соединения"""
+        super().close()
+        with self._lock:
+            self._db.close()
+
+# === ФОНОВЫЙ ВВОД-ВЫВОД ===
+class BackgroundIO:
+    """Очередь файловых операций вне UI-потока с возвратом результата через Clock"""
+    _instance = None
+    
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(BackgroundIO, cls).__new__(cls)
+            cls._instance._executor = None
+            cls._instance.pending = 0
+        return cls._instance
+    
+    def submit(self, func, *args, on_done=None, on_error=None):
+        """Запуск func(*args) в фоне; колбэки вызываются в UI-потоке"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=AppConfig.PERFORMANCE['io_workers'], thread_name_prefix='cone-io'
+            )
+        self.pending += 1
+        future = self._executor.submit(func, *args)
+        future.add_done_callback(lambda done: Clock.schedule_once(lambda dt: self._finish(done, on_done, on_error)))
+        return future
+    
+    def _finish(self, future, on_done, on_error):
+        """Доставка результата в UI-потоке"""
+        self.pending -= 1
+        error = future.exception()
+        try:
+            if error is None:
+                if on_done:
+                    on_done(future.result())
+            elif on_error:
+                on_error(error)
+            else:
+                error_logger.log_error(error, "BackgroundIO")
+        except Exception as e:
+            error_logger.log_error(e, "BackgroundIO._finish")
+    
+    def shutdown(self):
+        """Дождаться незавершенных записей (при закрытии приложения)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+    
+    @staticmethod
+    @contextlib.contextmanager
+    def atomic_open(filename, encoding='utf-8', binary=False):
+        """Запись во временный файл рядом с целевым и атомарная замена
+        
+        При ошибке или обрыве питания на месте остается прежний файл целиком,
+        а не наполовину записанный.
+        """
+        directory = os.path.dirname(os.path.abspath(filename))
+        fd, temp_path = tempfile.mkstemp(prefix=f'.{os.path.basename(filename)}.', suffix='.tmp', dir=directory)
+        try:
+            # mkstemp создает файл 0600; экспорт должен читаться как обычный файл
+            with contextlib.suppress(OSError):
+                os.chmod(temp_path, os.stat(filename).st_mode & 0o777 if os.path.exists(filename) else 0o644)
+            with (os.fdopen(fd, 'wb') if binary else os.fdopen(fd, 'w', encoding=encoding, newline='')) as f:
+                yield f
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, filename)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(temp_path)
+            raise
+
+# Фоновая запись файлов
+background_io = BackgroundIO()
+
+# Отложенные записи истории не теряются при обычном завершении процесса и необработанном исключении
+atexit.register(HistoryStore.flush_all)
+
+# По умолчанию SIGTERM (остановка службы, kill) завершает процесс без atexit
+if threading.current_thread() is threading.main_thread() and signal.getsignal(signal.SIGTERM) == signal.SIG_DFL:
+    signal.signal(signal.SIGTERM, HistoryStore._exit_on_signal)
+
+# === ПЕРЕНОС ИСТОРИИ ===
+class HistoryTransfer:
+    """Выгрузка и загрузка истории потоком: CSV, JSON Lines, Parquet (при наличии pyarrow)
+    
+    Записи читаются и пишутся пачками по BATCH, поэтому расход памяти
+    не зависит от размера архива.
+    """
+    
+    FORMATS = ('csv', 'jsonl', 'parquet')
+    BATCH = 10000
+    FIELDS = ('timestamp', 'date', 'diameter', 'height', 'cut_type', 'cut_param', 'segments',
+              'thickness', 'kerf', 'generatrix', 'angle', 'L_values', 'development', 'fabrication')
+    FLOAT_FIELDS = ('diameter', 'height', 'cut_param', 'thickness', 'kerf', 'generatrix', 'angle')
+    JSON_FIELDS = ('development', 'fabrication')
+    
+    # Один кодировщик на все записи: json.dumps с параметрами создает новый на каждый вызов
+    _encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+    
+    @staticmethod
+    def arrow():
+        """pyarrow и pyarrow.parquet; RuntimeError, если пакет не установлен"""
+        global pa, pq
+        if pq is None:
+            try:
+                import pyarrow
+                import pyarrow.parquet
+            except ImportError:
+                raise RuntimeError("Для Parquet требуется пакет pyarrow")
+            pa, pq = pyarrow, pyarrow.parquet
+        return pa, pq
+    
+    @staticmethod
+    def detect_format(path):
+        """Формат файла истории по расширению"""
+        extension = os.path.splitext(path or '')[1].lower()
+        if extension in ('.parquet', '.pq'):
+            return 'parquet'
+        return BatchProcessor.detect_format(path)
+    
+    @staticmethod
+    def select(entries, cut_type=None, since=None, until=None):
+        """Отбор записей по типу среза и интервалу дат (ISO, границы включительно)"""
+        for entry in entries:
+            timestamp = entry.get('timestamp') or ''
+            if cut_type and entry.get('cut_type') != cut_type:
+                continue
+            if since and timestamp < since:
+                continue
+            if until and timestamp[:len(until)] > until:
+                continue
+            yield entry
+    
+    @staticmethod
+    def _batches(entries):
+        """Пачки записей по BATCH"""
+        iterator = iter(entries)
+        while True:
+            batch = list(itertools.islice(iterator, HistoryTransfer.BATCH))
+            if not batch:
+                return
+            yield batch
+    
+    @staticmethod
+    def _reporting(entries, progress, errors=(), cancel=False):
+        """Поток записей с отчетом о ходе (ошибочные строки тоже считаются пройденными)
+        
+        При отмене поток обрывается, а с cancel=True - OperationCancelled.
+        """
+        for count, entry in enumerate(entries, 1):
+            if not progress.update(count + len(errors)):
+                if cancel:
+                    raise OperationCancelled()
+                return
+            yield entry
+    
+    @staticmethod
+    def _csv_row(entry):
+        """Строка CSV: L-значения через пробел без потери точности, словари - JSON"""
+        row = []
+        for field in HistoryTransfer.FIELDS:
+            value = entry.get(field)
+            if value is None:
+                row.append('')
+            elif field == 'L_values':
+                row.append(' '.join(map(repr, value)))
+            elif field in HistoryTransfer.JSON_FIELDS:
+                row.append(HistoryTransfer._encode(value))
+            else:
+                row.append(value)
+        return row
+    
+    @staticmethod
+    def _parquet_schema():
+        """Схема колонок Parquet"""
+        pa, _ = HistoryTransfer.arrow()
+        types = {'segments': pa.int64(), 'L_values': pa.list_(pa.float64())}
+        types.update((field, pa.float64()) for field in HistoryTransfer.FLOAT_FIELDS)
+        return pa.schema([(field, types.get(field, pa.string())) for field in HistoryTransfer.FIELDS])
+    
+    @staticmethod
+    def export(entries, filename, fmt=None, progress=None):
+        """Запись потока записей в файл (атомарно); возвращает число записей
+        
+        progress - ProgressReporter по записанным пачкам; при отмене OperationCancelled,
+        прежний файл остается на месте.
+        """
+        fmt = fmt or HistoryTransfer.detect_format(filename)
+        count = 0
+        if progress is not None:
+            if progress.total is None and hasattr(entries, '__len__'):
+                progress.total = len(entries)
+            entries = HistoryTransfer._reporting(entries, progress, cancel=True)
+        if fmt == 'parquet':
+            pa, pq = HistoryTransfer.arrow()
+            schema = HistoryTransfer._parquet_schema()
+            with BackgroundIO.atomic_open(filename, binary=True) as f:
+                writer = pq.ParquetWriter(f, schema)
+                for batch in HistoryTransfer._batches(entries):
+                    columns = {field: [entry.get(field) for entry in batch] for field in HistoryTransfer.FIELDS}
+                    for field in HistoryTransfer.JSON_FIELDS:
+                        columns[field] = [None if value is None else HistoryTransfer._encode(value)
+                                          for value in columns[field]]
+                    writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+                    count += len(batch)
+                writer.close()
+            return count
+        
+        with BackgroundIO.atomic_open(filename) as f:
+            if fmt == 'csv':
+                writer = csv.writer(f, lineterminator='\n')
+                writer.writerow(HistoryTransfer.FIELDS)
+                for batch in HistoryTransfer._batches(entries):
+                    writer.writerows(HistoryTransfer._csv_row(entry) for entry in batch)
+                    count += len(batch)
+            else:
+                encode = HistoryTransfer._encode
+                for batch in HistoryTransfer._batches(entries):
+                    f.write(''.join(
+                        encode({field: entry.get(field) for field in HistoryTransfer.FIELDS}) + '\n'
+                        for entry in batch
+                    ))
+                    count += len(batch)
+        return count
+    
+    @staticmethod
+    def _entry(row):
+        """Запись истории из строки файла; ValueError при неполных данных"""
+        if '_parse_error' in row:
+            raise ValueError(row['_parse_error'])
+        cut_type = row.get('cut_type')
+        if cut_type not in ('slant', 'parallel'):
+            raise ValueError(f"Тип среза: ожидается slant или parallel, получено '{cut_type}'")
+        
+        entry = {'cut_type': cut_type}
+        for field in HistoryTransfer.FLOAT_FIELDS:
+            value = row.get(field)
+            if value in (None, ''):
+                if field in ('thickness', 'kerf'):
+                    entry[field] = 0.0
+                    continue
+                raise ValueError(f"{field}: нет значения")
+            entry[field] = float(value)
+        entry['segments'] = int(float(row.get('segments') or 0))
+        
+        L_values = row.get('L_values')
+        if isinstance(L_values, str):
+            L_values = [float(value) for value in L_values.split()]
+        if not L_values or len(L_values) != entry['segments'] + 1:
+            raise ValueError("L_values: число значений не совпадает с числом сегментов")
+        entry['L_values'] = [float(value) for value in L_values]
+        
+        for field in HistoryTransfer.JSON_FIELDS:
+            value = row.get(field)
+            entry[field] = json.loads(value) if isinstance(value, str) and value else (value or None)
+        entry['timestamp'] = row.get('timestamp') or datetime.now().isoformat()
+        entry['date'] = row.get('date') or datetime.fromisoformat(entry['timestamp']).strftime("%d.%m.%Y %H:%M:%S")
+        return entry
+    
+    @staticmethod
+    def read(filename, fmt=None, errors=None):
+        """Генератор записей из файла; ошибочные строки пропускаются и
+        добавляются в список errors как (номер строки, сообщение)
+        """
+        fmt = fmt or HistoryTransfer.detect_format(filename)
+        if fmt == 'parquet':
+            _, pq = HistoryTransfer.arrow()
+            rows = (row for batch in pq.ParquetFile(filename).iter_batches(batch_size=HistoryTransfer.BATCH)
+                    for row in batch.to_pylist())
+            for line_no, row in enumerate(rows, 1):
+                try:
+                    yield HistoryTransfer._entry(row)
+                except (TypeError, ValueError) as e:
+                    if errors is not None:
+                        errors.append((line_no, str(e)))
+            return
+        
+        with open(filename, 'r', encoding='utf-8-sig', newline='') as f:
+            for line_no, row in BatchProcessor.read_jobs(f, fmt):
+                try:
+                    yield HistoryTransfer._entry(row)
+                except (TypeError, ValueError) as e:
+                    if errors is not None:
+                        errors.append((line_no, str(e)))
+    
+    @staticmethod
+    def count_rows(filename, fmt=None):
+        """Число строк данных в файле без разбора записей (итог для хода импорта)"""
+        fmt = fmt or HistoryTransfer.detect_format(filename)
+        if fmt == 'parquet':
+            _, pq = HistoryTransfer.arrow()
+            return pq.ParquetFile(filename).metadata.num_rows
+        with open(filename, 'rb') as f:
+            lines = sum(chunk.count(b'\n') for chunk in iter(lambda: f.read(1 << 20), b''))
+        return max(0, lines - (fmt == 'csv'))
+    
+    @staticmethod
+    def import_into(history, filename, fmt=None, progress=None):
+        """Импорт файла в историю; возвращает (добавлено, повторов, ошибок)
+        
+        progress - ProgressReporter по прочитанным строкам; при отмене чтение
+        останавливается, а прочитанные до нее записи добавляются.
+        """
+        errors = []
+        entries = HistoryTransfer.read(filename, fmt, errors)
+        if progress is not None:
+            if progress.total is None:
+                progress.total = HistoryTransfer.count_rows(filename, fmt)
+            entries = HistoryTransfer._reporting(entries, progress, errors)
+        added, duplicates = history.extend(entries)
+        for line_no, message in errors[:20]:
+            error_logger.log_event(f"History import {filename}:{line_no}: {message}", "WARNING")
+        return added, duplicates, len(errors)
+
+# === ЭКСПОРТ РАСЧЕТОВ ===
+class CalculationExporter:
+    """Потоковая запись расчета в файл без сборки всего содержимого в памяти"""
+    
+    EXTENSIONS = ('.txt', '.csv', '.dxf', '.svg')
+    VECTOR_EXTENSIONS = ('.dxf', '.svg')
+    CHUNK_LINES = 1000
+    
+    # Слои чертежа: цвет DXF (ACI) и цвет линии SVG
+    LAYERS = {
+        'OUTLINE': (7, '#000000'),   # контур детали
+        'CUT_PATH': (1, '#d00000'),  # траектория резака со смещением на половину реза
+        'MARKING': (3, '#008000'),   # линии разметки по образующим
+        'SHEET': (8, '#808080')      # границы листов раскроя
+    }
+    
+    @staticmethod
+    def label_width(point_count):
+        """Ширина номера точки в подписях L00..L9999"""
+        return max(2, len(str(point_count - 1)))
+    
+    @staticmethod
+    def text_chunks(calc):
+        """Текстовый отчет частями"""
+        yield f"""РЕЗУЛЬТАТ РАСЧЕТА КОНУСА
+{AppConfig.APP_NAME} v{AppConfig.VERSION}
+Дата расчета: {datetime.now().strftime("%d.%m.%Y %H:%M")}
+{'='*50}
+
+ОСНОВНЫЕ ПАРАМЕТРЫ:
+• Диаметр основания: {calc['diameter']} мм
+• Высота конуса: {calc['height']} мм
+• Тип среза: {calc['cut_type']}
+• Параметр среза: {calc['cut_param']}
+• Количество сегментов: {calc['segments']}
+
+РЕЗУЛЬТАТЫ РАСЧЕТА:
+• Радиус основания: {calc['diameter']/2:.1f} мм
+• Длина образующей: {calc['generatrix']:.1f} мм
+• Угол развертки: {calc['angle']:.1f}°
+
+"""
+        development = calc.get('development')
+        if development:
+            yield f"""РАЗВЕРТКА УСЕЧЕННОГО КОНУСА:
+• Внешний радиус: {development['outer_radius']:.2f} мм
+• Внутренний радиус: {development['inner_radius']:.2f} мм
+• Угол сектора: {development['sector_angle']:.3f}°
+• Длина образующей усеченного конуса: {development['slant_height']:.2f} мм
+• Радиус верхнего основания: {development['top_radius']:.2f} мм
+• Заготовка: {development['blank_width']:.1f} × {development['blank_height']:.1f} мм
+• Радиусы реза (с учетом ширины реза): {development.get('cut_outer_radius', development['outer_radius']):.2f} / {development.get('cut_inner_radius', development['inner_radius']):.2f} мм
+
+"""
+        
+        fabrication = calc.get('fabrication')
+        if fabrication and (fabrication['thickness'] or fabrication['kerf']):
+            yield f"""ИЗГОТОВЛЕНИЕ:
+• Толщина листа: {fabrication['thickness']} мм
+• Нейтральный слой: K = {fabrication['k_factor']}, диаметр задан по поверхности '{fabrication['diameter_reference']}'
+• Диаметр по нейтральному слою: {fabrication['neutral_diameter']:.2f} мм
+• Высота нейтрального конуса: {fabrication['neutral_height']:.2f} мм
+• Ширина реза: {fabrication['kerf']} мм (траектория смещена наружу на {fabrication['kerf'] / 2:.2f} мм)
+
+"""
+        
+        yield "ДЛИНЫ ДЛЯ РАЗМЕТКИ:\n"
+        note = ConeGeometry.kerf_note(float(calc.get('kerf') or 0.0))
+        if note:
+            yield f"({note})\n"
+        L_values = calc['L_values']
+        width = CalculationExporter.label_width(len(L_values))
+        for start in range(0, len(L_values), CalculationExporter.CHUNK_LINES):
+            chunk = L_values[start:start + CalculationExporter.CHUNK_LINES]
+            yield ''.join(f"L{i:0{width}d}: {length:.1f} мм\n" for i, length in enumerate(chunk, start))
+        
+        yield f"\n{'='*50}\nСгенерировано {AppConfig.APP_NAME} v{AppConfig.VERSION}"
+    
+    @staticmethod
+    def csv_chunks(calc):
+        """Таблица точек CSV частями: номер, угол на окружности основания, длина
+        и координаты точки среза на развертке (сектор симметричен оси X)
+        """
+        yield "index,theta_deg,L_mm,x_mm,y_mm\n"
+        L_values = calc['L_values']
+        n = max(1, len(L_values) - 1)
+        step = 360 / n
+        sector_start = -math.radians(calc['angle']) / 2
+        sector_step = math.radians(calc['angle']) / n
+        for start in range(0, len(L_values), CalculationExporter.CHUNK_LINES):
+            chunk = L_values[start:start + CalculationExporter.CHUNK_LINES]
+            yield ''.join(
+                f"{i},{i * step:.4f},{length:.3f},"
+                f"{length * math.cos(sector_start + i * sector_step):.3f},"
+                f"{length * math.sin(sector_start + i * sector_step):.3f}\n"
+                for i, length in enumerate(chunk, start)
+            )
+    
+    @staticmethod
+    def _num(value):
+        """Координата с фиксированной точностью: одинаковые данные - одинаковые байты"""
+        text = f"{value:.{AppConfig.EXPORT['precision']}f}"
+        return '0' + text[2:] if text.startswith('-0') and not text.strip('-0.') else text
+    
+    @staticmethod
+    def part_items(calc, rotation=0.0, mirrored=False, dx=0.0, dy=0.0, outline=None):
+        """Примитивы одной детали (слой, замкнутость, точки) в положении на чертеже"""
+        if outline is None:
+            outline = ConeGeometry.part_outline(calc, AppConfig.EXPORT['arc_points'])
+        place = functools.partial(ConeGeometry.transform_points, rotation=rotation, mirrored=mirrored, dx=dx, dy=dy)
+        yield 'OUTLINE', True, place(outline[:-1])
+        
+        kerf = float(calc.get('kerf') or 0.0)
+        if kerf > 0:
+            yield 'CUT_PATH', True, place(ConeGeometry.offset_polygon(outline, kerf / 2)[:-1])
+        
+        for line in ConeGeometry.marking_lines(calc, AppConfig.EXPORT['max_marking_lines']):
+            yield 'MARKING', False, place(line)
+    
+    @staticmethod
+    def row_layout(calcs, row_width=None, spacing=None, on_error=None):
+        """Раскладка деталей рядами слева направо, снизу вверх: (расчет, контур, dx, dy)
+        
+        Детали обрабатываются по одной, поэтому calcs может быть генератором
+        результатов пакетного расчета любой длины. on_error(calc, error) - деталь без
+        контура пропускается вместо прерывания всего чертежа.
+        """
+        row_width = row_width or AppConfig.EXPORT['row_width']
+        spacing = AppConfig.EXPORT['part_spacing'] if spacing is None else spacing
+        x = row_y = row_height = 0.0
+        for calc in calcs:
+            try:
+                outline = ConeGeometry.part_outline(calc, AppConfig.EXPORT['arc_points'])
+            except ValueError as e:
+                if on_error is None:
+                    raise
+                on_error(calc, e)
+                continue
+            margin = float(calc.get('kerf') or 0.0) / 2
+            min_x = min(px for px, _ in outline) - margin
+            min_y = min(py for _, py in outline) - margin
+            width = max(px for px, _ in outline) + margin - min_x
+            height = max(py for _, py in outline) + margin - min_y
+            if x > 0 and x + width > row_width:
+                x, row_y, row_height = 0.0, row_y + row_height + spacing, 0.0
+            yield calc, outline, x - min_x, row_y - min_y
+            x += width + spacing
+            row_height = max(row_height, height)
+    
+    @staticmethod
+    def row_items(calcs, row_width=None, spacing=None, on_error=None):
+        """Примитивы деталей, разложенных рядами"""
+        for calc, outline, dx, dy in CalculationExporter.row_layout(calcs, row_width, spacing, on_error):
+            yield from CalculationExporter.part_items(calc, dx=dx, dy=dy, outline=outline)
+    
+    @staticmethod
+    def sheet_items(sheet_width, sheet_height, sheets, spacing=None):
+        """Прямоугольники листов раскроя, листы стопкой снизу вверх"""
+        spacing = AppConfig.EXPORT['part_spacing'] if spacing is None else spacing
+        for index in range(sheets):
+            y = index * (sheet_height + spacing)
+            yield 'SHEET', True, [(0.0, y), (sheet_width, y), (sheet_width, y + sheet_height), (0.0, y + sheet_height)]
+    
+    @staticmethod
+    def dxf_chunks(items):
+        """DXF R12 (AC1009) частями: читается любым CAD и раскройным ПО
+        
+        Большие полилинии выдаются по CHUNK_LINES вершин, документ целиком
+        в памяти не собирается.
+        """
+        num = CalculationExporter._num
+        chunk = CalculationExporter.CHUNK_LINES
+        layers = CalculationExporter.LAYERS
+        # $INSUNITS появилась в R2000, в R12 единицы не объявляются: координаты в мм
+        yield "0\nSECTION\n2\nHEADER\n9\n$ACADVER\n1\nAC1009\n0\nENDSEC\n"
+        yield ("0\nSECTION\n2\nTABLES\n"
+               "0\nTABLE\n2\nLTYPE\n70\n1\n"
+               "0\nLTYPE\n2\nCONTINUOUS\n70\n0\n3\nSolid line\n72\n65\n73\n0\n40\n0.0\n0\nENDTAB\n"
+               f"0\nTABLE\n2\nLAYER\n70\n{len(layers)}\n"
+               + ''.join(f"0\nLAYER\n2\n{name}\n70\n0\n62\n{color}\n6\nCONTINUOUS\n"
+                         for name, (color, _) in layers.items())
+               + "0\nENDTAB\n0\nENDSEC\n")
+        yield "0\nSECTION\n2\nENTITIES\n"
+        for layer, closed, points in items:
+            if len(points) == 2 and not closed:
+                (x0, y0), (x1, y1) = points
+                yield (f"0\nLINE\n8\n{layer}\n10\n{num(x0)}\n20\n{num(y0)}\n30\n0.0\n"
+                       f"11\n{num(x1)}\n21\n{num(y1)}\n31\n0.0\n")
+                continue
+            yield f"0\nPOLYLINE\n8\n{layer}\n66\n1\n10\n0.0\n20\n0.0\n30\n0.0\n70\n{1 if closed else 0}\n"
+            for start in range(0, len(points), chunk):
+                yield ''.join(f"0\nVERTEX\n8\n{layer}\n10\n{num(x)}\n20\n{num(y)}\n30\n0.0\n"
+                              for x, y in points[start:start + chunk])
+            yield f"0\nSEQEND\n8\n{layer}\n"
+        yield "0\nENDSEC\n0\nEOF\n"
+    
+    @staticmethod
+    def _write_svg(f, items):
+        """SVG: тело пишется во временный файл, пока накапливаются габариты для viewBox
+        
+        Ось Y чертежа направлена вверх, поэтому координаты Y пишутся с обратным знаком.
+        """
+        num = CalculationExporter._num
+        chunk = CalculationExporter.CHUNK_LINES
+        min_x = min_y = math.inf
+        max_x = max_y = -math.inf
+        with tempfile.SpooledTemporaryFile(max_size=4 * 1024 * 1024, mode='w+',
+                                           encoding='utf-8', newline='') as body:
+            for layer, closed, points in items:
+                xs, ys = [x for x, _ in points], [y for _, y in points]
+                min_x, max_x = min(min_x, *xs), max(max_x, *xs)
+                min_y, max_y = min(min_y, *ys), max(max_y, *ys)
+                body.write(f'<path class="{layer}" d="M{num(points[0][0])} {num(-points[0][1])}')
+                for start in range(1, len(points), chunk):
+                    body.write(''.join(f" L{num(x)} {num(-y)}" for x, y in points[start:start + chunk]))
+                body.write(' Z"/>\n' if closed else '"/>\n')
+            
+            if min_x > max_x:
+                min_x = min_y = max_x = max_y = 0.0
+            width, height = max_x - min_x, max_y - min_y
+            style = ''.join(f".{name}{{fill:none;stroke:{color};stroke-width:0.5}}"
+                            for name, (_, color) in CalculationExporter.LAYERS.items())
+            f.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                    f'<svg xmlns="http://www.w3.org/2000/svg" width="{num(width)}mm" height="{num(height)}mm" '
+                    f'viewBox="{num(min_x)} {num(-max_y)} {num(width)} {num(height)}">\n'
+                    f'<style>{style}</style>\n')
+            body.seek(0)
+            shutil.copyfileobj(body, f)
+            f.write('</svg>\n')
+    
+    @staticmethod
+    def write_drawing(filename, items):
+        """Чертеж из примитивов в DXF или SVG по расширению; без дат и случайных
+        идентификаторов, так что одинаковые расчеты дают побайтно одинаковые файлы
+        """
+        with BackgroundIO.atomic_open(filename) as f:
+            if filename.lower().endswith('.svg'):
+                CalculationExporter._write_svg(f, items)
+            else:
+                f.writelines(CalculationExporter.dxf_chunks(items))
+    
+    @staticmethod
+    def write(filename, calc):
+        """Запись в формате по расширению файла"""
+        if filename.lower().endswith(CalculationExporter.VECTOR_EXTENSIONS):
+            CalculationExporter.write_drawing(filename, CalculationExporter.part_items(calc))
+            return
+        chunks = CalculationExporter.csv_chunks if filename.lower().endswith('.csv') else CalculationExporter.text_chunks
+        with BackgroundIO.atomic_open(filename) as f:
+            f.writelines(chunks(calc))
+    
+    @staticmethod
+    def write_all(base, calc):
+        """Все форматы под одним именем; возвращает список записанных файлов"""
+        filenames = [base + extension for extension in CalculationExporter.EXTENSIONS]
+        for filename in filenames:
+            CalculationExporter.write(filename, calc)
+        return filenames
+
+# === УЛУЧШЕННЫЙ ЭКРАН КАЛЬКУЛЯТОРА ===
+class ProfessionalCalculatorScreen(ProfessionalScreen):
+    """Профессиональный экран калькулятора с идеальной интеграцией"""
+    
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.name = 'calculator'
+        self.cut_type = "slant"
+        self.current_calculation = None
+        self.validator = InputValidator()
+        
+    def setup_ui(self):
+        """Создание профессионального интерфейса"""
+        main_layout = FloatLayout()
+        
+        # Фон с интегрированным рендерером
+        self.renderer = HybridPyGameRenderer()
+        main_layout.add_widget(self.renderer)
+        
+        # Основной контент
+        content = self._create_content_layout()
+        main_layout.add_widget(content)
+        
+        self.add_widget(main_layout)
+        self._setup_default_values()
+    
+    def _create_content_layout(self):
+        """Создание основного контента"""
+        content = BoxLayout(
+            orientation='vertical',
+            padding=AdaptiveMetrics.get_padding(),
+            spacing=AdaptiveMetrics.adaptive_dp(15),
+            size_hint=(0.95, 0.95),
+            pos_hint={'center_x': 0.5, 'center_y': 0.5}
+        )
+        
+        # Заголовок
+        content.add_widget(self._create_header())
+        
+        # Карточка типа среза
+        content.add_widget(self._create_cut_type_card())
+        
+        # Карточка ввода параметров
+        content.add_widget(self._create_input_card())
+        
+        # Панель действий
+        content.add_widget(self._create_action_panel())
+        
+        # Карточка результатов
+        self.results_card = self._create_results_card()
+        content.add_widget(self.results_card)
+        
+        return content
+    
+    def _create_header(self):
+        """Создание профессионального заголовка"""
+        header = BoxLayout(
+            orientation='horizontal',
+            size_hint_y=None,
+            height=AdaptiveMetrics.get_button_height(),
+            spacing=AdaptiveMetrics.adaptive_dp(10)
+        )
+        
+        # Кнопка назад
+        back_btn = self.create_professional_button(
+            '← Назад (Esc)', 'secondary', self.on_back_press,
+            size_hint=(None, None)
+        )
+        back_btn.width = AdaptiveMetrics.adaptive_dp(120)
+        
+        # Заголовок
+        title_layout = BoxLayout(orientation='vertical', spacing=AdaptiveMetrics.adaptive_dp(2))
+        title = Label(
+            text='[b]ПРОФЕССИОНАЛЬНЫЙ КАЛЬКУЛЯТОР[/b]',
+            font_size=AdaptiveMetrics.adaptive_sp(18),
+            markup=True,
+            color=AppConfig.COLORS['light']
+        )
+        subtitle = Label(
+            text=f'Версия {AppConfig.VERSION} • Интегрированный рендеринг',
+            font_size=AdaptiveMetrics.adaptive_sp(10),
+            color=AppConfig.COLORS['light'][:3] + (0.8,)
+        )
+        title_layout.add_widget(title)
+        title_layout.add_widget(subtitle)
+        
+        # Инструменты
+        tools_layout = BoxLayout(
+            orientation='horizontal',
+            size_hint_x=None,
+            width=AdaptiveMetrics.adaptive_dp(120),
+            spacing=AdaptiveMetrics.adaptive_dp(5)
+        )
+        
+        clear_btn = self.create_professional_button(
+            '🗑️ Очистить', 'danger', self.clear_all,
+            size_hint=(None, None)
+        )
+        clear_btn.width = AdaptiveMetrics.adaptive_dp(100)
+        tools_layout.add_widget(clear_btn)
+        
+        header.add_widget(back_btn)
+        header.add_widget(title_layout)
+        header.add_widget(tools_layout)
+        
+        return header
+    
+    def _create_cut_type_card(self):
+        """Карточка выбора типа среза"""
+        card = BoxLayout(
+            orientation='vertical',
+            size_hint_y=None,
+            height=AdaptiveMetrics.adaptive_dp(100),
             spacing=AdaptiveMetrics.adaptive_dp(8),
             padding=AdaptiveMetrics.adaptive_dp(15)
         )
@@ -1229,6 +4411,7 @@ class ProfessionalCalculatorScreen(ProfessionalScreen):
             )
         
         card.bind(pos=self._update_input_card_bg, size=self._update_input_card_bg)
+        card.bind(minimum_height=card.setter('height'))
         
         title = Label(
             text='[b]ПАРАМЕТРЫ КОНУСА[/b]',
@@ -1274,7 +4457,27 @@ class ProfessionalCalculatorScreen(ProfessionalScreen):
                 "hint": "Количество сегментов", 
                 "attr": "segments_input", 
                 "default": "16",
-                "validator": lambda x: self.validator.validate_number(x, "Сегменты", 8, 36)
+                "validator": lambda x: self.validator.validate_number(
+                    x, "Сегменты", AppConfig.LIMITS['min_segments'], AppConfig.LIMITS['max_segments']
+                )
+            },
+            {
+                "icon": "🧱",
+                "hint": "Толщина листа (мм)",
+                "attr": "thickness_input",
+                "default": "0",
+                "validator": lambda x: self.validator.validate_number(
+                    x, "Толщина материала", 0, AppConfig.LIMITS['max_thickness']
+                )
+            },
+            {
+                "icon": "🔥",
+                "hint": "Ширина реза (мм)",
+                "attr": "kerf_input",
+                "default": "0",
+                "validator": lambda x: self.validator.validate_number(
+                    x, "Ширина реза", 0, AppConfig.LIMITS['max_kerf']
+                )
             }
         ]
         
@@ -1387,7 +4590,15 @@ class ProfessionalCalculatorScreen(ProfessionalScreen):
         self.save_btn.width = AdaptiveMetrics.adaptive_dp(120)
         self.save_btn.disabled = True
         
+        self.table_btn = self.create_professional_button(
+            '📋 Таблица', 'secondary', self.show_points_table,
+            size_hint=(None, None)
+        )
+        self.table_btn.width = AdaptiveMetrics.adaptive_dp(120)
+        self.table_btn.disabled = True
+        
         header.add_widget(title)
+        header.add_widget(self.table_btn)
         header.add_widget(self.save_btn)
         card.add_widget(header)
         
@@ -1423,9 +4634,10 @@ class ProfessionalCalculatorScreen(ProfessionalScreen):
 
 [b]ГОРЯЧИЕ КЛАВИШИ:[/b]
 • Enter - расчет • Esc - назад • F1 - справка • Ctrl+S - экспорт
+• F3 - монитор производительности
 
 Начните расчет, введя параметры конуса!"""
-        def _update_card_bg(self, instance, value):
+    def _update_card_bg(self, instance, value):
         """Обновление фона карточки"""
         if hasattr(self, 'cut_card_bg'):
             self.cut_card_bg.pos = instance.pos
@@ -1461,7 +4673,17 @@ class ProfessionalCalculatorScreen(ProfessionalScreen):
                 max_val = 90 if "Угол" in hint else float(self.height_input.text) if self.height_input.text else 10000
                 success, result = self.validator.validate_number(field_value, "Параметр", 0, max_val)
             elif "Количество" in hint:
-                success, result = self.validator.validate_number(field_value, "Сегменты", 8, 36)
+                success, result = self.validator.validate_number(
+                    field_value, "Сегменты", AppConfig.LIMITS['min_segments'], AppConfig.LIMITS['max_segments']
+                )
+            elif "Толщина" in hint:
+                success, result = self.validator.validate_number(
+                    field_value, "Толщина материала", 0, AppConfig.LIMITS['max_thickness']
+                )
+            elif "Ширина реза" in hint:
+                success, result = self.validator.validate_number(
+                    field_value, "Ширина реза", 0, AppConfig.LIMITS['max_kerf']
+                )
             else:
                 success = True
             
@@ -1528,6 +4750,8 @@ class ProfessionalCalculatorScreen(ProfessionalScreen):
     def _calculation_step_1(self, progress):
         """Шаг 1: Валидация данных"""
         progress.update_progress(10, "Проверка входных данных...")
+        step_start = time.perf_counter()
+        self._calc_busy_time = 0.0
         
         try:
             # Сбор данных
@@ -1535,10 +4759,12 @@ class ProfessionalCalculatorScreen(ProfessionalScreen):
             height = self.height_input.text
             cut_param = self.cut_param_input.text
             segments = self.segments_input.text
+            thickness = self.thickness_input.text.strip() or 0
+            kerf = self.kerf_input.text.strip() or 0
             
             # Комплексная валидация
             validated_data, errors = self.validator.validate_cone_parameters(
-                diameter, height, cut_param, segments, self.cut_type
+                diameter, height, cut_param, segments, self.cut_type, thickness, kerf
             )
             
             if errors:
@@ -1548,6 +4774,7 @@ class ProfessionalCalculatorScreen(ProfessionalScreen):
             
             # Сохраняем валидированные данные
             self.validated_data = validated_data
+            self._calc_busy_time += time.perf_counter() - step_start
             
             # Следующий шаг
             Clock.schedule_once(lambda dt: self._calculation_step_2(progress), 0.3)
@@ -1559,6 +4786,7 @@ class ProfessionalCalculatorScreen(ProfessionalScreen):
     def _calculation_step_2(self, progress):
         """Шаг 2: Основные вычисления"""
         progress.update_progress(30, "Вычисление основных параметров...")
+        step_start = time.perf_counter()
         
         try:
             D = self.validated_data['diameter']
@@ -1567,9 +4795,7 @@ class ProfessionalCalculatorScreen(ProfessionalScreen):
             n = self.validated_data['segments']
             
             # Основные расчеты
-            R = D / 2
-            generatrix = math.sqrt(R**2 + H**2)  # Образующая
-            angle = (R / generatrix) * 360  # Угол развертки
+            R, generatrix, angle = ConeGeometry.basic_parameters(D, H)
             
             self.calculation_intermediate = {
                 'diameter': D,
@@ -1580,6 +4806,7 @@ class ProfessionalCalculatorScreen(ProfessionalScreen):
                 'cut_param': cut_param,
                 'segments': n
             }
+            self._calc_busy_time += time.perf_counter() - step_start
             
             # Следующий шаг
             Clock.schedule_once(lambda dt: self._calculation_step_3(progress), 0.3)
@@ -1591,41 +4818,22 @@ class ProfessionalCalculatorScreen(ProfessionalScreen):
     def _calculation_step_3(self, progress):
         """Шаг 3: Расчет длин развертки"""
         progress.update_progress(50, "Расчет длин для разметки...")
+        step_start = time.perf_counter()
         
         try:
             data = self.calculation_intermediate
-            L_values = []
             
+            # Длины и развертка по нейтральному слою листа с учетом реза; повтор берется из истории
+            result = store.cached_result(self.validated_data, self.cut_type) if store is not None else None
+            if result is None:
+                result = ConeGeometry.calculate(self.validated_data, self.cut_type)
             if self.cut_type == "slant":
-                # Косой срез
-                alpha = data['cut_param']
-                for i in range(data['segments'] + 1):
-                    theta = (360 / data['segments']) * i
-                    L_i = data['generatrix'] * (1 - (alpha / 90) * abs(math.sin(math.radians(theta))))
-                    L_values.append(L_i)
-                    
-                    # Обновление прогресса
-                    progress_val = 50 + (i / data['segments']) * 40
-                    progress.update_progress(progress_val, f"Сегмент {i+1}/{data['segments']+1}...")
-                
-                cut_info = f"Угол косого среза: {alpha}°"
-                
-            else:
-                # Параллельный срез
-                h_cut = data['cut_param']
-                if h_cut > data['height']:
-                    h_cut = data['height'] * 0.7
-                    self.cut_param_input.text = str(int(h_cut))
-                
-                L_cut = (data['generatrix'] / data['height']) * h_cut
-                L_values = [L_cut for _ in range(data['segments'] + 1)]
-                cut_info = f"Высота параллельного среза: {h_cut:.1f} мм"
-            
-            self.calculation_results = {
-                'L_values': L_values,
-                'cut_info': cut_info,
-                **self.calculation_intermediate
-            }
+                progress.update_progress(90, f"Сегментов: {data['segments']}")
+            elif data['cut_param'] > data['height']:
+                self.cut_param_input.text = str(int(data['height'] * 0.7))
+            
+            self.calculation_results = {**self.calculation_intermediate, **result}
+            self._calc_busy_time += time.perf_counter() - step_start
             
             # Финальный шаг
             Clock.schedule_once(lambda dt: self._calculation_step_final(progress), 0.3)
@@ -1637,12 +4845,43 @@ class ProfessionalCalculatorScreen(ProfessionalScreen):
     def _calculation_step_final(self, progress):
         """Финальный шаг: Форматирование результатов"""
         progress.update_progress(95, "Форматирование результатов...")
+        step_start = time.perf_counter()
         
         try:
             data = self.calculation_results
             
-            # Форматирование длин
-            L_display = [f"L{i:02d}: {L_values[i]:.1f} мм" for i in range(len(data['L_values']))]
+            # Форматирование длин: в тексте только первые строки, полный список - в таблице
+            point_count = len(data['L_values'])
+            width = CalculationExporter.label_width(point_count)
+            L_display = [f"L{i:0{width}d}: {data['L_values'][i]:.1f} мм" for i in range(min(12, point_count))]
+            if point_count > 12:
+                L_display.append(f"... еще {point_count - 12} точек - кнопка 📋 Таблица")
+            note = ConeGeometry.kerf_note(data['kerf'])
+            if note:
+                L_display.insert(0, f"[i]{note}[/i]")
+            
+            development = data['development']
+            development_text = ""
+            if development:
+                development_text = f"""[b]🌀 РАЗВЕРТКА УСЕЧЕННОГО КОНУСА:[/b]
+• Внешний радиус: {development['outer_radius']:.1f} мм
+• Внутренний радиус: {development['inner_radius']:.1f} мм
+• Угол сектора: {development['sector_angle']:.1f}°
+• Радиус верхнего основания: {development['top_radius']:.1f} мм
+• Заготовка: {development['blank_width']:.0f} × {development['blank_height']:.0f} мм
+• Радиусы реза: {development['cut_outer_radius']:.1f} / {development['cut_inner_radius']:.1f} мм
+
+"""
+            
+            fabrication = data['fabrication']
+            fabrication_text = ""
+            if fabrication['thickness'] or fabrication['kerf']:
+                fabrication_text = f"""[b]🧱 ИЗГОТОВЛЕНИЕ:[/b]
+• Толщина листа: {fabrication['thickness']} мм (K = {fabrication['k_factor']})
+• Диаметр по нейтральному слою: {fabrication['neutral_diameter']:.1f} мм
+• Ширина реза: {fabrication['kerf']} мм (траектория смещена на {fabrication['kerf'] / 2:.2f} мм)
+
+"""
             
             # Создание красивого результата
             screen_profile = AdaptiveMetrics.get_screen_profile()
@@ -1658,8 +4897,8 @@ class ProfessionalCalculatorScreen(ProfessionalScreen):
 • Длина образующей: {data['generatrix']:.1f} мм
 • Угол развертки: {data['angle']:.1f}°
 
-[b]📏 ДЛИНЫ ДЛЯ РАЗМЕТКИ ({data['segments']} сегментов):[/b]
-{chr(10).join(L_display[:12])}{"..." if len(L_display) > 12 else ""}
+{fabrication_text}{development_text}[b]📏 ДЛИНЫ ДЛЯ РАЗМЕТКИ ({data['segments']} сегментов):[/b]
+{chr(10).join(L_display)}
 
 [b]💫 РЕЖИМ ВИЗУАЛИЗАЦИИ:[/b]
 • Нажмите F2 для переключения между конусом/разверткой/гибридом"""
@@ -1669,19 +4908,26 @@ class ProfessionalCalculatorScreen(ProfessionalScreen):
             self.current_calculation = {
                 'diameter': data['diameter'],
                 'height': data['height'],
+                'radius': data['radius'],
                 'cut_type': self.cut_type,
                 'cut_param': data['cut_param'],
                 'segments': data['segments'],
+                'thickness': data['thickness'],
+                'kerf': data['kerf'],
                 'result': result_text,
                 'L_values': data['L_values'],
+                'development': development,
+                'fabrication': fabrication,
                 'generatrix': data['generatrix'],
                 'angle': data['angle'],
+                'cut_info': data['cut_info'],
                 'timestamp': datetime.now().isoformat()
             }
             
             # Активация кнопок
             self.save_btn.disabled = False
             self.export_btn.disabled = False
+            self.table_btn.disabled = False
             
             # Визуализация
             self.renderer.show_calculation(
@@ -1689,12 +4935,17 @@ class ProfessionalCalculatorScreen(ProfessionalScreen):
                 data['height'], 
                 data['generatrix'], 
                 data['angle'],
-                "cone"
+                "cone",
+                L_values=data['L_values']
             )
             
             # Сохранение в историю
             self._save_to_history()
             
+            # Чистое время вычислений без пауз анимации прогресса
+            self._calc_busy_time += time.perf_counter() - step_start
+            performance_monitor.record_latency('calculation', self._calc_busy_time)
+            
             progress.update_progress(100, "Готово!")
             
             # Завершение
@@ -1742,632 +4993,3558 @@ class ProfessionalCalculatorScreen(ProfessionalScreen):
         self.show_toast(f"❌ {message}", 3.0, "error")
         error_logger.log_event(f"Calculation failed: {message}", "ERROR")
     
-    def _save_to_history(self):
-        """Сохранение расчета в историю"""
+    def _save_to_history(self):
+        """Сохранение расчета в историю"""
+        try:
+            if not hasattr(self, 'current_calculation'):
+                return
+            
+            calc = self.current_calculation
+            
+            # Используем глобальное хранилище
+            global store
+            if store is None:
+                try:
+                    store = HistoryStore.open()
+                except Exception as e:
+                    error_logger.log_error(e, "ProfessionalCalculatorScreen._save_to_history - store init")
+                    return
+            
+            # Создание новой записи (результат сохраняется один раз, повтор - только ссылка)
+            new_entry = {
+                'diameter': calc['diameter'],
+                'height': calc['height'],
+                'radius': calc['radius'],
+                'cut_type': calc['cut_type'],
+                'cut_param': calc['cut_param'],
+                'segments': calc['segments'],
+                'thickness': calc['thickness'],
+                'kerf': calc['kerf'],
+                'L_values': calc['L_values'],
+                'development': calc['development'],
+                'fabrication': calc['fabrication'],
+                'generatrix': calc['generatrix'],
+                'angle': calc['angle'],
+                'cut_info': calc['cut_info'],
+                'date': datetime.now().strftime("%d.%m.%Y %H:%M:%S"),
+                'timestamp': calc['timestamp']
+            }
+            
+            # Добавление с ограничением размера и сохранение
+            store.append(new_entry)
+            
+            error_logger.log_event(f"Calculation saved to history: D{calc['diameter']} H{calc['height']}")
+            
+        except Exception as e:
+            error_logger.log_error(e, "ProfessionalCalculatorScreen._save_to_history")
+            self.show_toast("⚠️ Не удалось сохранить в историю", 2.0, "warning")
+    
+    def save_calculation(self, instance):
+        """Сохранение расчета: новая ссылка, если последняя запись истории - другой результат"""
+        if not self.current_calculation:
+            self.show_toast("❌ Нет данных для сохранения", 2.0, "error")
+            return
+        if store is not None and store.is_latest(self.current_calculation):
+            self.show_toast("💾 Расчет уже в истории", 2.0, "info")
+            return
+        self.current_calculation['timestamp'] = datetime.now().isoformat()
+        self._save_to_history()
+        self.show_toast("💾 Расчет сохранен в историю!", 2.0, "success")
+    
+    def export_calculation(self, instance):
+        """Экспорт расчета в файл"""
+        if not self.current_calculation:
+            self.show_toast("❌ Нет данных для экспорта", 2.0, "error")
+            return
+        
+        try:
+            # Показ диалога сохранения
+            self._show_export_dialog(self.current_calculation)
+            
+        except Exception as e:
+            error_logger.log_error(e, "ProfessionalCalculatorScreen.export_calculation")
+            self.show_toast("❌ Ошибка экспорта", 3.0, "error")
+    
+    def _show_export_dialog(self, calculation):
+        """Диалог экспорта файла (.txt - отчет, .csv - таблица точек, .dxf/.svg - развертка)"""
+        dialog_layout = BoxLayout(
+            orientation='vertical',
+            spacing=AdaptiveMetrics.adaptive_dp(10),
+            padding=AdaptiveMetrics.adaptive_dp(15)
+        )
+        
+        title = Label(
+            text='[b]ЭКСПОРТ РАСЧЕТА[/b]',
+            font_size=AdaptiveMetrics.adaptive_sp(18),
+            markup=True,
+            color=AppConfig.COLORS['light'],
+            halign='center'
+        )
+        
+        filename_input = TextInput(
+            text=f'cone_calculation_{datetime.now().strftime("%Y%m%d_%H%M")}.txt',
+            size_hint_y=None,
+            height=AdaptiveMetrics.get_button_height(),
+            font_size=AdaptiveMetrics.adaptive_sp(16),
+            background_color=(0.1, 0.1, 0.15, 1),
+            foreground_color=AppConfig.COLORS['light']
+        )
+        
+        buttons_layout = BoxLayout(
+            orientation='horizontal',
+            spacing=AdaptiveMetrics.adaptive_dp(10),
+            size_hint_y=None,
+            height=AdaptiveMetrics.get_button_height()
+        )
+        
+        cancel_btn = self.create_professional_button('ОТМЕНА', 'secondary', size_hint=(1, None))
+        save_all_btn = self.create_professional_button('ВСЕ ФОРМАТЫ', 'primary', size_hint=(1, None))
+        save_btn = self.create_professional_button('СОХРАНИТЬ', 'success', size_hint=(1, None))
+        
+        buttons_layout.add_widget(cancel_btn)
+        buttons_layout.add_widget(save_all_btn)
+        buttons_layout.add_widget(save_btn)
+        
+        dialog_layout.add_widget(title)
+        dialog_layout.add_widget(Label(
+            text='Имя файла (.txt, .csv, .dxf, .svg):',
+            color=AppConfig.COLORS['light'],
+            font_size=AdaptiveMetrics.adaptive_sp(14)
+        ))
+        dialog_layout.add_widget(filename_input)
+        dialog_layout.add_widget(buttons_layout)
+        
+        popup = Popup(
+            title='Экспорт результатов',
+            content=dialog_layout,
+            size_hint=(0.8, 0.5),
+            background_color=(0.1, 0.1, 0.2, 0.95)
+        )
+        
+        def on_saved(filenames):
+            """Запись завершена (UI-поток)"""
+            if len(filenames) == 1:
+                self.show_toast(f"💾 Файл '{filenames[0]}' сохранен!", 3.0, "success")
+            else:
+                self.show_toast(f"💾 Сохранено файлов: {len(filenames)}", 3.0, "success")
+            error_logger.log_event(f"Calculation exported to {', '.join(filenames)}")
+        
+        def on_failed(error):
+            """Ошибка записи (UI-поток): прежний файл, если был, не поврежден"""
+            error_logger.log_error(error, "ProfessionalCalculatorScreen._show_export_dialog.write")
+            self.show_toast("❌ Ошибка сохранения файла!", 3.0, "error")
+        
+        def perform_save(instance, all_formats=False):
+            try:
+                filename = filename_input.text.strip()
+                if not filename:
+                    self.show_toast("❌ Введите имя файла!", 2.0, "error")
+                    return
+                
+                popup.dismiss()
+                if all_formats:
+                    base, extension = os.path.splitext(filename)
+                    if extension.lower() not in CalculationExporter.EXTENSIONS:
+                        base = filename
+                    background_io.submit(CalculationExporter.write_all, base, calculation,
+                                         on_done=on_saved, on_error=on_failed)
+                else:
+                    # Добавляем расширение если нужно
+                    if not filename.lower().endswith(CalculationExporter.EXTENSIONS):
+                        filename += '.txt'
+                    background_io.submit(lambda: CalculationExporter.write(filename, calculation) or [filename],
+                                         on_done=on_saved, on_error=on_failed)
+                # Запись идет в фоне, интерфейс продолжает отрисовку
+                self.show_toast("⏳ Сохранение файла...", 1.5, "info")
+                
+            except Exception as e:
+                error_logger.log_error(e, "ProfessionalCalculatorScreen._show_export_dialog.perform_save")
+                self.show_toast("❌ Ошибка сохранения файла!", 3.0, "error")
+        
+        cancel_btn.bind(on_press=popup.dismiss)
+        save_all_btn.bind(on_press=lambda instance: perform_save(instance, all_formats=True))
+        save_btn.bind(on_press=perform_save)
+        popup.open()
+    
+    def show_points_table(self, instance=None):
+        """Полная таблица точек разметки"""
+        if not self.current_calculation:
+            self.show_toast("❌ Сначала выполните расчет", 2.0, "error")
+            return
+        PointsTablePopup(self.current_calculation).open()
+    
+    def quick_clear(self, instance):
+        """Быстрая очистка полей"""
+        self.diameter_input.text = "300"
+        self.height_input.text = "400"
+        self.cut_param_input.text = "30" if self.cut_type == "slant" else "200"
+        self.segments_input.text = "16"
+        self.thickness_input.text = "0"
+        self.kerf_input.text = "0"
+        
+        # Сброс визуализации
+        self.result_label.text = self._get_welcome_message()
+        self.save_btn.disabled = True
+        self.export_btn.disabled = True
+        self.table_btn.disabled = True
+        self.current_calculation = None
+        
+        # Сброс подсветки полей
+        for input_field in [self.diameter_input, self.height_input, self.cut_param_input, self.segments_input,
+                            self.thickness_input, self.kerf_input]:
+            input_field.background_color = (0.1, 0.1, 0.15, 1)
+        
+        self.show_toast("🔄 Все поля очищены", 1.5, "info")
+    
+    def clear_all(self, instance):
+        """Полная очистка"""
+        self.quick_clear(instance)
+
+# === УЛУЧШЕННЫЙ ЭКРАН ИСТОРИИ ===
+class ProfessionalHistoryScreen(ProfessionalScreen):
+    """Профессиональный экран истории расчетов
+    
+    Список строится полностью один раз; дальше экран получает события
+    хранилища и вставляет или удаляет только затронутые строки. Пока экран
+    не активен, события копятся и применяются при входе. Строки и всплывающие
+    окна берутся из widget_pool.
+    """
+    
+    VISIBLE_ROWS = 20
+    
+    def __init__(self, **kwargs):
+        self._changes = deque()
+        self._subscribed_store = None
+        self._empty_label = None
+        self._total = self._today_count = 0
+        self._stats_date = None
+        super().__init__(**kwargs)
+        self.name = 'history'
+        self._apply_trigger = Clock.create_trigger(lambda dt: self._apply_changes())
+    
+    def setup_ui(self):
+        """Создание интерфейса истории"""
+        main_layout = FloatLayout()
+        
+        # Фон
+        self.renderer = HybridPyGameRenderer()
+        main_layout.add_widget(self.renderer)
+        
+        # Основной контент
+        content = self._create_content_layout()
+        main_layout.add_widget(content)
+        
+        self.add_widget(main_layout)
+        
+        # Загрузка истории
+        Clock.schedule_once(lambda dt: self.load_history(), 0.5)
+    
+    def _create_content_layout(self):
+        """Создание основного контента"""
+        content = BoxLayout(
+            orientation='vertical',
+            padding=AdaptiveMetrics.get_padding(),
+            spacing=AdaptiveMetrics.adaptive_dp(15),
+            size_hint=(0.95, 0.9),
+            pos_hint={'center_x': 0.5, 'center_y': 0.5}
+        )
+        
+        # Заголовок
+        content.add_widget(self._create_header())
+        
+        # Статистика
+        self.stats_label = Label(
+            text='Загрузка истории...',
+            font_size=AdaptiveMetrics.adaptive_sp(14),
+            color=AppConfig.COLORS['light'][:3] + (0.8,),
+            size_hint_y=None,
+            height=AdaptiveMetrics.adaptive_dp(30)
+        )
+        content.add_widget(self.stats_label)
+        
+        # Список истории
+        scroll = ScrollView(do_scroll_x=False)
+        self.history_list = BoxLayout(
+            orientation='vertical',
+            size_hint_y=None,
+            spacing=AdaptiveMetrics.adaptive_dp(10),
+            padding=AdaptiveMetrics.adaptive_dp(10)
+        )
+        self.history_list.bind(minimum_height=self.history_list.setter('height'))
+        
+        scroll.add_widget(self.history_list)
+        content.add_widget(scroll)
+        
+        return content
+    
+    def _create_header(self):
+        """Создание заголовка"""
+        header = BoxLayout(
+            orientation='horizontal',
+            size_hint_y=None,
+            height=AdaptiveMetrics.get_button_height()
+        )
+        
+        back_btn = self.create_professional_button(
+            '← Назад (Esc)', 'secondary', self.on_back_press,
+            size_hint=(None, None)
+        )
+        back_btn.width = AdaptiveMetrics.adaptive_dp(120)
+        
+        title = Label(
+            text='[b]ИСТОРИЯ РАСЧЕТОВ[/b]',
+            font_size=AdaptiveMetrics.adaptive_sp(22),
+            markup=True,
+            color=AppConfig.COLORS['light']
+        )
+        
+        export_btn = self.create_professional_button(
+            '📤', 'primary', lambda instance: self.show_transfer_dialog(importing=False),
+            size_hint=(None, None)
+        )
+        import_btn = self.create_professional_button(
+            '📥', 'primary', lambda instance: self.show_transfer_dialog(importing=True),
+            size_hint=(None, None)
+        )
+        export_btn.width = import_btn.width = AdaptiveMetrics.adaptive_dp(60)
+        
+        clear_btn = self.create_professional_button(
+            '🗑️ Очистить', 'danger', self.clear_history,
+            size_hint=(None, None)
+        )
+        clear_btn.width = AdaptiveMetrics.adaptive_dp(120)
+        
+        header.add_widget(back_btn)
+        header.add_widget(title)
+        header.add_widget(export_btn)
+        header.add_widget(import_btn)
+        header.add_widget(clear_btn)
+        
+        return header
+    
+    def on_enter(self):
+        """При входе: дочитывание общего хранилища и применение накопленных изменений"""
+        super().on_enter()
         try:
-            if not hasattr(self, 'current_calculation'):
+            if store is not self._subscribed_store:
+                # Хранилище появилось или сменилось после первой загрузки
+                self.load_history()
                 return
-            
-            calc = self.current_calculation
-            
-            # Используем глобальное хранилище
+            if store is not None:
+                store.load()
+            self._apply_changes()
+        except Exception as e:
+            error_logger.log_error(e, "ProfessionalHistoryScreen.on_enter")
+    
+    def _clear_rows(self):
+        """Снятие всех строк со списком возвратом их в пул"""
+        for row in list(self.history_list.children):
+            self._remove_row(row)
+        self._empty_label = None
+    
+    def _remove_row(self, row):
+        """Снятие строки; строки истории возвращаются в пул"""
+        self.history_list.remove_widget(row)
+        if row is not self._empty_label:
+            widget_pool.release('history_row', row)
+    
+    def load_history(self):
+        """Полная загрузка истории расчетов и подписка на изменения"""
+        self._clear_rows()
+        self._changes.clear()
+        
+        try:
             global store
             if store is None:
-                try:
-                    store = JsonStore('cone_calculator_data.json')
-                except Exception as e:
-                    error_logger.log_error(e, "ProfessionalCalculatorScreen._save_to_history - store init")
-                    return
-            
-            # Загрузка существующей истории
-            if store.exists('history'):
-                history_data = store.get('history')['calculations']
-            else:
-                history_data = []
+                self._show_empty_state("Хранилище не доступно")
+                return
             
-            # Создание новой записи
-            new_entry = {
-                'diameter': calc['diameter'],
-                'height': calc['height'],
-                'cut_type': calc['cut_type'],
-                'cut_param': calc['cut_param'],
-                'segments': calc['segments'],
-                'L_values': calc['L_values'],
-                'generatrix': calc['generatrix'],
-                'angle': calc['angle'],
-                'date': datetime.now().strftime("%d.%m.%Y %H:%M:%S"),
-                'timestamp': calc['timestamp']
-            }
+            if self._subscribed_store is not store:
+                if self._subscribed_store is not None:
+                    self._subscribed_store.unsubscribe(self._on_history_change)
+                store.subscribe(self._on_history_change)
+                self._subscribed_store = store
             
-            # Добавление и ограничение размера
-            history_data.append(new_entry)
-            if len(history_data) > AppConfig.LIMITS['max_history_items']:
-                history_data = history_data[-AppConfig.LIMITS['max_history_items']:]
+            history_data = store.load()
             
-            # Сохранение
-            store.put('history', calculations=history_data)
+            # Статистика
+            self._stats_date = datetime.now().date()
+            self._total = len(history_data)
+            self._today_count = sum(1 for calc in history_data if self._is_today(calc))
+            self._update_stats()
             
-            error_logger.log_event(f"Calculation saved to history: D{calc['diameter']} H{calc['height']}")
+            if not history_data:
+                self._show_empty_state("История расчетов пуста")
+                return
             
+            # Показ последних записей, новые сверху
+            for calc in reversed(history_data[-self.VISIBLE_ROWS:]):
+                self._add_history_item(calc)
+                
         except Exception as e:
-            error_logger.log_error(e, "ProfessionalCalculatorScreen._save_to_history")
-            self.show_toast("⚠️ Не удалось сохранить в историю", 2.0, "warning")
+            error_logger.log_error(e, "ProfessionalHistoryScreen.load_history")
+            self._show_empty_state("Ошибка загрузки истории")
     
-    def save_calculation(self, instance):
-        """Сохранение расчета"""
-        if self.current_calculation:
-            self.show_toast("💾 Расчет сохранен в историю!", 2.0, "success")
-        else:
-            self.show_toast("❌ Нет данных для сохранения", 2.0, "error")
+    def _is_today(self, calculation):
+        """Запись сделана сегодня (по дате последней статистики)"""
+        try:
+            return datetime.fromisoformat(calculation.get('timestamp') or '2000-01-01').date() == self._stats_date
+        except ValueError:
+            return False
     
-    def export_calculation(self, instance):
-        """Экспорт расчета в файл"""
-        if not self.current_calculation:
-            self.show_toast("❌ Нет данных для экспорта", 2.0, "error")
+    def _update_stats(self):
+        """Строка статистики по счетчикам, без обхода истории"""
+        if not self._total:
+            self.stats_label.text = "Расчетов: 0"
+            return
+        shown = min(self.VISIBLE_ROWS, self._total)
+        self.stats_label.text = f"Всего: {self._total} | Сегодня: {self._today_count} | Показано: {shown}"
+    
+    def _on_history_change(self, event, entries):
+        """Событие хранилища (из любого потока): в очередь, применение - в UI-потоке"""
+        self._changes.append((event, entries))
+        if self._is_active:
+            self._apply_trigger()
+    
+    def _apply_changes(self):
+        """Применение накопленных событий: вставка и удаление только затронутых строк"""
+        if not self._changes:
+            return
+        if self._stats_date != datetime.now().date():
+            # Смена суток: счетчик "сегодня" пересчитывается полной загрузкой
+            self.load_history()
             return
         
-        try:
-            calc = self.current_calculation
-            
-            # Форматирование содержимого
-            content = f"""РЕЗУЛЬТАТ РАСЧЕТА КОНУСА
-{AppConfig.APP_NAME} v{AppConfig.VERSION}
-Дата расчета: {datetime.now().strftime("%d.%m.%Y %H:%M")}
-{'='*50}
-
-ОСНОВНЫЕ ПАРАМЕТРЫ:
-• Диаметр основания: {calc['diameter']} мм
-• Высота конуса: {calc['height']} мм
-• Тип среза: {calc['cut_type']}
-• Параметр среза: {calc['cut_param']}
-• Количество сегментов: {calc['segments']}
-
-РЕЗУЛЬТАТЫ РАСЧЕТА:
-• Радиус основания: {calc['diameter']/2:.1f} мм
-• Длина образующей: {calc['generatrix']:.1f} мм
-• Угол развертки: {calc['angle']:.1f}°
-
-ДЛИНЫ ДЛЯ РАЗМЕТКИ:
-"""
-            
-            for i, length in enumerate(calc['L_values']):
-                content += f"L{i:02d}: {length:.1f} мм\n"
-            
-            content += f"\n{'='*50}\nСгенерировано {AppConfig.APP_NAME} v{AppConfig.VERSION}"
-            
-            # Показ диалога сохранения
-            self._show_export_dialog(content)
-            
-        except Exception as e:
-            error_logger.log_error(e, "ProfessionalCalculatorScreen.export_calculation")
-            self.show_toast("❌ Ошибка экспорта", 3.0, "error")
+        rows = self.history_list.children  # снизу вверх: rows[0] - самая старая видимая запись
+        while self._changes:
+            event, entries = self._changes.popleft()
+            if event == 'cleared':
+                self._clear_rows()
+                self._total = self._today_count = 0
+            elif event == 'appended':
+                self._total += len(entries)
+                self._today_count += sum(1 for calc in entries if self._is_today(calc))
+                if self._empty_label is not None:
+                    self.history_list.remove_widget(self._empty_label)
+                    self._empty_label = None
+                for calc in entries[-self.VISIBLE_ROWS:]:
+                    self._add_history_item(calc, top=True)
+                    if len(rows) > self.VISIBLE_ROWS:
+                        self._remove_row(rows[0])
+            elif event == 'pruned':
+                self._total -= len(entries)
+                self._today_count -= sum(1 for calc in entries if self._is_today(calc))
+                # Видимы последние записи; удаляются, только если история стала короче списка
+                while len(rows) > self._total:
+                    self._remove_row(rows[0])
+        
+        self._update_stats()
+        if not self._total and self._empty_label is None:
+            self._show_empty_state("История расчетов пуста")
     
-    def _show_export_dialog(self, content):
-        """Диалог экспорта файла"""
-        dialog_layout = BoxLayout(
+    def _show_empty_state(self, message):
+        """Показ состояния пустой истории"""
+        empty_label = Label(
+            text=f'{message}\n\nСначала выполните расчет в калькуляторе',
+            color=AppConfig.COLORS['light'][:3] + (0.6,),
+            font_size=AdaptiveMetrics.adaptive_sp(16),
+            halign='center'
+        )
+        self._empty_label = empty_label
+        self.history_list.add_widget(empty_label)
+    
+    def _add_history_item(self, calculation, top=False):
+        """Добавление элемента истории (в конец списка или сверху)"""
+        item_layout = widget_pool.acquire('history_row', self._create_history_row)
+        self._bind_history_row(item_layout, calculation)
+        
+        # В BoxLayout индекс отсчитывается снизу: верх списка - индекс len(children)
+        self.history_list.add_widget(item_layout, index=len(self.history_list.children) if top else 0)
+        return item_layout
+    
+    def _bind_history_row(self, item_layout, calculation):
+        """Данные расчета в готовой строке"""
+        item_layout.calculation = calculation
+        item_layout.title.text = f"📐 Конус D{calculation['diameter']}×H{calculation['height']}"
+        item_layout.details.text = f"🔺 {calculation['cut_type']} • {calculation['segments']} сегментов"
+        item_layout.date.text = calculation['date']
+    
+    def _create_history_row(self):
+        """Дерево виджетов строки истории без данных"""
+        item_layout = BoxLayout(
+            orientation='horizontal',
+            size_hint_y=None,
+            height=AdaptiveMetrics.adaptive_dp(80),
+            spacing=AdaptiveMetrics.adaptive_dp(10),
+            padding=AdaptiveMetrics.adaptive_dp(10)
+        )
+        
+        # Фон элемента
+        with item_layout.canvas.before:
+            Color(*AppConfig.COLORS['dark'][:3] + (0.8,))
+            bg_rect = RoundedRectangle(
+                pos=item_layout.pos, size=item_layout.size,
+                radius=[AdaptiveMetrics.adaptive_dp(10)]
+            )
+        
+        item_layout.bg_rect = bg_rect
+        item_layout.bind(pos=self._update_item_bg, size=self._update_item_bg)
+        
+        # Информация
+        info_layout = BoxLayout(orientation='vertical', size_hint_x=0.7)
+        
+        title = Label(
+            font_size=AdaptiveMetrics.adaptive_sp(16),
+            color=AppConfig.COLORS['light'],
+            halign='left',
+            text_size=(None, None)
+        )
+        
+        details = Label(
+            font_size=AdaptiveMetrics.adaptive_sp(12),
+            color=AppConfig.COLORS['light'][:3] + (0.8,),
+            halign='left',
+            text_size=(None, None)
+        )
+        
+        date = Label(
+            font_size=AdaptiveMetrics.adaptive_sp(11),
+            color=AppConfig.COLORS['light'][:3] + (0.6,),
+            halign='left',
+            text_size=(None, None)
+        )
+        
+        info_layout.add_widget(title)
+        info_layout.add_widget(details)
+        info_layout.add_widget(date)
+        
+        # Кнопка просмотра открывает расчет, привязанный к строке сейчас
+        view_btn = self.create_professional_button(
+            '👁️ Просмотр', 'primary', 
+            lambda instance: self.view_calculation(item_layout.calculation),
+            size_hint=(None, None)
+        )
+        view_btn.width = AdaptiveMetrics.adaptive_dp(100)
+        
+        item_layout.add_widget(info_layout)
+        item_layout.add_widget(view_btn)
+        item_layout.title, item_layout.details, item_layout.date = title, details, date
+        return item_layout
+    
+    def _update_item_bg(self, instance, value):
+        """Обновление фона элемента"""
+        if hasattr(instance, 'bg_rect'):
+            instance.bg_rect.pos = instance.pos
+            instance.bg_rect.size = instance.size
+    
+    @staticmethod
+    def _pooled_popup(kind, popup):
+        """Окно возвращается в пул после закрытия и снятия с экрана"""
+        popup.bind(_is_open=lambda instance, is_open: is_open or widget_pool.release(kind, instance))
+        return popup
+    
+    def _create_details_popup(self):
+        """Окно деталей расчета без данных"""
+        content = BoxLayout(
+            orientation='vertical',
+            spacing=AdaptiveMetrics.adaptive_dp(10),
+            padding=AdaptiveMetrics.adaptive_dp(15)
+        )
+        
+        title = Label(
+            font_size=AdaptiveMetrics.adaptive_sp(18),
+            markup=True,
+            color=AppConfig.COLORS['light'],
+            halign='center'
+        )
+        
+        details = Label(
+            font_size=AdaptiveMetrics.adaptive_sp(14),
+            color=AppConfig.COLORS['light'][:3] + (0.9,),
+            halign='left'
+        )
+        
+        close_btn = self.create_professional_button('ЗАКРЫТЬ', 'primary', size_hint=(1, None))
+        
+        content.add_widget(title)
+        content.add_widget(details)
+        content.add_widget(close_btn)
+        
+        popup = Popup(
+            title='Детали расчета',
+            content=content,
+            size_hint=(0.8, 0.6),
+            background_color=(0.1, 0.1, 0.2, 0.95)
+        )
+        
+        close_btn.bind(on_press=popup.dismiss)
+        popup.title_label, popup.details_label = title, details
+        return self._pooled_popup('details_popup', popup)
+    
+    def view_calculation(self, calculation):
+        """Просмотр деталей расчета"""
+        details_text = f"""Диаметр: {calculation['diameter']} мм
+Высота: {calculation['height']} мм
+Тип среза: {calculation['cut_type']}
+Параметр среза: {calculation['cut_param']}
+Сегментов: {calculation['segments']}
+Образующая: {calculation.get('generatrix', 'N/A'):.1f} мм
+Угол развертки: {calculation.get('angle', 'N/A'):.1f}°"""
+        
+        fabrication = calculation.get('fabrication')
+        if fabrication and (fabrication['thickness'] or fabrication['kerf']):
+            details_text += f"""
+Толщина листа: {fabrication['thickness']} мм
+Диаметр по нейтральному слою: {fabrication['neutral_diameter']:.1f} мм
+Ширина реза: {fabrication['kerf']} мм"""
+        
+        # Массив распаковывается только при просмотре записи
+        L_values = calculation.get('L_values')
+        if L_values:
+            shown = ', '.join(f"{length:.1f}" for length in L_values[:8])
+            more = f" ... ({len(L_values)} точек)" if len(L_values) > 8 else ""
+            details_text += f"\nДлины для разметки: {shown}{more} мм"
+            note = ConeGeometry.kerf_note(float(calculation.get('kerf') or 0.0))
+            if note:
+                details_text += f"\n{note}"
+        
+        popup = widget_pool.acquire('details_popup', self._create_details_popup)
+        popup.title_label.text = f'[b]РАСЧЕТ ОТ {calculation["date"]}[/b]'
+        popup.details_label.text = details_text
+        popup.open()
+    
+    def show_transfer_dialog(self, importing):
+        """Выгрузка всей истории в файл или загрузка из файла (в фоне)"""
+        content = BoxLayout(
             orientation='vertical',
             spacing=AdaptiveMetrics.adaptive_dp(10),
             padding=AdaptiveMetrics.adaptive_dp(15)
         )
+        filename_input = TextInput(
+            text='cone_history.csv' if importing else f'cone_history_{datetime.now().strftime("%Y%m%d")}.csv',
+            size_hint_y=None,
+            height=AdaptiveMetrics.get_button_height(),
+            font_size=AdaptiveMetrics.adaptive_sp(16),
+            background_color=(0.1, 0.1, 0.15, 1),
+            foreground_color=AppConfig.COLORS['light']
+        )
+        buttons = BoxLayout(
+            orientation='horizontal',
+            spacing=AdaptiveMetrics.adaptive_dp(10),
+            size_hint_y=None,
+            height=AdaptiveMetrics.get_button_height()
+        )
+        cancel_btn = self.create_professional_button('ОТМЕНА', 'secondary', size_hint=(1, None))
+        run_btn = self.create_professional_button('ИМПОРТ' if importing else 'ЭКСПОРТ', 'success', size_hint=(1, None))
+        buttons.add_widget(cancel_btn)
+        buttons.add_widget(run_btn)
+        
+        content.add_widget(Label(
+            text='Файл истории (.csv, .jsonl, .parquet):',
+            color=AppConfig.COLORS['light'],
+            font_size=AdaptiveMetrics.adaptive_sp(14)
+        ))
+        content.add_widget(filename_input)
+        content.add_widget(buttons)
+        
+        popup = Popup(
+            title='Импорт истории' if importing else 'Экспорт истории',
+            content=content,
+            size_hint=(0.8, 0.45),
+            background_color=(0.1, 0.1, 0.2, 0.95)
+        )
+        
+        progress = None
+        
+        def on_exported(count):
+            self.hide_progress()
+            self.show_toast(f"📤 Выгружено записей: {count}", 3.0, "success")
+            error_logger.log_event(f"History exported: {count} records")
+        
+        def on_imported(result):
+            self.hide_progress()
+            added, duplicates, failed = result
+            stopped = " (прервано)" if progress.cancelled else ""
+            self.show_toast(f"📥 Добавлено: {added}, повторов: {duplicates}, ошибок: {failed}{stopped}\n"
+                            f"Хранятся {AppConfig.LIMITS['max_history_items']} последних по времени",
+                            3.0, "warning" if failed or stopped else "success")
+            error_logger.log_event(f"History imported: {added} added, {duplicates} duplicates, {failed} failed"
+                                   f"{' (cancelled)' if stopped else ''}")
+        
+        def on_failed(error):
+            self.hide_progress()
+            if isinstance(error, OperationCancelled):
+                self.show_toast("⏹ Экспорт отменен", 2.0, "warning")
+                return
+            error_logger.log_error(error, "ProfessionalHistoryScreen.show_transfer_dialog")
+            self.show_toast("❌ Ошибка импорта!" if importing else "❌ Ошибка экспорта!", 3.0, "error")
+        
+        def perform(instance):
+            nonlocal progress
+            filename = filename_input.text.strip()
+            if not filename:
+                self.show_toast("❌ Введите имя файла!", 2.0, "error")
+                return
+            if store is None:
+                self.show_toast("❌ Хранилище не доступно", 2.0, "error")
+                return
+            popup.dismiss()
+            progress = self.track_progress("Импорт истории..." if importing else "Экспорт истории...")
+            if importing:
+                background_io.submit(HistoryTransfer.import_into, store, filename, None, progress,
+                                     on_done=on_imported, on_error=on_failed)
+            else:
+                background_io.submit(lambda: HistoryTransfer.export(store.load(), filename, progress=progress),
+                                     on_done=on_exported, on_error=on_failed)
+        
+        cancel_btn.bind(on_press=popup.dismiss)
+        run_btn.bind(on_press=perform)
+        popup.open()
+    
+    def clear_history(self, instance):
+        """Очистка истории с подтверждением"""
+        widget_pool.acquire('clear_popup', self._create_clear_popup).open()
+    
+    def _create_clear_popup(self):
+        """Окно подтверждения очистки (содержимое не зависит от данных)"""
+        content = BoxLayout(
+            orientation='vertical',
+            spacing=AdaptiveMetrics.adaptive_dp(15),
+            padding=AdaptiveMetrics.adaptive_dp(20)
+        )
         
-        title = Label(
-            text='[b]ЭКСПОРТ РАСЧЕТА[/b]',
-            font_size=AdaptiveMetrics.adaptive_sp(18),
-            markup=True,
+        message = Label(
+            text='Вы уверены, что хотите очистить всю историю расчетов?',
+            font_size=AdaptiveMetrics.adaptive_sp(16),
             color=AppConfig.COLORS['light'],
             halign='center'
         )
         
-        filename_input = TextInput(
-            text=f'cone_calculation_{datetime.now().strftime("%Y%m%d_%H%M")}.txt',
-            size_hint_y=None,
-            height=AdaptiveMetrics.get_button_height(),
-            font_size=AdaptiveMetrics.adaptive_sp(16),
-            background_color=(0.1, 0.1, 0.15, 1),
-            foreground_color=AppConfig.COLORS['light']
-        )
-        
         buttons_layout = BoxLayout(
             orientation='horizontal',
-            spacing=AdaptiveMetrics.adaptive_dp(10),
+            spacing=AdaptiveMetrics.adaptive_dp(15),
             size_hint_y=None,
             height=AdaptiveMetrics.get_button_height()
         )
         
-        cancel_btn = self.create_professional_button('ОТМЕНА', 'secondary', size_hint=(1, None))
-        save_btn = self.create_professional_button('СОХРАНИТЬ', 'success', size_hint=(1, None))
+        cancel_btn = self.create_professional_button('ОТМЕНА', 'secondary')
+        clear_btn = self.create_professional_button('ОЧИСТИТЬ', 'danger')
         
         buttons_layout.add_widget(cancel_btn)
-        buttons_layout.add_widget(save_btn)
+        buttons_layout.add_widget(clear_btn)
         
-        dialog_layout.add_widget(title)
-        dialog_layout.add_widget(Label(
-            text='Имя файла:',
-            color=AppConfig.COLORS['light'],
-            font_size=AdaptiveMetrics.adaptive_sp(14)
-        ))
-        dialog_layout.add_widget(filename_input)
-        dialog_layout.add_widget(buttons_layout)
+        content.add_widget(message)
+        content.add_widget(buttons_layout)
         
         popup = Popup(
-            title='Экспорт результатов',
-            content=dialog_layout,
-            size_hint=(0.8, 0.5),
+            title='Очистка истории',
+            content=content,
+            size_hint=(0.7, 0.4),
             background_color=(0.1, 0.1, 0.2, 0.95)
         )
         
-        def perform_save(instance):
+        def perform_clear(btn):
             try:
-                filename = filename_input.text.strip()
-                if not filename:
-                    self.show_toast("❌ Введите имя файла!", 2.0, "error")
-                    return
-                
-                # Добавляем расширение если нужно
-                if not filename.lower().endswith('.txt'):
-                    filename += '.txt'
-                
-                with open(filename, 'w', encoding='utf-8') as f:
-                    f.write(content)
-                
+                global store
+                if store:
+                    store.clear()
                 popup.dismiss()
-                self.show_toast(f"💾 Файл '{filename}' сохранен!", 3.0, "success")
-                error_logger.log_event(f"Calculation exported to {filename}")
-                
+                self.show_toast("🗑️ История очищена!", 2.0, "success")
+                error_logger.log_event("History cleared by user")
             except Exception as e:
-                error_logger.log_error(e, "ProfessionalCalculatorScreen._show_export_dialog.perform_save")
-                self.show_toast("❌ Ошибка сохранения файла!", 3.0, "error")
+                error_logger.log_error(e, "ProfessionalHistoryScreen._create_clear_popup.perform_clear")
+                self.show_toast("❌ Ошибка очистки!", 2.0, "error")
         
         cancel_btn.bind(on_press=popup.dismiss)
-        save_btn.bind(on_press=perform_save)
-        popup.open()
+        clear_btn.bind(on_press=perform_clear)
+        return self._pooled_popup('clear_popup', popup)
+
+# === ГЛАВНОЕ ПРИЛОЖЕНИЕ ===
+class ConeCalculator(App):
+    """Главное приложение с профессиональной архитектурой"""
     
-    def quick_clear(self, instance):
-        """Быстрая очистка полей"""
-        self.diameter_input.text = "300"
-        self.height_input.text = "400"
-        self.cut_param_input.text = "30" if self.cut_type == "slant" else "200"
-        self.segments_input.text = "16"
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.title = f"{AppConfig.APP_NAME} v{AppConfig.VERSION}"
+    
+    def build(self):
+        """Сборка приложения"""
+        error_logger.log_event("=== APPLICATION START ===")
+        error_logger.log_event(f"Starting {self.title}")
         
-        # Сброс визуализации
-        self.result_label.text = self._get_welcome_message()
-        self.save_btn.disabled = True
-        self.export_btn.disabled = True
-        self.current_calculation = None
+        # Настройка окна для разных платформ
+        self._setup_window()
         
-        # Сброс подсветки полей
-        for input_field in [self.diameter_input, self.height_input, self.cut_param_input, self.segments_input]:
-            input_field.background_color = (0.1, 0.1, 0.15, 1)
+        # Инициализация хранилища
+        global store
+        try:
+            store = HistoryStore.open()
+            error_logger.log_event(f"History store opened: {store.filename}")
+        except Exception as e:
+            error_logger.log_error(e, "ConeCalculator.build - store init")
+            store = None
         
-        self.show_toast("🔄 Все поля очищены", 1.5, "info")
+        # Создание менеджера экранов
+        self.sm = ScreenManager(transition=FadeTransition(duration=0.3))
+        
+        # Добавление экранов
+        self.sm.add_widget(ProfessionalCalculatorScreen(name='calculator'))
+        self.sm.add_widget(ProfessionalHistoryScreen(name='history'))
+        # TODO: Добавить ProfessionalSettingsScreen
+        
+        error_logger.log_event("All screens initialized successfully")
+        
+        return self.sm
     
-    def clear_all(self, instance):
-        """Полная очистка"""
-        self.quick_clear(instance)
+    def _setup_window(self):
+        """Настройка окна приложения"""
+        try:
+            profile = AdaptiveMetrics.get_screen_profile()
+            
+            if profile['name'] in ['large', 'xlarge']:
+                # Десктопный режим
+                Window.size = (1000, 700)
+                Window.minimum_width = 800
+                Window.minimum_height = 600
+            else:
+                # Мобильный режим
+                Window.fullscreen = 'auto'
+            
+            # Настройка иконки (если есть)
+            try:
+                self.icon = 'icon.png'  # Будет искать в директории приложения
+            except:
+                pass
+                
+        except Exception as e:
+            error_logger.log_error(e, "ConeCalculator._setup_window")
+    
+    def on_start(self):
+        """Вызывается при запуске приложения"""
+        error_logger.log_event("Application started successfully")
+        self._check_system_health()
+    
+    def on_pause(self):
+        """Уход в фон (Android): процесс может быть завершен без on_stop"""
+        HistoryStore.flush_all()
+        return True
+    
+    def on_stop(self):
+        """Вызывается при закрытии приложения"""
+        HistoryStore.flush_all()
+        if background_io.pending:
+            error_logger.log_event(f"Waiting for {background_io.pending} background writes")
+        background_io.shutdown()
+        error_logger.log_event("=== APPLICATION STOPPED ===")
+        error_logger.log_event("")  # Пустая строка для разделения сессий
+    
+    def _check_system_health(self):
+        """Проверка здоровья системы"""
+        try:
+            issues = []
+            
+            # Проверка хранилища
+            if store is None:
+                issues.append("Хранилище данных не доступно")
+            
+            # Проверка PyGame
+            if not PYGAME_AVAILABLE:
+                issues.append("PyGame не доступен - графика будет ограничена")
+            
+            # Проверка свободного места
+            try:
+                total, used, free = shutil.disk_usage(".")
+                if free < 100 * 1024 * 1024:  # 100 MB
+                    issues.append("Мало свободного места на диске")
+            except:
+                pass
+            
+            if issues:
+                error_logger.log_event(f"System health issues: {', '.join(issues)}", "WARNING")
+            else:
+                error_logger.log_event("System health: OK")
+                
+        except Exception as e:
+            error_logger.log_error(e, "ConeCalculator._check_system_health")
 
-# === УЛУЧШЕННЫЙ ЭКРАН ИСТОРИИ ===
-class ProfessionalHistoryScreen(ProfessionalScreen):
-    """Профессиональный экран истории расчетов"""
+# === НАБОР БЕНЧМАРКОВ ===
+class BenchmarkSuite:
+    """Воспроизводимые бенчмарки горячих путей модуля (запускаются без окна)"""
     
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        self.name = 'history'
+    GROUPS = ('geometry', 'validation', 'rendering', 'storage', 'metrics', 'ui', 'nesting', 'toolpath')
+    HISTORY_SIZES = (100, 10000, 100000)
+    RENDER_SIZE = (800, 600)
     
-    def setup_ui(self):
-        """Создание интерфейса истории"""
-        main_layout = FloatLayout()
+    def __init__(self, repeat=7, seed=42, quick=False):
+        self.repeat = repeat
+        self.seed = seed
+        self.quick = quick
+        self.results = {}
+    
+    def measure(self, name, func, number=1, repeat=None):
+        """Замер функции: медиана и минимум по серии повторов"""
+        timings = []
+        for _ in range(repeat or self.repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                func()
+            timings.append((time.perf_counter() - start) / number)
+        
+        timings.sort()
+        self.results[name] = {
+            'median_ms': timings[len(timings) // 2] * 1000,
+            'min_ms': timings[0] * 1000,
+            'max_ms': timings[-1] * 1000,
+            'repeat': len(timings),
+            'number': number
+        }
+    
+    def skip(self, name, reason):
+        """Отметка пропущенного замера"""
+        self.results[name] = {'skipped': reason}
+    
+    @staticmethod
+    def _sample_entry(index):
+        """Детерминированная запись истории для наполнения хранилища"""
+        diameter = 100 + index % 900
+        height = 200 + index % 700
+        _, generatrix, angle = ConeGeometry.basic_parameters(diameter, height)
+        return {
+            'diameter': diameter,
+            'height': height,
+            'cut_type': 'slant',
+            'cut_param': 30,
+            'segments': 16,
+            'L_values': ConeGeometry.slant_l_values(diameter / 2, height, 30, 16),
+            'generatrix': generatrix,
+            'angle': angle,
+            'date': '01.01.2025 12:00:00',
+            'timestamp': '2025-01-01T12:00:00'
+        }
+    
+    def run_geometry(self):
+        """L-значения: скалярный и пакетный расчет"""
+        self.measure('geometry.basic_parameters', lambda: ConeGeometry.basic_parameters(300, 400), number=10000)
+        for model in ('approximate', 'exact'):
+            for segments in (16, 36):
+                self.measure(f'geometry.l_values_{model}_{segments}',
+                             lambda: ConeGeometry.slant_l_values(150, 400, 30, segments, model), number=1000)
+            self.measure(f'geometry.l_values_{model}_10000',
+                         lambda: ConeGeometry.slant_l_values(150, 400, 30, 10000, model), number=10)
+        
+        # Живой предпросмотр пересчитывает один конус на каждое изменение поля
+        budget_ms = AppConfig.PERFORMANCE['preview_latency_budget'] * 1000
+        for name in ('geometry.l_values_exact_36', 'geometry.l_values_exact_10000'):
+            self.results[name]['budget_ms'] = budget_ms
+        
+        high_res = {'diameter': 300, 'height': 400, 'cut_type': 'slant', 'cut_param': 30, 'segments': 10000,
+                    'L_values': ConeGeometry.slant_l_values(150, 400, 30, 10000), 'generatrix': 427.2, 'angle': 126.4}
+        export_path = os.path.join(tempfile.gettempdir(), 'cone_calc_bench_export.csv')
+        self.measure('geometry.export_csv_10000', lambda: CalculationExporter.write(export_path, high_res), number=5)
+        os.remove(export_path)
+        for extension in CalculationExporter.VECTOR_EXTENSIONS:
+            drawing_path = os.path.join(tempfile.gettempdir(), f'cone_calc_bench_export{extension}')
+            name = f'geometry.export_{extension[1:]}_10000'
+            self.measure(name, lambda: CalculationExporter.write(drawing_path, high_res), number=5)
+            # Повторная запись должна дать те же байты (ключ кэша по содержимому)
+            digests = set()
+            for _ in range(2):
+                CalculationExporter.write(drawing_path, high_res)
+                with open(drawing_path, 'rb') as f:
+                    digests.add(hashlib.sha256(f.read()).hexdigest())
+            self.results[name]['reproducible'] = len(digests) == 1
+            self.results[name]['size_kb'] = round(os.path.getsize(drawing_path) / 1024, 1)
+            os.remove(drawing_path)
+        
+        rng = random.Random(self.seed)
+        radius = [rng.uniform(50, 2500) for _ in range(10000)]
+        height = [rng.uniform(100, 5000) for _ in range(10000)]
+        alpha = [rng.uniform(0, 90) for _ in range(10000)]
+        for model in ('approximate', 'exact'):
+            self.measure(f'geometry.l_values_batch_{model}_10k',
+                         lambda: ConeGeometry.slant_l_values_batch(radius, height, alpha, 36, model))
+        
+        h_cut = [h * 0.5 for h in height]
+        self.measure('geometry.frustum_development_batch_10k',
+                     lambda: ConeGeometry.frustum_development_batch(radius, height, h_cut))
+        self.measure('geometry.arc_polylines_batch_1k_x_361',
+                     lambda: ConeGeometry.arc_polylines_batch(radius[:1000], alpha[:1000], 361))
+        self.measure('geometry.development_outline_10000',
+                     lambda: ConeGeometry.development_outline(427.2, 126.4, high_res['L_values']), number=5)
+        self.measure('geometry.development_outline_kerf_10000',
+                     lambda: ConeGeometry.development_outline(427.2, 126.4, high_res['L_values'], kerf=2.0),
+                     number=5)
+        
+        # Пересчет пачки под другую толщину листа: меняется одна колонка, задания не вводятся заново
+        cut_types = ['slant', 'parallel'] * 5000
+        columns = {'diameter': [2 * r for r in radius], 'height': height, 'cut_param': alpha,
+                   'segments': [36] * 10000, 'thickness': [0.0] * 10000, 'kerf': [0.0] * 10000}
+        rows = [{field: columns[field][i] for field in columns} for i in range(10000)]
+        self.measure('geometry.calculate_rows_10k',
+                     lambda: [ConeGeometry.calculate(row, cut_type) for row, cut_type in zip(rows, cut_types)])
+        plate = {**columns, 'thickness': [10.0] * 10000, 'kerf': [2.0] * 10000}
+        self.measure('geometry.recalculate_columns_10k', lambda: ConeGeometry.calculate_columns(plate, cut_types))
+        
+        # Общий решатель плоскости сверяется с замкнутой формой
+        sample = (radius[:500] + radius[:2], height[:500] + height[:2], alpha[:500] + [0, 90])
+        exact = ConeGeometry.slant_l_values_batch(*sample, 36, 'exact')
+        closed = [ConeGeometry.exact_slant_l_values(r, h, a, 36) for r, h, a in zip(*sample)]
+        self.results['geometry.exact_solver_max_error'] = {
+            'max_error_mm': max(abs(float(a) - b) for row, ref in zip(exact, closed) for a, b in zip(row, ref))
+        }
+    
+    def run_validation(self):
+        """InputValidator: построчная и колоночная проверка"""
+        self.measure(
+            'validation.cone_parameters_valid',
+            lambda: InputValidator.validate_cone_parameters('300', '400', '30', '16', 'slant'),
+            number=1000
+        )
+        self.measure(
+            'validation.cone_parameters_invalid',
+            lambda: InputValidator.validate_cone_parameters('abc', '0', '95', '100', 'slant'),
+            number=1000
+        )
         
-        # Фон
-        self.renderer = HybridPyGameRenderer()
-        main_layout.add_widget(self.renderer)
+        # Пачка строковых полей, как из CSV: ~10% строк с ошибками
+        size = 10000
+        rows = [
+            (str(100 + i % 900), str(200 + i % 700), 'x' if i % 10 == 0 else str(i % 60),
+             str(8 + i % 29), 'slant' if i % 2 else 'parallel')
+            for i in range(size)
+        ]
+        columns = [list(column) for column in zip(*rows)]
         
-        # Основной контент
-        content = self._create_content_layout()
-        main_layout.add_widget(content)
+        def validate_rows():
+            return [InputValidator.validate_cone_parameters(*row) for row in rows]
         
-        self.add_widget(main_layout)
+        def validate_columns():
+            values, errors = InputValidator.validate_columns(*columns)
+            return [
+                InputValidator.describe_errors(errors[i], columns[4][i], values['height'][i])
+                for i in range(len(errors)) if errors[i]
+            ]
         
-        # Загрузка истории
-        Clock.schedule_once(lambda dt: self.load_history(), 0.5)
+        self.measure(f'validation.rows_{size}', validate_rows)
+        self.measure(f'validation.columns_{size}', validate_columns)
     
-    def _create_content_layout(self):
-        """Создание основного контента"""
-        content = BoxLayout(
-            orientation='vertical',
-            padding=AdaptiveMetrics.get_padding(),
-            spacing=AdaptiveMetrics.adaptive_dp(15),
-            size_hint=(0.95, 0.9),
-            pos_hint={'center_x': 0.5, 'center_y': 0.5}
+    def run_rendering(self):
+        """Фазы рендеринга PyGame на оффскрин-поверхности и загрузка текстуры"""
+        names = (
+            'rendering.gradient_background', 'rendering.particles', 'rendering.default_cone',
+            'rendering.cone_scheme', 'rendering.development_scheme', 'rendering.hybrid_scheme',
+            'rendering.full_frame', 'rendering.full_frame_min_scale', 'rendering.texture_convert',
+            'rendering.texture_cache_hit',
+            'rendering.resize_churn_per_event', 'rendering.resize_churn_debounced',
+            'rendering.texture_upload'
         )
+        if not PyGameScene.load_pygame():
+            for name in names:
+                self.skip(name, 'pygame not available')
+            return
         
-        # Заголовок
-        content.add_widget(self._create_header())
-        
-        # Статистика
-        self.stats_label = Label(
-            text='Загрузка истории...',
-            font_size=AdaptiveMetrics.adaptive_sp(14),
-            color=AppConfig.COLORS['light'][:3] + (0.8,),
-            size_hint_y=None,
-            height=AdaptiveMetrics.adaptive_dp(30)
+        random.seed(self.seed)
+        scene = PyGameScene()
+        surface = scene.create_offscreen_surface(self.RENDER_SIZE)
+        _, generatrix, angle = ConeGeometry.basic_parameters(300, 400)
+        calculation_data = {'diameter': 300, 'height': 400, 'generatrix': generatrix, 'angle': angle}
+        
+        self.measure('rendering.gradient_background', scene._render_gradient_background, number=10)
+        self.measure('rendering.particles', scene._render_particles, number=10)
+        
+        scene.calculation_data = None
+        self.measure('rendering.default_cone', scene._render_visualization, number=10)
+        
+        scene.calculation_data = calculation_data
+        for mode in ('cone', 'development', 'hybrid'):
+            scene.visualization_mode = mode
+            self.measure(f'rendering.{mode}_scheme', scene._render_visualization, number=10)
+        
+        self.measure('rendering.full_frame', scene.render_frame, number=10)
+        
+        # Тот же кадр при минимальном масштабе рендеринга
+        min_scale = AppConfig.PERFORMANCE['min_render_scale']
+        scene._render_scale = min_scale
+        scene.create_offscreen_surface(tuple(int(side * min_scale) for side in self.RENDER_SIZE))
+        self.measure('rendering.full_frame_min_scale', scene.render_frame, number=10)
+        scene._render_scale = 1.0
+        scene._pg_surface = surface
+        self.measure('rendering.texture_convert', lambda: pygame.image.tostring(surface, 'RGBA'), number=10)
+        
+        cache_owner = UnifiedRenderer()
+        self.measure(
+            'rendering.texture_cache_hit',
+            lambda: cache_owner.get_pygame_surface('bench', self.RENDER_SIZE),
+            number=1000
         )
-        content.add_widget(self.stats_label)
+        cache_owner.release_resources()
         
-        # Список истории
-        scroll = ScrollView(do_scroll_x=False)
-        self.history_list = BoxLayout(
-            orientation='vertical',
-            size_hint_y=None,
-            spacing=AdaptiveMetrics.adaptive_dp(10),
-            padding=AdaptiveMetrics.adaptive_dp(10)
-        )
-        self.history_list.bind(minimum_height=self.history_list.setter('height'))
+        self._measure_resize_churn()
         
-        scroll.add_widget(self.history_list)
-        content.add_widget(scroll)
+        if Window is None:
+            self.skip('rendering.texture_upload', 'no GL context in headless mode')
+        else:
+            texture = Texture.create(size=surface.get_size())
+            pixels = pygame.image.tostring(surface, 'RGBA')
+            self.measure(
+                'rendering.texture_upload',
+                lambda: texture.blit_buffer(pixels, colorfmt='rgba', bufferfmt='ubyte'),
+                number=10
+            )
+    
+    @staticmethod
+    def _resize_script():
+        """Сценарий изменения размера: перетаскивание окна туда-обратно и повороты планшета
+        
+        Возвращает список (время события в секундах, (ширина, высота)).
+        """
+        events = []
+        t = 0.0
+        for step in range(90):  # Растягивание окна, 60 событий в секунду
+            events.append((t, (800 + step * 7, 600 + step * 4)))
+            t += 1 / 60
+        t += 0.5
+        for step in range(60):  # Обратное сжатие
+            events.append((t, (1430 - step * 8, 960 - step * 5)))
+            t += 1 / 60
+        for index in range(4):  # Повороты
+            t += 1.0
+            events.append((t, (600, 800) if index % 2 == 0 else (800, 600)))
+        return events
+    
+    def _measure_resize_churn(self):
+        """Объем переаллокаций поверхности при сценарии изменения размера"""
+        events = self._resize_script()
+        delay = AppConfig.PERFORMANCE['resize_debounce']
+        
+        # Прежнее поведение: полный кадр на каждое событие
+        self.results['rendering.resize_churn_per_event'] = {
+            'events': len(events),
+            'allocations': len(events),
+            'allocated_mb': sum(w * h * 4 for _, (w, h) in events) / 1048576
+        }
+        
+        # Debounce: применяется событие, после которого была пауза не короче задержки
+        applied = [
+            size for index, (t, size) in enumerate(events)
+            if index == len(events) - 1 or events[index + 1][0] - t >= delay
+        ]
+        
+        owner = UnifiedRenderer()
+        allocator = RenderSurfaceAllocator(owner, 'bench_resize')
+        texture_allocations = 0
+        start = time.perf_counter()
+        for size in applied:
+            if allocator.resize(size):
+                texture_allocations += 1
+            allocator.acquire()
+        elapsed = time.perf_counter() - start
+        owner.release_resources()
+        
+        self.results['rendering.resize_churn_debounced'] = {
+            'events': len(events),
+            'applied': len(applied),
+            'allocations': allocator.allocations,
+            'allocated_mb': allocator.allocated_bytes / 1048576,
+            'texture_allocations': texture_allocations,
+            'median_ms': elapsed * 1000
+        }
+    
+    def run_storage(self):
+        """Запись и чтение истории на 100, 10k и 100k записей"""
+        global store
+        sizes = self.HISTORY_SIZES[:-1] if self.quick else self.HISTORY_SIZES
+        original_limit = AppConfig.LIMITS['max_history_items']
+        
+        with tempfile.TemporaryDirectory() as workdir:
+            try:
+                for size in sizes:
+                    # Большие объемы замеряем меньшим числом повторов
+                    repeat = self.repeat if size <= 10000 else 3
+                    AppConfig.LIMITS['max_history_items'] = size + repeat
+                    
+                    path = os.path.join(workdir, f'history_{size}.json')
+                    # Файл прежнего формата с полными записями: открытие переводит его в ссылки
+                    JsonStore(path).put('history', calculations=[self._sample_entry(i) for i in range(size)])
+                    legacy_mb = os.path.getsize(path) / 1e6
+                    history = HistoryStore(path)
+                    self.results[f'storage.history_dedup_{size}'] = {
+                        'legacy_file_mb': round(legacy_mb, 2),
+                        'file_mb': round(os.path.getsize(path) / 1e6, 2),
+                        **history.stats()
+                    }
+                    
+                    entry = self._sample_entry(size)
+                    self.measure(f'storage.history_append_{size}', lambda: history.append(dict(entry)), repeat=repeat)
+                    # Синхронная запись после каждого расчета, как до write-behind
+                    self.measure(f'storage.history_flush_{size}',
+                                 lambda: (history.append(dict(entry)), history.flush()), repeat=repeat)
+                    self.measure(f'storage.history_load_{size}', history.load, repeat=repeat)
+                    self.measure(f'storage.history_open_{size}', lambda: HistoryStore(path).load(), repeat=repeat)
+                
+                # Общее хранилище SQLite: запись одной транзакцией и дочитывание чужих записей
+                size = self.HISTORY_SIZES[-2]
+                AppConfig.LIMITS['max_history_items'] = size + 2 * self.repeat
+                path = os.path.join(workdir, 'shared.db')
+                writer, reader = SharedHistoryStore(path), SharedHistoryStore(path)
+                self.measure(f'storage.shared_import_{size}',
+                             lambda: writer.extend(self._sample_entry(i) for i in range(size)), repeat=1)
+                self.measure(f'storage.shared_open_{size}', lambda: SharedHistoryStore(path).load(), repeat=3)
+                reader.load()
+                entry = self._sample_entry(size)
+                self.measure(f'storage.shared_append_{size}', lambda: writer.append(dict(entry)))
+                
+                def refresh():
+                    writer.append(dict(entry))
+                    return reader.load()
+                
+                self.measure(f'storage.shared_refresh_{size}', refresh)
+                writer.close()
+                reader.close()
+                
+                # Серия из 1000 расчетов подряд: сколько раз переписан файл
+                AppConfig.LIMITS['max_history_items'] = 10000
+                history = HistoryStore(os.path.join(workdir, 'burst.json'))
+                burst = [self._sample_entry(i) for i in range(1000)]
+                
+                def run_burst():
+                    for entry in burst:
+                        history.append(dict(entry))
+                    history.flush()
+                
+                self.measure('storage.history_burst_1000', run_burst, repeat=3)
+                self.results['storage.history_burst_1000'].update(
+                    flushes=history.flush_stats['flushes'],
+                    appends=3 * len(burst),
+                    flush_max_ms=round(history.flush_stats['max_ms'], 2)
+                )
+                
+                # Форматы L-значений: байт на запись в JSON и время упаковки/распаковки
+                for segments in (16, 360):
+                    values = ConeGeometry.slant_l_values(150, 400, 30, segments)
+                    self.results[f'storage.l_values_json_{segments}'] = {
+                        'bytes_per_entry': len(json.dumps(values))
+                    }
+                    for dtype, delta, compress in (('f8', False, False), ('f8', True, True),
+                                                   ('f4', False, False), ('f4', True, True)):
+                        codec = PackedArray.encode(values, dtype, delta, compress)
+                        name = f"storage.l_values_{codec['codec'].replace('+', '_')}_{segments}"
+                        self.measure(f'{name}.encode', lambda: PackedArray.encode(values, dtype, delta, compress), number=100)
+                        self.measure(f'{name}.decode', lambda: PackedArray.decode(codec), number=100)
+                        decoded = PackedArray.decode(codec)
+                        self.results[f'{name}.encode'].update(
+                            bytes_per_entry=len(json.dumps(codec)),
+                            max_error_mm=max(abs(a - b) for a, b in zip(values, decoded))
+                        )
+                
+                # Перенос архива станции: выгрузка и загрузка 100k записей потоком
+                size = self.HISTORY_SIZES[-1] if not self.quick else self.HISTORY_SIZES[-2]
+                AppConfig.LIMITS['max_history_items'] = size
+                samples = [self._sample_entry(i) for i in range(1000)]
+                entries = [{**samples[i % 1000], 'timestamp': f'2025-01-01T12:00:00.{i:06d}'} for i in range(size)]
+                for fmt in HistoryTransfer.FORMATS:
+                    if fmt == 'parquet':
+                        try:
+                            HistoryTransfer.arrow()
+                        except RuntimeError:
+                            self.skip(f'storage.history_export_{fmt}_{size}', 'pyarrow not installed')
+                            self.skip(f'storage.history_import_{fmt}_{size}', 'pyarrow not installed')
+                            continue
+                    path = os.path.join(workdir, f'archive.{fmt}')
+                    self.measure(f'storage.history_export_{fmt}_{size}',
+                                 lambda: HistoryTransfer.export(entries, path, fmt), repeat=3)
+                    target = HistoryStore(os.path.join(workdir, f'imported_{fmt}.json'))
+                    
+                    def transfer():
+                        target.clear()
+                        return HistoryTransfer.import_into(target, path, fmt)
+                    
+                    self.measure(f'storage.history_import_{fmt}_{size}', transfer, repeat=3)
+                    added, _, failed = transfer()
+                    self.results[f'storage.history_import_{fmt}_{size}'].update(
+                        records_per_s=round(size / (self.results[f'storage.history_import_{fmt}_{size}']['median_ms'] / 1000)),
+                        file_mb=round(os.path.getsize(path) / 1e6, 1),
+                        roundtrip_ok=added == size and not failed
+                    )
+            finally:
+                AppConfig.LIMITS['max_history_items'] = original_limit
+    
+    def run_metrics(self):
+        """Вызовы AdaptiveMetrics"""
+        self.measure('metrics.screen_profile', AdaptiveMetrics.get_screen_profile, number=10000)
+        self.measure('metrics.adaptive_dp', lambda: AdaptiveMetrics.adaptive_dp(15), number=10000)
+        self.measure('metrics.adaptive_sp', lambda: AdaptiveMetrics.adaptive_sp(16), number=10000)
+        self.measure('metrics.padding', AdaptiveMetrics.get_padding, number=10000)
+    
+    UI_REUSE = ('toast_show', 'history_rows_20', 'details_popup')
+    
+    def run_ui(self):
+        """Сборка повторяющихся виджетов (только при наличии окна) и отчет о ходе операций"""
+        self._measure_progress()
+        if Window is None:
+            self.skip('ui.toast_build', 'no window in headless mode')
+            self.skip('ui.progress_overlay_build', 'no window in headless mode')
+            self.skip('ui.toast_burst_100', 'no window in headless mode')
+            for name in self.UI_REUSE:
+                self.skip(f'ui.{name}_new', 'no window in headless mode')
+                self.skip(f'ui.{name}_pooled', 'no window in headless mode')
+            return
         
-        return content
+        self.measure('ui.toast_build', lambda: Toast(text='Benchmark'), number=20)
+        self.measure('ui.progress_overlay_build', lambda: ProgressOverlay(text='Benchmark'), number=20)
+        self._measure_widget_reuse()
+        self._measure_toast_burst()
     
-    def _create_header(self):
-        """Создание заголовка"""
-        header = BoxLayout(
-            orientation='horizontal',
-            size_hint_y=None,
-            height=AdaptiveMetrics.get_button_height()
-        )
+    def _measure_progress(self):
+        """Стоимость ProgressReporter.update на шаге работы: 100000 вызовов подряд"""
+        reporter = ProgressReporter(lambda value, text: None, total=100000, ui_thread=False)
         
-        back_btn = self.create_professional_button(
-            '← Назад (Esc)', 'secondary', self.on_back_press,
-            size_hint=(None, None)
-        )
-        back_btn.width = AdaptiveMetrics.adaptive_dp(120)
+        def updates():
+            for i in range(100000):
+                reporter.update(i)
         
-        title = Label(
-            text='[b]ИСТОРИЯ РАСЧЕТОВ[/b]',
-            font_size=AdaptiveMetrics.adaptive_sp(22),
-            markup=True,
-            color=AppConfig.COLORS['light']
+        self.measure('ui.progress_update_100k', updates)
+        result = self.results['ui.progress_update_100k']
+        result.update(ns_per_update=result['median_ms'] * 10, delivered=reporter.delivered)
+    
+    def _measure_toast_burst(self):
+        """100 уведомлений подряд (10 разных текстов) через toast_manager
+        
+        Часы Kivy в замере не идут, поэтому показ остается первым сообщением,
+        а остальные сливаются или вытесняют друг друга из очереди.
+        """
+        parent = FloatLayout()
+        before = toast_manager.stats()
+        
+        def burst():
+            for i in range(100):
+                toast_manager.show(parent, f'Benchmark {i % 10}', AppConfig.COLORS['primary'], 2.0)
+        
+        self.measure('ui.toast_burst_100', burst)
+        after = toast_manager.stats()
+        self.results['ui.toast_burst_100'].update(
+            toasts_on_screen=sum(isinstance(child, Toast) for child in parent.children),
+            **{counter: after[counter] - before[counter] for counter in ('animations', 'coalesced', 'dropped')}
         )
+    
+    def _measure_reuse(self, name, show, widgets_per_tree, created=None):
+        """Время до показа и выделения памяти на 20 показов
+        
+        created() - счетчик построенных деревьев (для пула); без него каждый показ строит дерево.
+        """
+        before = created() if created else 0
+        tracemalloc.start()
+        for _ in range(20):
+            show()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        trees = created() - before if created else 20
+        self.measure(name, show, number=20)
+        self.results[name].update(allocations=trees * widgets_per_tree, allocated_mb=peak / 1048576)
+    
+    def _measure_widget_reuse(self):
+        """Повторные элементы интерфейса: новое дерево на каждый показ против widget_pool"""
+        parent = FloatLayout()
+        
+        def show_toast(toast):
+            toast.bind_message('Benchmark', AppConfig.COLORS['primary'], 2.0)
+            toast.show(parent)
+            Animation.cancel_all(toast)
+            toast._dismiss_event.cancel()
+            return toast
         
-        clear_btn = self.create_professional_button(
-            '🗑️ Очистить', 'danger', self.clear_history,
-            size_hint=(None, None)
+        def toast_new():
+            parent.remove_widget(show_toast(Toast()))
+        
+        def toast_pooled():
+            show_toast(widget_pool.acquire('toast', Toast)).recycle()
+        
+        toast_widgets = len(list(Toast().walk()))
+        self._measure_reuse('ui.toast_show_new', toast_new, toast_widgets)
+        self._measure_reuse('ui.toast_show_pooled', toast_pooled, toast_widgets,
+                            lambda: widget_pool.created('toast'))
+        
+        screen = ProfessionalHistoryScreen(name='bench_history')
+        entries = [self._sample_entry(i) for i in range(20)]
+        
+        def rows_new():
+            screen.history_list.clear_widgets()
+            for entry in entries:
+                row = screen._create_history_row()
+                screen._bind_history_row(row, entry)
+                screen.history_list.add_widget(row)
+        
+        def rows_pooled():
+            screen._clear_rows()
+            for entry in entries:
+                screen._add_history_item(entry)
+        
+        row_widgets = len(list(screen._create_history_row().walk())) * len(entries)
+        self._measure_reuse('ui.history_rows_20_new', rows_new, row_widgets)
+        screen.history_list.clear_widgets()
+        rows_pooled()
+        self._measure_reuse('ui.history_rows_20_pooled', rows_pooled, row_widgets,
+                            lambda: widget_pool.created('history_row') // len(entries))
+        
+        calculation = ConeGeometry.calculate(
+            {'diameter': 300, 'height': 400, 'cut_param': 30, 'segments': 36}, 'slant'
         )
-        clear_btn.width = AdaptiveMetrics.adaptive_dp(120)
+        calculation['date'] = '01.01.2025 12:00:00'
+        
+        def popup_new():
+            popup = screen._create_details_popup()
+            popup.title_label.text = f'[b]РАСЧЕТ ОТ {calculation["date"]}[/b]'
+            popup.details_label.text = str(calculation['L_values'][:8])
+        
+        def popup_pooled():
+            popup = widget_pool.acquire('details_popup', screen._create_details_popup)
+            popup.title_label.text = f'[b]РАСЧЕТ ОТ {calculation["date"]}[/b]'
+            popup.details_label.text = str(calculation['L_values'][:8])
+            widget_pool.release('details_popup', popup)
+        
+        popup_widgets = len(list(screen._create_details_popup().walk()))
+        self._measure_reuse('ui.details_popup_new', popup_new, popup_widgets)
+        self._measure_reuse('ui.details_popup_pooled', popup_pooled, popup_widgets,
+                            lambda: widget_pool.created('details_popup'))
+    
+    def run_nesting(self):
+        """Раскрой: жадный прогон для 24 деталей и использование листа"""
+        if not NUMPY_AVAILABLE:
+            self.skip('nesting.greedy_24_parts', 'numpy not installed')
+            return
         
-        header.add_widget(back_btn)
-        header.add_widget(title)
-        header.add_widget(clear_btn)
+        jobs = ((600, 800, 'slant', 30), (400, 500, 'parallel', 300), (900, 600, 'slant', 15), (300, 400, 'parallel', 250))
+        results = [ConeGeometry.calculate({'diameter': D, 'height': H, 'cut_param': cut, 'segments': 36}, cut_type)
+                   for D, H, cut_type, cut in jobs]
         
-        return header
-    
-    def load_history(self):
-        """Загрузка истории расчетов"""
-        self.history_list.clear_widgets()
+        def nest():
+            nester = SheetNester(grid_step=20)
+            for result in results:
+                nester.add_part(result, quantity=6)
+            return nester.optimize(time_budget=0)
         
-        try:
-            global store
-            if store is None:
-                self._show_empty_state("Хранилище не доступно")
-                return
-            
-            if not store.exists('history'):
-                self._show_empty_state("История расчетов пуста")
-                self.stats_label.text = "Расчетов: 0"
-                return
-            
-            history_data = store.get('history')['calculations']
-            
-            if not history_data:
-                self._show_empty_state("История расчетов пуста")
-                self.stats_label.text = "Расчетов: 0"
-                return
-            
-            # Статистика
-            total = len(history_data)
-            today = datetime.now().date()
-            recent = len([c for c in history_data 
-                         if datetime.fromisoformat(c.get('timestamp', '2000-01-01')).date() == today])
-            
-            self.stats_label.text = f"Всего: {total} | Сегодня: {recent} | Показано: {min(20, total)}"
-            
-            # Показ последних 20 записей
-            for calc in reversed(history_data[-20:]):
-                self._add_history_item(calc)
-                
-        except Exception as e:
-            error_logger.log_error(e, "ProfessionalHistoryScreen.load_history")
-            self._show_empty_state("Ошибка загрузки истории")
-    
-    def _show_empty_state(self, message):
-        """Показ состояния пустой истории"""
-        empty_label = Label(
-            text=f'{message}\n\nСначала выполните расчет в калькуляторе',
-            color=AppConfig.COLORS['light'][:3] + (0.6,),
-            font_size=AdaptiveMetrics.adaptive_sp(16),
-            halign='center'
+        self.measure('nesting.greedy_24_parts', nest, repeat=3)
+        report = nest()
+        self.results['nesting.greedy_24_parts'].update(
+            utilization=report['utilization'], sheets=report['sheets'], pairs_used=report['pairs_used']
         )
-        self.history_list.add_widget(empty_label)
     
-    def _add_history_item(self, calculation):
-        """Добавление элемента истории"""
-        item_layout = BoxLayout(
-            orientation='horizontal',
-            size_hint_y=None,
-            height=AdaptiveMetrics.adaptive_dp(80),
-            spacing=AdaptiveMetrics.adaptive_dp(10),
-            padding=AdaptiveMetrics.adaptive_dp(10)
+    def run_toolpath(self):
+        """Порядок резки: лист с 500 деталями в случайном порядке"""
+        rng = random.Random(self.seed)
+        results = [
+            ConeGeometry.calculate({'diameter': rng.uniform(100, 400), 'height': rng.uniform(100, 500),
+                                    'cut_param': rng.uniform(5, 40), 'segments': 36, 'kerf': 1.5}, 'slant')
+            for _ in range(500)
+        ]
+        layout = list(CalculationExporter.row_layout(results, 6000))
+        rng.shuffle(layout)
+        
+        def plan():
+            planner = ToolpathPlanner(marking=True)
+            for record, outline, dx, dy in layout:
+                planner.add_part(record, dx=dx, dy=dy, outline=outline)
+            return planner.optimize()
+        
+        self.measure('toolpath.plan_500_parts', plan, repeat=3)
+        summary = plan()
+        self.results['toolpath.plan_500_parts'].update(
+            budget_ms=AppConfig.TOOLPATH['time_budget'] * 1000,
+            rapid_length_m=round(summary['rapid_length_mm'] / 1000, 1),
+            rapid_length_unordered_m=round(summary['rapid_length_unordered_mm'] / 1000, 1)
         )
+    
+    def run(self, groups=None):
+        """Запуск выбранных групп бенчмарков"""
+        for group in groups or self.GROUPS:
+            getattr(self, f'run_{group}')()
+        
+        return {
+            'meta': {
+                'version': AppConfig.VERSION,
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'numpy': NUMPY_AVAILABLE,
+                'pygame': PYGAME_AVAILABLE,
+                'headless': Window is None,
+                'repeat': self.repeat,
+                'seed': self.seed,
+                'timestamp': datetime.now().isoformat()
+            },
+            'results': self.results
+        }
+    
+    @staticmethod
+    def compare(results, baseline, tolerance=0.25):
+        """Список регрессий относительно сохраненного базового прогона"""
+        regressions = []
+        for name, current in results['results'].items():
+            reference = baseline.get('results', {}).get(name)
+            if not reference or 'median_ms' not in reference or 'median_ms' not in current:
+                continue
+            
+            limit = reference['median_ms'] * (1 + tolerance)
+            if current['median_ms'] > limit:
+                regressions.append({
+                    'name': name,
+                    'baseline_ms': reference['median_ms'],
+                    'current_ms': current['median_ms'],
+                    'ratio': current['median_ms'] / reference['median_ms'] if reference['median_ms'] else float('inf')
+                })
+        
+        return regressions
+
+# === ПАКЕТНАЯ ОБРАБОТКА ===
+class BatchProcessor:
+    """Потоковый расчет заданий из CSV/JSONL-файлов без графического окна"""
+    
+    FORMATS = ('csv', 'jsonl')
+    INPUT_FIELDS = ('diameter', 'height', 'cut_type', 'cut_param', 'segments', 'thickness', 'kerf')
+    OUTPUT_FIELDS = (
+        'line', 'status', 'diameter', 'height', 'cut_type', 'cut_param', 'segments', 'thickness', 'kerf',
+        'radius', 'generatrix', 'angle', 'L_values', 'errors'
+    )
+    
+    @staticmethod
+    def detect_format(path, default='jsonl'):
+        """Формат файла по расширению"""
+        extension = os.path.splitext(path or '')[1].lower()
+        if extension == '.csv':
+            return 'csv'
+        if extension in ('.jsonl', '.ndjson', '.json'):
+            return 'jsonl'
+        return default
+    
+    @staticmethod
+    def read_jobs(stream, fmt):
+        """Генератор заданий (номер строки, словарь полей) без чтения файла целиком"""
+        if fmt == 'csv':
+            reader = csv.DictReader(stream)
+            for row in reader:
+                yield reader.line_num, row
+            return
         
-        # Фон элемента
-        with item_layout.canvas.before:
-            Color(*AppConfig.COLORS['dark'][:3] + (0.8,))
-            bg_rect = RoundedRectangle(
-                pos=item_layout.pos, size=item_layout.size,
-                radius=[AdaptiveMetrics.adaptive_dp(10)]
-            )
+        for line_no, line in enumerate(stream, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            try:
+                job = json.loads(line)
+            except ValueError as e:
+                job = {'_parse_error': f"Некорректный JSON: {e}"}
+            if not isinstance(job, dict):
+                job = {'_parse_error': "Задание должно быть JSON-объектом"}
+            yield line_no, job
+    
+    @staticmethod
+    def process_chunk(items, overrides=None, cache=None):
+        """Проверка и расчет пачки заданий (выполняется и в процессах-воркерах)
+        
+        overrides - значения полей для всех заданий (например, другая толщина листа).
+        cache - ResultCache (HTTP-сервис): найденные в нем задания не пересчитываются,
+        рассчитанные сохраняются в него; одинаковые задания пачки считаются один раз.
+        """
+        def failed(line_no, job, errors, cut_type=None):
+            # Для ошибочных заданий возвращаем исходные поля, чтобы их можно было сопоставить
+            record = {'line': line_no, **{field: job.get(field) for field in BatchProcessor.INPUT_FIELDS}}
+            if cut_type is not None:
+                record['cut_type'] = cut_type
+            return {**record, 'status': 'error', 'errors': errors}
+        
+        records = [None] * len(items)
+        rows = []
+        for index, (line_no, job) in enumerate(items):
+            if '_parse_error' in job:
+                records[index] = failed(line_no, job, [job['_parse_error']])
+            else:
+                rows.append((index, str(job.get('cut_type') or 'slant').strip().lower()))
         
-        item_layout.bg_rect = bg_rect
-        item_layout.bind(pos=self._update_item_bg, size=self._update_item_bg)
+        if not rows:
+            return records
         
-        # Информация
-        info_layout = BoxLayout(orientation='vertical', size_hint_x=0.7)
+        jobs = [items[index][1] for index, _ in rows]
+        cut_types = [cut_type for _, cut_type in rows]
+        overrides = overrides or {}
         
-        title = Label(
-            text=f"📐 Конус D{calculation['diameter']}×H{calculation['height']}",
-            font_size=AdaptiveMetrics.adaptive_sp(16),
-            color=AppConfig.COLORS['light'],
-            halign='left',
-            text_size=(None, None)
-        )
+        def optional_column(field):
+            # Необязательные поля: пустое значение - 0, общее значение перекрывает задание
+            if overrides.get(field) is not None:
+                return [overrides[field]] * len(jobs)
+            return [0.0 if job.get(field) in (None, '') else job.get(field) for job in jobs]
         
-        details = Label(
-            text=f"🔺 {calculation['cut_type']} • {calculation['segments']} сегментов",
-            font_size=AdaptiveMetrics.adaptive_sp(12),
-            color=AppConfig.COLORS['light'][:3] + (0.8,),
-            halign='left',
-            text_size=(None, None)
-        )
+        try:
+            columns, errors = InputValidator.validate_columns(
+                [job.get('diameter') for job in jobs], [job.get('height') for job in jobs],
+                [job.get('cut_param') for job in jobs], [job.get('segments') for job in jobs],
+                cut_types, optional_column('thickness'), optional_column('kerf')
+            )
+        except Exception as e:
+            error_logger.log_error(e, "BatchProcessor.process_chunk - validation")
+            for index, cut_type in rows:
+                records[index] = failed(*items[index], [f"Ошибка проверки: {e}"], cut_type)
+            return records
+        
+        # Скаляры NumPy в обычные числа Python: одним проходом, а не поштучно
+        errors = [int(bits) for bits in errors]
+        columns = {field: [value.item() if hasattr(value, 'item') else value for value in values]
+                   for field, values in columns.items()}
+        
+        valid = [i for i, bits in enumerate(errors) if not bits]
+        results, missing = {}, valid
+        if cache is not None:
+            keys = {i: ResultCache.key({field: columns[field][i] for field in InputValidator.FIELD_SHIFTS},
+                                       cut_types[i]) for i in valid}
+            pending = {}
+            for i in valid:
+                result = cache.lookup(keys[i])
+                if result is not None:
+                    results[i] = result
+                else:
+                    pending.setdefault(keys[i], []).append(i)
+            missing = [rows_with_key[0] for rows_with_key in pending.values()]
+        try:
+            computed = ConeGeometry.calculate_columns(
+                {field: [columns[field][i] for i in missing] for field in InputValidator.FIELD_SHIFTS},
+                [cut_types[i] for i in missing]
+            ) if missing else []
+            calculation_error = None
+        except Exception as e:
+            error_logger.log_error(e, "BatchProcessor.process_chunk - calculation")
+            computed, calculation_error = [], e
+        if cache is not None:
+            for (key, rows_with_key), result in zip(pending.items(), computed):
+                cache.put(key, result)
+                results.update(dict.fromkeys(rows_with_key, result))
+        else:
+            results.update(zip(missing, computed))
+        
+        for i, (index, cut_type) in enumerate(rows):
+            line_no = items[index][0]
+            if errors[i]:
+                records[index] = failed(*items[index], InputValidator.describe_errors(
+                    errors[i], cut_type, columns['height'][i]
+                ), cut_type)
+            elif calculation_error is not None:
+                records[index] = failed(*items[index], [f"Ошибка расчета: {calculation_error}"], cut_type)
+            else:
+                records[index] = {'line': line_no, **dict.fromkeys(BatchProcessor.INPUT_FIELDS), 'status': 'ok'}
+                # Результат может быть общим (кэш, повторы в пачке) - копируется без cut_info
+                records[index].update((field, value) for field, value in results[i].items() if field != 'cut_info')
         
-        date = Label(
-            text=calculation['date'],
-            font_size=AdaptiveMetrics.adaptive_sp(11),
-            color=AppConfig.COLORS['light'][:3] + (0.6,),
-            halign='left',
-            text_size=(None, None)
-        )
+        return records
+    
+    def __init__(self, workers=1, chunk_size=None, overrides=None):
+        self.workers = max(1, workers)
+        self.chunk_size = chunk_size or AppConfig.BATCH['chunk_size']
+        self.overrides = {field: value for field, value in (overrides or {}).items() if value is not None}
+        self.processed = 0
+        self.failed = 0
+        self.elapsed = 0.0
+    
+    def results(self, jobs):
+        """Результаты в порядке заданий; в памяти не больше окна чанков"""
+        chunks = iter(lambda: list(itertools.islice(jobs, self.chunk_size)), [])
+        process_chunk = functools.partial(BatchProcessor.process_chunk, overrides=self.overrides)
+        if self.workers == 1:
+            for chunk in chunks:
+                yield from process_chunk(chunk)
+            return
         
-        info_layout.add_widget(title)
-        info_layout.add_widget(details)
-        info_layout.add_widget(date)
+        # Pool.imap вычитывает вход без ограничения, поэтому подаем его окнами
+        window = self.workers * AppConfig.BATCH['window_per_worker']
+        with multiprocessing.Pool(self.workers) as pool:
+            while True:
+                window_chunks = list(itertools.islice(chunks, window))
+                if not window_chunks:
+                    break
+                for records in pool.imap(process_chunk, window_chunks):
+                    yield from records
+    
+    @staticmethod
+    def _csv_row(record):
+        """Плоская строка CSV из результата"""
+        precision = AppConfig.BATCH['csv_precision']
+        row = {}
+        for field in BatchProcessor.OUTPUT_FIELDS:
+            value = record.get(field)
+            if value is None:
+                value = ''
+            if field == 'L_values' and value:
+                value = ';'.join(f"{v:.{precision}f}" for v in value)
+            elif field == 'errors' and value:
+                value = '; '.join(value)
+            elif isinstance(value, float) and field != 'cut_param':
+                value = f"{value:.{precision}f}"
+            row[field] = value
+        return row
+    
+    def run(self, source, sink, input_format, output_format, progress=None):
+        """Потоковая обработка: чтение, расчет и запись построчно
+        
+        progress - ProgressReporter по числу обработанных заданий; при отмене
+        обработка останавливается после текущего задания.
+        """
+        writer = None
+        if output_format == 'csv':
+            writer = csv.DictWriter(sink, fieldnames=BatchProcessor.OUTPUT_FIELDS, lineterminator='\n')
+            writer.writeheader()
+        
+        start = time.perf_counter()
+        for record in self.results(BatchProcessor.read_jobs(source, input_format)):
+            if writer is not None:
+                writer.writerow(BatchProcessor._csv_row(record))
+            else:
+                sink.write(json.dumps(record, ensure_ascii=False) + '\n')
+            
+            self.processed += 1
+            if record['status'] != 'ok':
+                self.failed += 1
+            
+            if progress is not None and not progress.update(self.processed):
+                break
         
-        # Кнопка просмотра
-        view_btn = self.create_professional_button(
-            '👁️ Просмотр', 'primary', 
-            lambda instance: self.view_calculation(calculation),
-            size_hint=(None, None)
+        sink.flush()
+        self.elapsed = time.perf_counter() - start
+        return self.processed, self.failed
+
+# === РАСКРОЙ ЛИСТА ===
+class SheetNester:
+    """Раскрой разверток на листах: растровая укладка с поворотами, парами и общим резом
+    
+    Детали растеризуются консервативно (ячейка занята при любом касании контура с
+    припуском), допустимые позиции для всех сдвигов сразу дает FFT-корреляция маски
+    детали с занятостью листа. Поиск перебирает стратегии (порядок, пары, прижим)
+    до исчерпания бюджета времени, по зерну на процесс.
+    
+    Детали с общим резом (common_edge) укладываются веером: каждая следующая - зеркало
+    предыдущей относительно ее прямого края, отодвинутое на ширину реза, так что край
+    соседей - один проход резака. Веер растеризуется одним блоком: припуск на зазор
+    и растр есть только снаружи веера, а не между деталями с общим краем.
+    """
+    
+    def __init__(self, sheet_width=None, sheet_height=None, grid_step=None, gap=None,
+                 rotation_step=None, pairs=True, common_edge=False):
+        config = AppConfig.NESTING
+        self.sheet_width = float(sheet_width or config['sheet_width'])
+        self.sheet_height = float(sheet_height or config['sheet_height'])
+        self.grid_step = float(grid_step or config['grid_step'])
+        self.gap = float(config['part_gap'] if gap is None else gap)
+        step = rotation_step or config['rotation_step']
+        self.rotations = [i * step for i in range(max(1, int(round(360 / step))))]
+        self.pairs = pairs
+        self.common_edge = common_edge
+        self.rows = int(self.sheet_height // self.grid_step)
+        self.cols = int(self.sheet_width // self.grid_step)
+        self.parts = []
+        self._masks = {}
+        self._pair_members = {}
+        self._chains = {}
+    
+    @staticmethod
+    def polygon_area(points):
+        """Площадь замкнутого контура (формула шнурков)"""
+        return abs(sum(x0 * y1 - x1 * y0 for (x0, y0), (x1, y1) in zip(points, points[1:]))) / 2
+    
+    def add_part(self, record, quantity=1, line=None, common_edge=None):
+        """Добавление развертки из результата расчета в задание на раскрой
+        
+        common_edge - укладка одинаковых деталей веером с общим резом (по умолчанию - как у раскроя).
+        """
+        points = AppConfig.NESTING['outline_points']
+        outline = ConeGeometry.part_outline(record, points, max_cut_points=points)
+        xs, ys = [x for x, _ in outline], [y for _, y in outline]
+        self.parts.append({
+            'line': line if line is not None else record.get('line'),
+            'record': record,
+            'outline': outline,
+            'edges': ConeGeometry.outline_edges(outline, points),
+            'area': SheetNester.polygon_area(outline),
+            'box_area': (max(xs) - min(xs)) * (max(ys) - min(ys)),
+            'kerf': float(record.get('kerf') or 0.0),
+            'common_edge': self.common_edge if common_edge is None else bool(common_edge),
+            'quantity': max(0, int(quantity))
+        })
+    
+    @staticmethod
+    def _orient(members, rotation, mirrored):
+        """Члены блока после отражения и поворота всего блока"""
+        a = math.radians(rotation)
+        c, s = math.cos(a), math.sin(a)
+        result = []
+        for part, member_rotation, member_mirrored, dx, dy in members:
+            if mirrored:
+                member_rotation, member_mirrored, dy = -member_rotation, not member_mirrored, -dy
+            result.append((part, (member_rotation + rotation) % 360, member_mirrored,
+                           c * dx - s * dy, s * dx + c * dy))
+        return result
+    
+    @staticmethod
+    def _inside(polygon, X, Y):
+        """Точки сетки внутри замкнутого контура (правило четности)"""
+        inside = np.zeros(X.shape, dtype=bool)
+        for (x0, y0), (x1, y1) in zip(polygon, polygon[1:]):
+            if y0 == y1:
+                continue
+            crosses = (Y < y0) != (Y < y1)
+            inside ^= crosses & (X < x0 + (Y - y0) * (x1 - x0) / (y1 - y0))
+        return inside
+    
+    def _rasterize(self, members, fit_sheet=False):
+        """Консервативная маска блока и координаты ее нижнего левого угла
+        
+        При fit_sheet ориентация, не помещающаяся на лист по габариту, дает (None, None).
+        """
+        step = self.grid_step
+        grown = []
+        for part, rotation, mirrored, dx, dy in members:
+            info = self.parts[part]
+            polygon = ConeGeometry.transform_points(info['outline'], rotation, mirrored, dx, dy)
+            # Припуск на половину зазора и реза плюс полдиагонали ячейки: проверка центров не теряет касаний
+            margin = (self.gap + info['kerf']) / 2 + step * math.sqrt(0.5)
+            grown.append(ConeGeometry.offset_polygon(polygon, margin))
+        
+        points = np.asarray([point for polygon in grown for point in polygon])
+        origin = points.min(axis=0)
+        shape = np.maximum(np.ceil((points.max(axis=0) - origin) / step).astype(int), 1)
+        if fit_sheet and (shape[0] > self.cols or shape[1] > self.rows):
+            return None, None
+        X, Y = np.meshgrid(origin[0] + (np.arange(shape[0]) + 0.5) * step,
+                           origin[1] + (np.arange(shape[1]) + 0.5) * step)
+        mask = np.zeros(X.shape, dtype=bool)
+        for polygon in grown:
+            mask |= SheetNester._inside(polygon, X, Y)
+        return mask, origin
+    
+    def _unit_orientations(self, unit):
+        """Все ориентации блока без повторов: (члены, маска, начало координат)"""
+        key = unit
+        if key in self._masks:
+            return self._masks[key]
+        
+        if unit[0] == 'single':
+            base = [(unit[1], 0.0, False, 0.0, 0.0)]
+        elif unit[0] == 'edge':
+            base = self._edge_chain(unit[1])[0][:unit[2]]
+        else:
+            base = self._pair_members[unit[1]]
+        orientations = []
+        seen = set()
+        for mirrored in (False, True):
+            for rotation in self.rotations:
+                members = SheetNester._orient(base, rotation, mirrored)
+                mask, origin = self._rasterize(members, fit_sheet=True)
+                if mask is None:
+                    continue
+                # Симметричные детали дают одинаковые маски: такие ориентации не перебираем
+                signature = (mask.shape, mask.tobytes())
+                if signature in seen:
+                    continue
+                seen.add(signature)
+                orientations.append((members, mask, origin, int(mask.sum()), {}))
+        self._masks[key] = orientations
+        return orientations
+    
+    def _pair_unit(self, part):
+        """Пара 'валетом' или зеркальная пара, если она плотнее двух отдельных деталей"""
+        if part in self._pair_members:
+            return self._pair_members[part] is not None
+        if not self._unit_orientations(('single', part)):
+            # Деталь не помещается на лист ни в одной ориентации - пара тем более
+            self._pair_members[part] = None
+            return False
+        
+        base_members = [(part, 0.0, False, 0.0, 0.0)]
+        base, base_origin = self._rasterize(base_members)
+        h, w = base.shape
+        best = None
+        for rotation, mirrored in ((180.0, False), (0.0, True), (180.0, True)):
+            other_members = [(part, rotation, mirrored, 0.0, 0.0)]
+            other, origin = self._rasterize(other_members)
+            hq, wq = other.shape
+            canvas = np.zeros((h + 2 * hq, w + 2 * wq))
+            canvas[hq:hq + h, wq:wq + w] = base
+            overlap = np.fft.irfft2(np.fft.rfft2(canvas) * np.conj(np.fft.rfft2(other, s=canvas.shape)),
+                                    s=canvas.shape)[:h + hq + 1, :w + wq + 1]
+            dy, dx = np.ogrid[:h + hq + 1, :w + wq + 1]
+            height = np.maximum(hq + h, dy + hq) - np.minimum(hq, dy)
+            width = np.maximum(wq + w, dx + wq) - np.minimum(wq, dx)
+            area = np.where(overlap < 0.5, height * width, np.iinfo(np.int64).max)
+            index = np.unravel_index(np.argmin(area), area.shape)
+            if best is None or area[index] < best[0]:
+                shift = base_origin - origin + (np.array([index[1] - wq, index[0] - hq]) * self.grid_step)
+                best = (area[index], [base_members[0], (part, rotation, mirrored, float(shift[0]), float(shift[1]))])
+        
+        self._pair_members[part] = best[1] if best[0] < 2 * h * w else None
+        return self._pair_members[part] is not None
+    
+    @staticmethod
+    def _outlines_cross(a, b):
+        """Пересекаются ли ребра двух замкнутых контуров (касание и общий край не в счет)"""
+        a, b = np.asarray(a, dtype=float), np.asarray(b, dtype=float)
+        p, r = a[:-1, None, :], (a[1:] - a[:-1])[:, None, :]
+        q, s = b[None, :-1, :], (b[1:] - b[:-1])[None, :, :]
+        
+        def cross(u, v):
+            return u[..., 0] * v[..., 1] - u[..., 1] * v[..., 0]
+        
+        denom = cross(r, s)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = cross(q - p, s) / denom
+            u = cross(q - p, r) / denom
+        eps = 1e-9
+        return bool(np.any((np.abs(denom) > 1e-12) & (t > eps) & (t < 1 - eps) & (u > eps) & (u < 1 - eps)))
+    
+    def _edge_chain(self, part):
+        """Веер деталей с общим резом: (члены блока, длины общих краев соседей)
+        
+        Деталь i + 1 - зеркало детали i относительно ее дальнего прямого края,
+        сдвинутое от него на ширину реза: контуры соседей симметричны относительно
+        средней линии реза. Веер обрывается на коротком крае (общий рез не окупается)
+        и там, где следующая деталь легла бы на уже уложенные. Одинаковые контуры не
+        вкладываются друг в друга, поэтому пересечения ребер достаточно для проверки.
+        """
+        if part in self._chains:
+            return self._chains[part]
+        info = self.parts[part]
+        members = [(part, 0.0, False, 0.0, 0.0)]
+        polygons = [info['outline']]
+        lengths = []
+        for i in range(1, max(1, AppConfig.NESTING['common_edge_parts'])):
+            _, rotation, mirrored, dx, dy = members[-1]
+            # Дальний край: у первой детали - в конце дуги, дальше края чередуются
+            (px, py), (qx, qy) = ConeGeometry.transform_points(info['edges'][i % 2], rotation, mirrored, dx, dy)
+            length = math.hypot(qx - px, qy - py)
+            if length < self.grid_step:
+                break
+            alpha = math.atan2(qy - py, qx - px)
+            # Нормаль к краю - от предыдущей детали
+            nx, ny = -math.sin(alpha), math.cos(alpha)
+            cx, cy = np.mean(polygons[-1][:-1], axis=0)
+            if (cx - px) * nx + (cy - py) * ny > 0:
+                nx, ny = -nx, -ny
+            c, s = math.cos(2 * alpha), math.sin(2 * alpha)
+            member = (part, (2 * math.degrees(alpha) - rotation) % 360, not mirrored,
+                      px + c * (dx - px) + s * (dy - py) + info['kerf'] * nx,
+                      py + s * (dx - px) - c * (dy - py) + info['kerf'] * ny)
+            polygon = ConeGeometry.transform_points(info['outline'], *member[1:])
+            if any(SheetNester._outlines_cross(polygon, other) for other in polygons):
+                break
+            members.append(member)
+            polygons.append(polygon)
+            lengths.append(length)
+        self._chains[part] = (members, lengths)
+        return self._chains[part]
+    
+    def _new_sheet(self):
+        return {
+            'grid': np.zeros((self.rows, self.cols)),
+            'spectrum': None,
+            'free': self.rows * self.cols,
+            'placements': [],
+            'shared': [],
+            'area': 0.0
+        }
+    
+    def _best_position(self, sheet, orientations, gravity):
+        """Лучшая допустимая позиция блока на листе: (оценка, строка, столбец, ориентация)"""
+        if sheet['spectrum'] is None:
+            sheet['spectrum'] = np.fft.rfft2(sheet['grid'])
+        best = None
+        for orientation in orientations:
+            mask, count, spectra = orientation[1], orientation[3], orientation[4]
+            h, w = mask.shape
+            if h > self.rows or w > self.cols or count > sheet['free']:
+                continue
+            # Спектр маски на размер листа один на ориентацию: все листы одинаковые
+            if 'sheet' not in spectra:
+                spectra['sheet'] = np.conj(np.fft.rfft2(mask, s=sheet['grid'].shape))
+            overlap = np.fft.irfft2(sheet['spectrum'] * spectra['sheet'],
+                                    s=sheet['grid'].shape)[:self.rows - h + 1, :self.cols - w + 1]
+            feasible = overlap < 0.5
+            if not feasible.any():
+                continue
+            y, x = np.ogrid[:self.rows - h + 1, :self.cols - w + 1]
+            # Прижим вниз (по верхнему краю, затем влево) или влево (по правому краю, затем вниз)
+            if gravity == 'bottom':
+                score = (y + h) * self.cols + x
+            else:
+                score = (x + w) * self.rows + y
+            score = np.where(feasible, score, np.iinfo(np.int64).max)
+            index = np.unravel_index(np.argmin(score), score.shape)
+            if best is None or score[index] < best[0]:
+                best = (score[index], index[0], index[1], orientation)
+        return best
+    
+    def _place(self, sheet, position, unit):
+        """Занятие ячеек и запись положения членов блока и общих резов веера"""
+        _, row, col, (members, mask, origin, count, _) = position
+        h, w = mask.shape
+        sheet['grid'][row:row + h, col:col + w] += mask
+        sheet['spectrum'] = None
+        sheet['free'] -= count
+        shift_x = col * self.grid_step - origin[0]
+        shift_y = row * self.grid_step - origin[1]
+        first = len(sheet['placements'])
+        for part, rotation, mirrored, dx, dy in members:
+            sheet['placements'].append((part, rotation, mirrored, dx + shift_x, dy + shift_y))
+            sheet['area'] += self.parts[part]['area']
+        
+        if unit[0] == 'edge':
+            # Общий рез - средняя линия между краем детали и его зеркалом у соседа
+            edges, lengths = self.parts[unit[1]]['edges'], self._edge_chain(unit[1])[1]
+            placed = sheet['placements'][first:]
+            for j, length in enumerate(lengths[:len(placed) - 1]):
+                a = ConeGeometry.transform_points(edges[(j + 1) % 2], *placed[j][1:])
+                b = ConeGeometry.transform_points(edges[(j + 1) % 2], *placed[j + 1][1:])
+                segment = tuple(((a[k][0] + b[k][0]) / 2, (a[k][1] + b[k][1]) / 2) for k in range(2))
+                sheet['shared'].append((first + j, first + j + 1, segment, length))
+    
+    def _strategy(self, index, seed):
+        """Стратегия прогона: нулевая - детерминированная жадная, остальные - случайные"""
+        rng = random.Random(f"{seed}:{index}")
+        # Крупные по габариту детали (в том числе узкие серпы косого среза) - первыми, мелкие заполняют пустоты
+        areas = [part['box_area'] for part in self.parts]
+        if index == 0:
+            order = sorted(range(len(self.parts)), key=lambda i: -areas[i])
+            return {'order': order, 'pairs': self.pairs, 'gravity': 'bottom'}
+        order = sorted(range(len(self.parts)), key=lambda i: -areas[i] * rng.uniform(0.6, 1.4))
+        return {
+            'order': order,
+            'pairs': self.pairs and rng.random() < 0.7,
+            'gravity': rng.choice(('bottom', 'left'))
+        }
+    
+    def _run(self, strategy, deadline=None):
+        """Один прогон укладки; None, если бюджет времени исчерпан раньше"""
+        queue = [part for part in strategy['order'] for _ in range(self.parts[part]['quantity'])]
+        sheets = []
+        unplaced = []
+        pairs_used = edge_groups = 0
+        i = 0
+        while i < len(queue):
+            if deadline is not None and time.perf_counter() > deadline:
+                return None
+            part = queue[i]
+            units = [('single', part)]
+            if strategy['pairs'] and i + 1 < len(queue) and queue[i + 1] == part and self._pair_unit(part):
+                units.insert(0, ('pair', part))
+            if self.parts[part]['common_edge']:
+                # Веер из идущих подряд одинаковых деталей: сначала самый длинный, затем короче
+                run = 1
+                while i + run < len(queue) and queue[i + run] == part:
+                    run += 1
+                longest = min(run, len(self._edge_chain(part)[0]))
+                units[:0] = [('edge', part, k) for k in range(longest, 1, -1)]
+            
+            for unit in units:
+                orientations = self._unit_orientations(unit)
+                position = None
+                # Первый подходящий лист; новый лист - только если не нашлось места
+                for sheet in sheets:
+                    position = self._best_position(sheet, orientations, strategy['gravity'])
+                    if position is not None:
+                        break
+                else:
+                    sheet = self._new_sheet()
+                    position = self._best_position(sheet, orientations, strategy['gravity'])
+                    if position is not None:
+                        sheets.append(sheet)
+                if position is not None:
+                    self._place(sheet, position, unit)
+                    i += len(position[3][0])
+                    pairs_used += unit[0] == 'pair'
+                    edge_groups += unit[0] == 'edge'
+                    break
+            else:
+                unplaced.append(part)
+                i += 1
+        
+        return {'strategy': strategy, 'sheets': sheets, 'unplaced': unplaced, 'pairs_used': pairs_used,
+                'edge_groups': edge_groups}
+    
+    def _used_fraction(self, sheet):
+        """Доля листа до дальнего края деталей (по высоте или ширине - меньшая)"""
+        rows = np.nonzero(sheet['grid'].any(axis=1))[0]
+        cols = np.nonzero(sheet['grid'].any(axis=0))[0]
+        if not len(rows):
+            return 0.0
+        return min((rows[-1] + 1) / self.rows, (cols[-1] + 1) / self.cols)
+    
+    def _layout_key(self, layout):
+        """Сравнение раскладок: все детали, меньше листов, короче занятая часть последнего"""
+        last = self._used_fraction(layout['sheets'][-1]) if layout['sheets'] else 0.0
+        return (len(layout['unplaced']), len(layout['sheets']), last)
+    
+    def search(self, start=0, stride=1, time_budget=None, seed=0, progress=None):
+        """Перебор стратегий start, start + stride, ... до бюджета времени (лучшая раскладка, прогонов)
+        
+        progress - ProgressReporter по затраченному времени; отмена завершает поиск
+        с лучшей из уже найденных раскладок.
+        """
+        budget = AppConfig.NESTING['time_budget'] if time_budget is None else time_budget
+        deadline = time.perf_counter() + budget
+        max_runs = AppConfig.NESTING['max_runs']
+        best, best_key, runs = None, None, 0
+        index = start
+        while runs < max_runs:
+            # Первый прогон доводится до конца, чтобы раскладка была всегда
+            layout = self._run(self._strategy(index, seed), deadline if best is not None else None)
+            if layout is None:
+                break
+            runs += 1
+            key = self._layout_key(layout)
+            if best is None or key < best_key:
+                best, best_key = layout, key
+            now = time.perf_counter()
+            if progress is not None and not progress.update(min(budget, budget - (deadline - now)), f"{runs} runs"):
+                break
+            if now > deadline:
+                break
+            index += stride
+        return best, runs
+    
+    def _search_worker(self, start, stride, time_budget, seed):
+        """Поиск в процессе-воркере (сериализуемая часть результата)"""
+        layout, runs = self.search(start, stride, time_budget, seed)
+        return self._summarize(layout), runs
+    
+    def _summarize(self, layout):
+        """Сводка раскладки без рабочих массивов"""
+        sheets = []
+        for sheet in layout['sheets']:
+            sheets.append({
+                'placements': sheet['placements'],
+                'shared': sheet['shared'],
+                'area': sheet['area'],
+                'used_fraction': self._used_fraction(sheet)
+            })
+        return {
+            'strategy': {key: value for key, value in layout['strategy'].items() if key != 'order'},
+            'key': self._layout_key(layout),
+            'sheets': sheets,
+            'unplaced': layout['unplaced'],
+            'pairs_used': layout['pairs_used'],
+            'edge_groups': layout['edge_groups']
+        }
+    
+    def optimize(self, time_budget=None, workers=1, seed=0, progress=None):
+        """Раскрой с бюджетом времени; при workers > 1 стратегии делятся между процессами
+        
+        progress - ProgressReporter (total - бюджет, с). С одним процессом отмена
+        возвращает лучшую найденную раскладку, с несколькими - OperationCancelled.
+        """
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("Nesting requires NumPy")
+        start = time.perf_counter()
+        budget = AppConfig.NESTING['time_budget'] if time_budget is None else time_budget
+        workers = max(1, workers)
+        if progress is not None:
+            progress.total = budget
+        if workers == 1:
+            layout, runs = self.search(0, 1, budget, seed, progress)
+            summaries = [(self._summarize(layout), runs)]
+        else:
+            with multiprocessing.Pool(workers) as pool:
+                pending = pool.starmap_async(self._search_worker,
+                                             [(k, workers, budget, seed) for k in range(workers)])
+                while not pending.ready():
+                    pending.wait(progress.interval if progress is not None else None)
+                    if progress is not None and not progress.update(min(budget, time.perf_counter() - start)):
+                        raise OperationCancelled()
+                summaries = pending.get()
+        best = min((summary for summary, _ in summaries), key=lambda summary: summary['key'])
+        return self.report(best, sum(runs for _, runs in summaries), time.perf_counter() - start)
+    
+    def report(self, summary, runs, elapsed):
+        """Отчет об использовании листов и положения деталей"""
+        sheet_area = self.sheet_width * self.sheet_height
+        sheets = summary['sheets']
+        placed_area = sum(sheet['area'] for sheet in sheets)
+        placements = []
+        per_sheet = []
+        shared_edges = []
+        for index, sheet in enumerate(sheets):
+            first = len(placements)
+            for part, rotation, mirrored, x, y in sheet['placements']:
+                placements.append({
+                    'sheet': index,
+                    'part': part,
+                    'line': self.parts[part]['line'],
+                    'x': round(x, 3),
+                    'y': round(y, 3),
+                    # Повороты деталей веера не кратны шагу: точность общего реза - микрометры
+                    'rotation': round(rotation, 6),
+                    'mirrored': mirrored
+                })
+            for a, b, ((x0, y0), (x1, y1)), length in sheet['shared']:
+                shared_edges.append({
+                    'sheet': index,
+                    'placements': [first + a, first + b],
+                    'from': [round(x0, 3), round(y0, 3)],
+                    'to': [round(x1, 3), round(y1, 3)],
+                    'length': length
+                })
+            per_sheet.append({
+                'sheet': index,
+                'parts': len(sheet['placements']),
+                'utilization': sheet['area'] / sheet_area,
+                'used_fraction': sheet['used_fraction'],
+                'shared_length_mm': sum(length for *_, length in sheet['shared'])
+            })
+        
+        report = {
+            'sheet_width': self.sheet_width,
+            'sheet_height': self.sheet_height,
+            'grid_step': self.grid_step,
+            'parts': sum(part['quantity'] for part in self.parts),
+            'placed': len(placements),
+            'unplaced': [self.parts[part]['line'] for part in summary['unplaced']],
+            'sheets': len(sheets),
+            'utilization': placed_area / (sheet_area * len(sheets)) if sheets else 0.0,
+            'scrap_area_m2': (sheet_area * len(sheets) - placed_area) / 1e6,
+            'pairs_used': summary['pairs_used'],
+            'common_edge': self.common_edge,
+            'common_edge_groups': summary['edge_groups'],
+            'common_cut_length_mm': sum(edge['length'] for edge in shared_edges),
+            'strategy': summary['strategy'],
+            'runs': runs,
+            'elapsed_s': elapsed,
+            'per_sheet': per_sheet,
+            'placements': placements,
+            'shared_edges': shared_edges
+        }
+        return report
+
+# === ТРАЕКТОРИИ РЕЗА ===
+class ToolpathPlanner:
+    """Траектории реза по разложенным деталям: подводы, порядок обхода и G-код
+    
+    Контуры берутся уже со смещением на половину реза, поэтому коррекция
+    на инструмент в стойке выключена (G40). Порядок на каждом листе: сначала
+    разметка (пока деталь не вырезана и не сдвинулась), затем резка.
+    Обход строится ближайшим соседом и улучшается 2-opt в пределах бюджета времени.
+    Общий рез соседних деталей (add_shared) проходится один раз: его режет первая
+    деталь, у следующих контур размыкается на этом крае.
+    """
+    
+    def __init__(self, lead_in=None, lead_out=None, marking=False):
+        config = AppConfig.TOOLPATH
+        self.lead_in = config['lead_in'] if lead_in is None else max(0.0, lead_in)
+        self.lead_out = config['lead_out'] if lead_out is None else max(0.0, lead_out)
+        self.marking = marking
+        self.sheets = []
+        self.plan = None
+    
+    def new_sheet(self):
+        """Следующие детали ложатся на новый лист (своя программа после M00)"""
+        self.sheets.append({'cuts': [], 'marks': [], 'shared': []})
+    
+    def add_shared(self, start, end):
+        """Общий рез соседних деталей текущего листа (средняя линия реза между ними)"""
+        if not self.sheets:
+            self.new_sheet()
+        self.sheets[-1]['shared'].append({'segment': (tuple(start), tuple(end)), 'owner': None})
+    
+    def add_part(self, calc, rotation=0.0, mirrored=False, dx=0.0, dy=0.0, outline=None):
+        """Деталь в положении на текущем листе"""
+        if not self.sheets:
+            self.new_sheet()
+        sheet = self.sheets[-1]
+        contour, marks = None, []
+        for layer, _, points in CalculationExporter.part_items(calc, rotation, mirrored, dx, dy, outline):
+            if layer == 'MARKING':
+                if self.marking:
+                    marks.append(points)
+            elif layer == 'CUT_PATH' or contour is None:
+                contour = points
+        contour = self._contour(contour)
+        if sheet['shared']:
+            contour = self._split_shared(contour, sheet['shared'], len(sheet['cuts']),
+                                         float(calc.get('kerf') or 0.0))
+        sheet['cuts'].append(contour)
+        if marks:
+            sheet['marks'].append((contour['center'], marks))
+    
+    @staticmethod
+    def _contour(points):
+        """Замкнутый контур в направлении обхода и внешние нормали его ребер"""
+        ring = []
+        for x, y in points:
+            if not ring or math.hypot(x - ring[-1][0], y - ring[-1][1]) > 1e-9:
+                ring.append((x, y))
+        if len(ring) > 1 and math.hypot(ring[0][0] - ring[-1][0], ring[0][1] - ring[-1][1]) <= 1e-9:
+            ring.pop()
+        count = len(ring)
+        area = sum(ring[i - 1][0] * ring[i][1] - ring[i][0] * ring[i - 1][1] for i in range(count))
+        if (area > 0) == (AppConfig.TOOLPATH['direction'] == 'cw'):
+            ring.reverse()
+            area = -area
+        
+        side = 1.0 if area > 0 else -1.0
+        normals = []
+        for i in range(count):
+            (x0, y0), (x1, y1) = ring[i], ring[(i + 1) % count]
+            length = math.hypot(x1 - x0, y1 - y0) or 1.0
+            normals.append((side * (y1 - y0) / length, side * (x0 - x1) / length))
+        xs, ys = [x for x, _ in ring], [y for _, y in ring]
+        return {
+            'ring': ring,
+            'normals': normals,
+            'xy': np.array(ring) if NUMPY_AVAILABLE else None,
+            'center': ((min(xs) + max(xs)) / 2, (min(ys) + max(ys)) / 2)
+        }
+    
+    @staticmethod
+    def _split_shared(contour, shared, index, kerf=0.0):
+        """Контур без ребра на чужом общем резе: открытый путь от конца этого ребра до его начала
+        
+        Ребро лежит на общем резе, если обе его вершины на линии реза и в пределах его длины
+        (с запасом на срез углов эквидистанты). Свободный общий рез контур забирает себе.
+        """
+        tolerance = AppConfig.TOOLPATH['shared_tolerance']
+        ring = contour['ring']
+        count = len(ring)
+        for edge in shared:
+            (x0, y0), (x1, y1) = edge['segment']
+            length = math.hypot(x1 - x0, y1 - y0)
+            if length < 1e-9:
+                continue
+            ux, uy = (x1 - x0) / length, (y1 - y0) / length
+            margin = 2 * kerf + tolerance
+            
+            def on_segment(point):
+                dx, dy = point[0] - x0, point[1] - y0
+                along = dx * ux + dy * uy
+                return abs(dx * uy - dy * ux) <= tolerance and -margin <= along <= length + margin
+            
+            for k in range(count):
+                a, b = ring[k], ring[(k + 1) % count]
+                if math.dist(a, b) < length / 2 or not (on_segment(a) and on_segment(b)):
+                    continue
+                if edge['owner'] is None:
+                    edge['owner'] = index
+                    break
+                if edge['owner'] == index:
+                    break
+                path = ring[k + 1:] + ring[:k + 1]
+                return dict(contour, ring=path, xy=np.array(path) if NUMPY_AVAILABLE else None,
+                            open=True, shared_length=math.dist(a, b))
+        return contour
+    
+    @staticmethod
+    def _nearest_vertex(contour, position):
+        """Индекс вершины контура, ближайшей к текущему положению резака"""
+        if contour.get('open'):
+            return 0
+        px, py = position
+        if contour['xy'] is not None:
+            xy = contour['xy']
+            return int(np.argmin((xy[:, 0] - px) ** 2 + (xy[:, 1] - py) ** 2))
+        ring = contour['ring']
+        return min(range(len(ring)), key=lambda i: (ring[i][0] - px) ** 2 + (ring[i][1] - py) ** 2)
+    
+    def _cut_path(self, contour, index):
+        """Прокол на подводе снаружи контура, полный обход от вершины index и отвод
+        
+        Разомкнутый на общем резе контур режется от конца до начала пропущенного ребра,
+        подвод и отвод - по продолжению общего реза за вершины детали.
+        """
+        ring, normals = contour['ring'], contour['normals']
+        if contour.get('open'):
+            (x0, y0), (x1, y1) = ring[-1], ring[0]
+            length = math.hypot(x1 - x0, y1 - y0)
+            ux, uy = (x1 - x0) / length, (y1 - y0) / length
+            path = [(x1 + ux * self.lead_in, y1 + uy * self.lead_in)] if self.lead_in > 0 else []
+            path += ring
+            if self.lead_out > 0:
+                path.append((x0 - ux * self.lead_out, y0 - uy * self.lead_out))
+            return path
+        x, y = ring[index]
+        (ax, ay), (bx, by) = normals[index - 1], normals[index]
+        nx, ny = ax + bx, ay + by
+        norm = math.hypot(nx, ny)
+        if norm < 1e-6:
+            nx, ny, norm = bx, by, 1.0
+        nx, ny = nx / norm, ny / norm
+        
+        path = [(x + nx * self.lead_in, y + ny * self.lead_in)] if self.lead_in > 0 else []
+        path += ring[index:] + ring[:index + 1]
+        if self.lead_out > 0:
+            path.append((x + nx * self.lead_out, y + ny * self.lead_out))
+        return path
+    
+    @staticmethod
+    def _two_opt(points, tour, deadline):
+        """2-opt по открытому пути с закрепленным началом tour[0]"""
+        count = len(tour)
+        improved = True
+        while improved and time.perf_counter() < deadline:
+            improved = False
+            for i in range(count - 2):
+                if time.perf_counter() >= deadline:
+                    break
+                if NUMPY_AVAILABLE:
+                    path = points[tour]
+                    a, b = path[i], path[i + 1]
+                    C, D = path[i + 1:], path[i + 2:]
+                    gain = np.hypot(C[:, 0] - a[0], C[:, 1] - a[1]) - math.hypot(b[0] - a[0], b[1] - a[1])
+                    gain[:-1] += (np.hypot(D[:, 0] - b[0], D[:, 1] - b[1])
+                                  - np.hypot(D[:, 0] - C[:-1, 0], D[:, 1] - C[:-1, 1]))
+                    k = int(np.argmin(gain))
+                    delta = gain[k]
+                else:
+                    a, b = points[tour[i]], points[tour[i + 1]]
+                    base = math.dist(a, b)
+                    delta, k = 0.0, 0
+                    for offset in range(1, count - i - 1):
+                        c = points[tour[i + 1 + offset]]
+                        gain = math.dist(a, c) - base
+                        if i + 2 + offset < count:
+                            d = points[tour[i + 2 + offset]]
+                            gain += math.dist(b, d) - math.dist(c, d)
+                        if gain < delta:
+                            delta, k = gain, offset
+                if delta < -1e-9:
+                    tour[i + 1:i + 2 + k] = tour[i + 1:i + 2 + k][::-1].copy()
+                    improved = True
+        return tour
+    
+    @staticmethod
+    def _order(start, positions, deadline):
+        """Порядок обхода точек из start: ближайший сосед, затем 2-opt"""
+        count = len(positions)
+        if count < 2:
+            return list(range(count))
+        
+        if NUMPY_AVAILABLE:
+            points = np.array([start] + list(positions), dtype=float)
+            left = np.ones(count + 1, dtype=bool)
+            left[0] = False
+            tour, current = [0], 0
+            for _ in range(count):
+                distance = (points[:, 0] - points[current, 0]) ** 2 + (points[:, 1] - points[current, 1]) ** 2
+                distance[~left] = np.inf
+                current = int(np.argmin(distance))
+                left[current] = False
+                tour.append(current)
+            tour = ToolpathPlanner._two_opt(points, np.array(tour), deadline)
+        else:
+            points = [start] + list(positions)
+            left = set(range(1, count + 1))
+            tour = [0]
+            while left:
+                x, y = points[tour[-1]]
+                current = min(left, key=lambda j: (points[j][0] - x) ** 2 + (points[j][1] - y) ** 2)
+                left.remove(current)
+                tour.append(current)
+            tour = ToolpathPlanner._two_opt(points, tour, deadline)
+        return [int(j) - 1 for j in tour[1:]]
+    
+    def _sequence(self, sheet, position, budget=0.0, optimize=True):
+        """Операции листа по порядку: ('mark'|'cut', путь), положение в конце
+        
+        Разметка упорядочивается по деталям, внутри детали линии идут подряд
+        змейкой. Бюджет времени делится между разметкой и резкой по числу деталей.
+        """
+        operations = []
+        marks, cuts = sheet['marks'], sheet['cuts']
+        share = budget / max(1, len(marks) + len(cuts))
+        
+        order = list(range(len(marks)))
+        if optimize:
+            order = self._order(position, [center for center, _ in marks], time.perf_counter() + share * len(marks))
+        for index in order:
+            lines = marks[index][1]
+            if optimize and min(math.dist(position, point) for point in lines[-1]) < \
+                    min(math.dist(position, point) for point in lines[0]):
+                lines = lines[::-1]
+            for first, last in lines:
+                if optimize and math.dist(position, last) < math.dist(position, first):
+                    first, last = last, first
+                operations.append(('mark', [first, last]))
+                position = last
+        
+        entries = [0] * len(cuts)
+        order = list(range(len(cuts)))
+        if optimize:
+            # Второй проход упорядочивает уже по выбранным точкам входа
+            start = position
+            order = self._order(start, [contour['center'] for contour in cuts],
+                                time.perf_counter() + share * len(cuts) / 3)
+            for _ in range(2):
+                current = start
+                for index in order:
+                    entries[index] = self._nearest_vertex(cuts[index], current)
+                    current = cuts[index]['ring'][entries[index]]
+                order = self._order(start, [cuts[index]['ring'][entries[index]] for index in range(len(cuts))],
+                                    time.perf_counter() + share * len(cuts) / 3)
+            for index in order:
+                entries[index] = self._nearest_vertex(cuts[index], position)
+                path = self._cut_path(cuts[index], entries[index])
+                operations.append(('cut', path))
+                position = path[-1]
+        else:
+            for index in order:
+                path = self._cut_path(cuts[index], 0)
+                operations.append(('cut', path))
+                position = path[-1]
+        return operations, position
+    
+    @staticmethod
+    def _lengths(sheets):
+        """Длины холостых ходов, реза и разметки по всем листам"""
+        totals = {'rapid': 0.0, 'cut': 0.0, 'mark': 0.0}
+        for operations in sheets:
+            position = (0.0, 0.0)
+            for kind, path in operations:
+                totals['rapid'] += math.dist(position, path[0])
+                totals[kind] += sum(math.dist(path[i - 1], path[i]) for i in range(1, len(path)))
+                position = path[-1]
+            totals['rapid'] += math.dist(position, (0.0, 0.0))
+        return totals
+    
+    def optimize(self, time_budget=None):
+        """Порядок резки на всех листах; возвращает сводку с оценкой времени"""
+        config = AppConfig.TOOLPATH
+        time_budget = config['time_budget'] if time_budget is None else time_budget
+        start = time.perf_counter()
+        items = max(1, sum(len(sheet['marks']) + len(sheet['cuts']) for sheet in self.sheets))
+        
+        self.plan = [
+            self._sequence(sheet, (0.0, 0.0), time_budget * (len(sheet['marks']) + len(sheet['cuts'])) / items)[0]
+            for sheet in self.sheets
+        ]
+        elapsed = time.perf_counter() - start
+        totals = self._lengths(self.plan)
+        unordered = self._lengths([self._sequence(sheet, (0.0, 0.0), optimize=False)[0] for sheet in self.sheets])
+        pierces = sum(kind == 'cut' for operations in self.plan for kind, _ in operations)
+        return {
+            'sheets': len(self.plan),
+            'contours': pierces,
+            'marks': sum(len(lines) for sheet in self.sheets for _, lines in sheet['marks']),
+            'cut_length_mm': totals['cut'],
+            'shared_cut_length_mm': sum(contour.get('shared_length', 0.0)
+                                        for sheet in self.sheets for contour in sheet['cuts']),
+            'mark_length_mm': totals['mark'],
+            'rapid_length_mm': totals['rapid'],
+            'rapid_length_unordered_mm': unordered['rapid'],
+            'estimated_time_s': (totals['cut'] / config['cut_feed'] + totals['mark'] / config['mark_feed']
+                                 + totals['rapid'] / config['rapid_feed']) * 60 + pierces * config['pierce_dwell'],
+            'elapsed_s': elapsed
+        }
+    
+    @staticmethod
+    def _num(value):
+        """Координата G-кода с фиксированной точностью"""
+        text = f"{value:.{AppConfig.TOOLPATH['precision']}f}"
+        return '0' + text[2:] if text.startswith('-0') and not text.strip('-0.') else text
+    
+    def gcode_chunks(self):
+        """Программа G-кода частями; без даты, чтобы одинаковый план давал одинаковый файл"""
+        if self.plan is None:
+            self.optimize()
+        config = AppConfig.TOOLPATH
+        num = ToolpathPlanner._num
+        chunk = CalculationExporter.CHUNK_LINES
+        yield (f"(cone calculator v{AppConfig.VERSION} toolpath)\n"
+               f"(sheets {len(self.plan)}, contours {sum(len(sheet['cuts']) for sheet in self.sheets)})\n"
+               "G21\nG90\nG17\nG40\n")
+        for number, operations in enumerate(self.plan, 1):
+            if number > 1:
+                yield f"G0 X0 Y0\nM00 (load sheet {number})\n"
+            yield f"(sheet {number}: {len(operations)} operations)\n"
+            for kind, path in operations:
+                on, off = (config['tool_on'], config['tool_off']) if kind == 'cut' else (config['mark_on'], config['mark_off'])
+                feed = config['cut_feed'] if kind == 'cut' else config['mark_feed']
+                x, y = path[0]
+                head = f"G0 X{num(x)} Y{num(y)}\n{on}\n"
+                if kind == 'cut' and config['pierce_dwell'] > 0:
+                    head += f"G4 P{config['pierce_dwell']:g}\n"
+                x, y = path[1]
+                yield head + f"G1 X{num(x)} Y{num(y)} F{feed:g}\n"
+                for start in range(2, len(path), chunk):
+                    yield ''.join(f"X{num(x)} Y{num(y)}\n" for x, y in path[start:start + chunk])
+                yield f"{off}\n"
+        yield "G0 X0 Y0\nM30\n"
+    
+    def write(self, filename):
+        """Запись программы в файл"""
+        with BackgroundIO.atomic_open(filename, encoding='ascii') as f:
+            f.writelines(self.gcode_chunks())
+
+# === HTTP-СЕРВИС РАСЧЕТОВ ===
+class LatencyHistogram:
+    """Гистограмма задержек с логарифмическими корзинами (от 50 мкс до ~100 с)"""
+    
+    BOUNDS = tuple(0.00005 * 2 ** (i / 2) for i in range(42))
+    
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.total = 0
+        self.sum = 0.0
+        self.max = 0.0
+    
+    def record(self, seconds):
+        """Учет одной задержки"""
+        self.counts[bisect.bisect_left(self.BOUNDS, seconds)] += 1
+        self.total += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+    
+    def percentile(self, fraction):
+        """Оценка перцентиля сверху (граница корзины) в секундах"""
+        if not self.total:
+            return None
+        threshold = fraction * self.total
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= threshold:
+                return min(self.BOUNDS[index], self.max) if index < len(self.BOUNDS) else self.max
+        return self.max
+    
+    def snapshot(self):
+        """Сводка для /metrics (миллисекунды)"""
+        if not self.total:
+            return {'count': 0}
+        return {
+            'count': self.total,
+            'mean_ms': self.sum / self.total * 1000,
+            'p50_ms': self.percentile(0.50) * 1000,
+            'p95_ms': self.percentile(0.95) * 1000,
+            'p99_ms': self.percentile(0.99) * 1000,
+            'max_ms': self.max * 1000,
+            'buckets_ms': {
+                f"{bound * 1000:.3g}": count
+                for bound, count in zip(self.BOUNDS + (float('inf'),), self.counts) if count
+            }
+        }
+
+class ResultCache:
+    """LRU-кэш результатов расчета по нормализованным параметрам
+    
+    Общий для /calculate и /batch; расчеты идут в потоках пула, поэтому обращения
+    к кэшу под блокировкой. Результаты в кэше не изменяются.
+    """
+    
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def key(validated_data, cut_type):
+        """Ключ кэша из проверенных параметров"""
+        return (cut_type, validated_data['diameter'], validated_data['height'],
+                validated_data['cut_param'], validated_data['segments'],
+                validated_data.get('thickness', 0.0), validated_data.get('kerf', 0.0))
+    
+    def lookup(self, key):
+        """Результат из кэша или None; учитывается как попадание или промах"""
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+    
+    def put(self, key, result):
+        """Сохранение результата с вытеснением самого давнего"""
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def stats(self):
+        """Статистика кэша"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else None
+            }
+
+class CalculationService:
+    """JSON API расчета и валидации конуса поверх asyncio (без сторонних зависимостей)"""
+    
+    REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+               413: 'Payload Too Large', 422: 'Unprocessable Entity', 500: 'Internal Server Error',
+               503: 'Service Unavailable'}
+    
+    def __init__(self, host=None, port=None, max_concurrent=None):
+        config = AppConfig.SERVER
+        self.host = host or config['host']
+        self.port = config['port'] if port is None else port
+        self.max_concurrent = max_concurrent or config['max_concurrent']
+        self.cache = ResultCache(config['result_cache_size'])
+        self.histograms = {}
+        self.in_flight = 0
+        self.rejected = 0
+        self.started = time.time()
+        self._semaphore = None
+        self._server = None
+        self.routes = {
+            ('POST', '/calculate'): self.handle_calculate,
+            ('POST', '/validate'): self.handle_validate,
+            ('POST', '/batch'): self.handle_batch,
+            ('GET', '/metrics'): self.handle_metrics,
+            ('GET', '/health'): self.handle_health
+        }
+    
+    # --- Обработчики эндпоинтов: (body) -> (код, JSON) ---
+    @staticmethod
+    def _job_fields(job):
+        """Поля задания с типом среза по умолчанию, как в GUI"""
+        if not isinstance(job, dict):
+            raise ValueError("Задание должно быть JSON-объектом")
+        cut_type = str(job.get('cut_type') or 'slant').strip().lower()
+        if cut_type not in InputValidator.CUT_TYPES:
+            raise ValueError(f"Тип среза: ожидается slant или parallel, получено '{cut_type}'")
+        return (job.get('diameter'), job.get('height'), job.get('cut_param'),
+                job.get('segments'), cut_type, job.get('thickness') or 0, job.get('kerf') or 0)
+    
+    async def handle_calculate(self, body):
+        """Проверка и расчет одного задания через общий кэш"""
+        try:
+            fields = self._job_fields(body)
+        except ValueError as e:
+            return 422, {'status': 'error', 'errors': [str(e)]}
+        
+        validated_data, errors = InputValidator.validate_cone_parameters(*fields)
+        if errors:
+            return 422, {'status': 'error', 'errors': errors}
+        
+        cut_type = fields[4]
+        key = ResultCache.key(validated_data, cut_type)
+        result = self.cache.lookup(key)
+        cached = result is not None
+        if not cached:
+            # Расчет вне цикла событий, как и у /batch
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(None, ConeGeometry.calculate, validated_data, cut_type)
+            self.cache.put(key, result)
+        return 200, {'status': 'ok', 'cached': cached, 'result': result}
+    
+    async def handle_validate(self, body):
+        try:
+            fields = self._job_fields(body)
+        except ValueError as e:
+            return 200, {'valid': False, 'errors': [str(e)]}
+        validated_data, errors = InputValidator.validate_cone_parameters(*fields)
+        return 200, {'valid': not errors, 'errors': errors, 'validated': validated_data if not errors else None}
+    
+    async def handle_batch(self, body):
+        jobs = body.get('jobs') if isinstance(body, dict) else None
+        if not isinstance(jobs, list):
+            return 400, {'status': 'error', 'errors': ["Ожидается объект с массивом 'jobs'"]}
+        if len(jobs) > AppConfig.SERVER['max_batch_jobs']:
+            return 413, {'status': 'error',
+                         'errors': [f"Не больше {AppConfig.SERVER['max_batch_jobs']} заданий в пакете"]}
+        
+        items = [(index, job if isinstance(job, dict) else {'_parse_error': "Задание должно быть JSON-объектом"})
+                 for index, job in enumerate(jobs)]
+        # Колоночная валидация и расчет вне цикла событий, чтобы не задерживать другие запросы
+        loop = asyncio.get_running_loop()
+        records = await loop.run_in_executor(None, functools.partial(BatchProcessor.process_chunk, items,
+                                                                      cache=self.cache))
+        failed = sum(1 for record in records if record['status'] != 'ok')
+        return 200, {'status': 'ok', 'count': len(records), 'failed': failed, 'results': records}
+    
+    async def handle_metrics(self, body):
+        return 200, self.metrics()
+    
+    async def handle_health(self, body):
+        return 200, {'status': 'ok', 'version': AppConfig.VERSION}
+    
+    def metrics(self):
+        """Счетчики, кэш и гистограммы задержек по эндпоинтам"""
+        return {
+            'uptime_s': time.time() - self.started,
+            'in_flight': self.in_flight,
+            'max_concurrent': self.max_concurrent,
+            'rejected': self.rejected,
+            'cache': self.cache.stats(),
+            'latency': {route: histogram.snapshot() for route, histogram in sorted(self.histograms.items())}
+        }
+    
+    # --- HTTP/1.1 поверх asyncio streams ---
+    async def _read_request(self, reader):
+        """Разбор запроса: (метод, путь, заголовки, тело) или None при закрытии соединения"""
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'),
+                                          AppConfig.SERVER['keepalive_timeout'])
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+            return None
+        
+        lines = head.decode('latin-1').split('\r\n')
+        method, path, _ = lines[0].split(' ', 2)
+        headers = {}
+        for line in lines[1:]:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+        
+        length = int(headers.get('content-length', 0))
+        if length > AppConfig.SERVER['max_body_bytes']:
+            return method, path.split('?', 1)[0], headers, None
+        body = await reader.readexactly(length) if length else b''
+        return method, path.split('?', 1)[0], headers, body
+    
+    async def _respond(self, writer, status, payload, keep_alive):
+        """Отправка JSON-ответа"""
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        head = (
+            f"HTTP/1.1 {status} {self.REASONS.get(status, 'OK')}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
         )
-        view_btn.width = AdaptiveMetrics.adaptive_dp(100)
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+    
+    async def _dispatch(self, method, path, body):
+        """Маршрутизация с ограничением числа одновременных запросов"""
+        handler = self.routes.get((method, path))
+        if handler is None:
+            known = any(route_path == path for _, route_path in self.routes)
+            return (405, {'error': 'method not allowed'}) if known else (404, {'error': 'not found'})
+        
+        if body is None:
+            return 413, {'error': 'request body too large'}
+        try:
+            data = json.loads(body) if body else {}
+        except ValueError as e:
+            return 400, {'error': f"invalid JSON: {e}"}
         
-        item_layout.add_widget(info_layout)
-        item_layout.add_widget(view_btn)
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), AppConfig.SERVER['queue_timeout'])
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            return 503, {'error': 'server busy'}
         
-        self.history_list.add_widget(item_layout)
+        self.in_flight += 1
+        try:
+            return await handler(data)
+        except Exception as e:
+            error_logger.log_error(e, f"CalculationService._dispatch ({method} {path})")
+            return 500, {'error': str(e)}
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
     
-    def _update_item_bg(self, instance, value):
-        """Обновление фона элемента"""
-        if hasattr(instance, 'bg_rect'):
-            instance.bg_rect.pos = instance.pos
-            instance.bg_rect.size = instance.size
+    async def handle_client(self, reader, writer):
+        """Обслуживание соединения (keep-alive до таймаута или Connection: close)"""
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                
+                start = time.perf_counter()
+                status, payload = await self._dispatch(method, path, body)
+                self.histograms.setdefault(f"{method} {path}" if (method, path) in self.routes else 'other',
+                                           LatencyHistogram()).record(time.perf_counter() - start)
+                
+                keep_alive = headers.get('connection', '').lower() != 'close' and body is not None
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass  # клиент оборвал соединение или прислал мусор вместо HTTP
+        except Exception as e:
+            error_logger.log_error(e, "CalculationService.handle_client")
+        finally:
+            writer.close()
     
-    def view_calculation(self, calculation):
-        """Просмотр деталей расчета"""
-        content = BoxLayout(
-            orientation='vertical',
-            spacing=AdaptiveMetrics.adaptive_dp(10),
-            padding=AdaptiveMetrics.adaptive_dp(15)
+    async def start(self):
+        """Запуск сервера (порт 0 - любой свободный)"""
+        self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        self._server = await asyncio.start_server(self.handle_client, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        error_logger.log_event(f"Calculation service listening on http://{self.host}:{self.port}")
+        return self._server
+    
+    async def serve_forever(self):
+        """Запуск и обслуживание до прерывания"""
+        server = await self.start()
+        print(f"Serving on http://{self.host}:{self.port} (Ctrl+C to stop)", file=sys.stderr)
+        async with server:
+            await server.serve_forever()
+
+class LoadTester:
+    """Нагрузочный тест HTTP-сервиса на localhost через keep-alive соединения"""
+    
+    def __init__(self, host, port, concurrency=16, requests=2000, endpoint='/calculate',
+                 repeat_ratio=0.5, seed=42):
+        self.host = host
+        self.port = port
+        self.concurrency = concurrency
+        self.requests = requests
+        self.endpoint = endpoint
+        self.repeat_ratio = repeat_ratio
+        self.random = random.Random(seed)
+        self.histogram = LatencyHistogram()
+        self.statuses = {}
+    
+    def _payload(self, index):
+        """Тело запроса: часть заданий повторяется, чтобы нагружать кэш результатов"""
+        if self.random.random() < self.repeat_ratio:
+            index = self.random.randrange(32)
+        job = {
+            'diameter': 100 + index % 900,
+            'height': 200 + index % 700,
+            'cut_type': 'slant' if index % 2 else 'parallel',
+            'cut_param': index % 60,
+            'segments': 8 + index % 29
+        }
+        if self.endpoint == '/batch':
+            return {'jobs': [job] * 100}
+        return job
+    
+    async def _worker(self, counter):
+        """Последовательные запросы по одному соединению"""
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            while counter:
+                index = counter.pop()
+                body = json.dumps(self._payload(index)).encode('utf-8')
+                request = (
+                    f"POST {self.endpoint} HTTP/1.1\r\nHost: {self.host}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n"
+                ).encode('latin-1') + body
+                
+                start = time.perf_counter()
+                writer.write(request)
+                await writer.drain()
+                head = await reader.readuntil(b'\r\n\r\n')
+                status = int(head.split(b' ', 2)[1])
+                length = 0
+                for line in head.split(b'\r\n'):
+                    if line.lower().startswith(b'content-length:'):
+                        length = int(line.split(b':', 1)[1])
+                await reader.readexactly(length)
+                self.histogram.record(time.perf_counter() - start)
+                self.statuses[status] = self.statuses.get(status, 0) + 1
+        finally:
+            writer.close()
+    
+    async def run(self):
+        """Прогон и сводка: пропускная способность и перцентили задержек"""
+        counter = list(range(self.requests))
+        start = time.perf_counter()
+        await asyncio.gather(*(self._worker(counter) for _ in range(self.concurrency)))
+        elapsed = time.perf_counter() - start
+        return {
+            'endpoint': self.endpoint,
+            'requests': self.requests,
+            'concurrency': self.concurrency,
+            'elapsed_s': elapsed,
+            'requests_per_s': self.requests / elapsed if elapsed > 0 else None,
+            'statuses': {str(status): count for status, count in sorted(self.statuses.items())},
+            'latency': self.histogram.snapshot()
+        }
+
+# === КОНСОЛЬНЫЙ ИНТЕРФЕЙС ===
+class ConsoleInterface:
+    """Консольные режимы приложения без графического окна"""
+    
+    @staticmethod
+    def build_parser():
+        """Парсер аргументов командной строки"""
+        parser = argparse.ArgumentParser(
+            prog='cone_calc',
+            description=f"{AppConfig.APP_NAME} v{AppConfig.VERSION} - консольные режимы"
+        )
+        subparsers = parser.add_subparsers(dest='command', required=True)
+        
+        bench = subparsers.add_parser('bench', help='бенчмарки горячих путей')
+        bench.add_argument('--group', action='append', choices=BenchmarkSuite.GROUPS,
+                           help='группа бенчмарков (можно несколько раз)')
+        bench.add_argument('--repeat', type=int, default=7, help='число повторов замера')
+        bench.add_argument('--seed', type=int, default=42, help='зерно генератора случайных чисел')
+        bench.add_argument('--quick', action='store_true', help='без замеров на 100k записей')
+        bench.add_argument('--output', help='файл для JSON-результатов (по умолчанию stdout)')
+        bench.add_argument('--baseline', default='cone_calculator_bench_baseline.json',
+                           help='файл базового прогона для сравнения')
+        bench.add_argument('--save-baseline', action='store_true',
+                           help='сохранить результаты как новый базовый прогон')
+        bench.add_argument('--tolerance', type=float, default=0.25,
+                           help='допустимое замедление относительно базы (0.25 = 25%%)')
+        bench.set_defaults(handler=ConsoleInterface.run_bench)
+        
+        batch = subparsers.add_parser('batch', help='пакетный расчет заданий из CSV/JSONL')
+        batch.add_argument('input', help="файл заданий ('-' для stdin)")
+        batch.add_argument('--output', '-o', help='файл результатов (по умолчанию stdout)')
+        batch.add_argument('--input-format', choices=BatchProcessor.FORMATS,
+                           help='формат входа (по умолчанию по расширению, иначе jsonl)')
+        batch.add_argument('--output-format', choices=BatchProcessor.FORMATS,
+                           help='формат выхода (по умолчанию как у входа)')
+        batch.add_argument('--workers', '-j', type=int, default=1,
+                           help='число процессов-воркеров (0 = по числу ядер)')
+        batch.add_argument('--chunk-size', type=int, default=AppConfig.BATCH['chunk_size'],
+                           help='заданий на одну передачу в воркер')
+        batch.add_argument('--thickness', type=float,
+                           help='толщина листа для всех заданий, мм (пересчет пачки под другой материал)')
+        batch.add_argument('--kerf', type=float, help='ширина реза для всех заданий, мм')
+        batch.add_argument('--quiet', '-q', action='store_true', help='без отчетов о ходе обработки')
+        batch.set_defaults(handler=ConsoleInterface.run_batch)
+        
+        nest = subparsers.add_parser('nest', help='раскрой разверток на листах')
+        nest.add_argument('input', help="файл заданий или результатов batch ('-' для stdin), поле quantity - количество")
+        nest.add_argument('--output', '-o', help='файл JSON-отчета с раскладкой (по умолчанию stdout)')
+        nest.add_argument('--input-format', choices=BatchProcessor.FORMATS,
+                          help='формат входа (по умолчанию по расширению, иначе jsonl)')
+        nest.add_argument('--sheet', type=ConsoleInterface._sheet_size,
+                          default=(AppConfig.NESTING['sheet_width'], AppConfig.NESTING['sheet_height']),
+                          help='размер листа ШxВ, мм (по умолчанию %(default)s)')
+        nest.add_argument('--grid', type=float, default=AppConfig.NESTING['grid_step'], help='шаг растра, мм')
+        nest.add_argument('--gap', type=float, default=AppConfig.NESTING['part_gap'],
+                          help='перемычка между деталями, мм')
+        nest.add_argument('--rotation-step', type=float, default=AppConfig.NESTING['rotation_step'],
+                          help='шаг поворотов, градусы')
+        nest.add_argument('--no-pairs', action='store_true', help='без укладки деталей парами')
+        nest.add_argument('--common-edge', action='store_true',
+                          help='общий рез: одинаковые детали ставятся веером на расстоянии реза, '
+                               'общий край режется один раз')
+        nest.add_argument('--time', type=float, default=AppConfig.NESTING['time_budget'],
+                          help='бюджет времени на поиск, секунд')
+        nest.add_argument('--workers', '-j', type=int, default=1,
+                          help='число процессов поиска (0 = по числу ядер)')
+        nest.add_argument('--seed', type=int, default=0, help='зерно случайных стратегий')
+        nest.add_argument('--quiet', '-q', action='store_true', help='без отчетов о ходе поиска')
+        nest.add_argument('--drawing', type=ConsoleInterface._drawing_file,
+                          help='чертеж раскладки по листам (.dxf или .svg)')
+        nest.add_argument('--gcode', help='G-код резки по листам с оптимизированным порядком')
+        nest.add_argument('--marking', action='store_true', help='разметка образующих в G-коде перед резкой')
+        nest.set_defaults(handler=ConsoleInterface.run_nest)
+        
+        drawing = subparsers.add_parser('drawing', help='развертки заданий в DXF/SVG')
+        drawing.add_argument('input', help="файл заданий или результатов batch ('-' для stdin)")
+        drawing.add_argument('--output', '-o', required=True, type=ConsoleInterface._drawing_file,
+                             help='файл чертежа (.dxf или .svg)')
+        drawing.add_argument('--input-format', choices=BatchProcessor.FORMATS,
+                             help='формат входа (по умолчанию по расширению, иначе jsonl)')
+        drawing.add_argument('--row-width', type=float, default=AppConfig.EXPORT['row_width'],
+                             help='ширина ряда раскладки деталей, мм')
+        drawing.set_defaults(handler=ConsoleInterface.run_drawing)
+        
+        toolpath = subparsers.add_parser('toolpath', help='G-код резки разверток с оптимизацией порядка')
+        toolpath.add_argument('input', help="файл заданий или результатов batch ('-' для stdin)")
+        toolpath.add_argument('--output', '-o', required=True, help='файл G-кода')
+        toolpath.add_argument('--input-format', choices=BatchProcessor.FORMATS,
+                              help='формат входа (по умолчанию по расширению, иначе jsonl)')
+        toolpath.add_argument('--row-width', type=float, default=AppConfig.EXPORT['row_width'],
+                              help='ширина ряда раскладки деталей, мм')
+        toolpath.add_argument('--lead-in', type=float, default=AppConfig.TOOLPATH['lead_in'], help='подвод, мм')
+        toolpath.add_argument('--lead-out', type=float, default=AppConfig.TOOLPATH['lead_out'], help='отвод, мм')
+        toolpath.add_argument('--marking', action='store_true', help='разметка образующих перед резкой')
+        toolpath.add_argument('--time', type=float, default=AppConfig.TOOLPATH['time_budget'],
+                              help='бюджет времени на оптимизацию порядка, секунд')
+        toolpath.set_defaults(handler=ConsoleInterface.run_toolpath)
+        
+        history = subparsers.add_parser('history', help='выгрузка и загрузка истории расчетов')
+        history.add_argument('action', choices=('export', 'import'), help='направление переноса')
+        history.add_argument('file', help='файл истории (.csv, .jsonl, .parquet)')
+        history.add_argument('--format', choices=HistoryTransfer.FORMATS,
+                             help='формат файла (по умолчанию по расширению)')
+        history.add_argument('--store', help='файл истории (.json или .db; по умолчанию - как в приложении)')
+        history.add_argument('--cut-type', choices=('slant', 'parallel'), help='только записи с этим типом среза')
+        history.add_argument('--since', help='записи не раньше даты (ISO, например 2025-01-01)')
+        history.add_argument('--until', help='записи не позже даты (ISO, включительно)')
+        history.set_defaults(handler=ConsoleInterface.run_history)
+        
+        serve = subparsers.add_parser('serve', help='локальный HTTP-сервис расчетов (JSON API)')
+        serve.add_argument('--host', default=AppConfig.SERVER['host'],
+                           help='адрес (по умолчанию только localhost)')
+        serve.add_argument('--port', type=int, default=AppConfig.SERVER['port'], help='порт')
+        serve.add_argument('--max-concurrent', type=int, default=AppConfig.SERVER['max_concurrent'],
+                           help='одновременно обрабатываемых запросов')
+        serve.set_defaults(handler=ConsoleInterface.run_serve)
+        
+        loadtest = subparsers.add_parser('loadtest', help='нагрузочный тест HTTP-сервиса')
+        loadtest.add_argument('--host', default=AppConfig.SERVER['host'], help='адрес сервиса')
+        loadtest.add_argument('--port', type=int, default=AppConfig.SERVER['port'], help='порт сервиса')
+        loadtest.add_argument('--spawn', action='store_true',
+                              help='поднять сервис в этом же процессе на свободном порту')
+        loadtest.add_argument('--endpoint', default='/calculate', choices=('/calculate', '/validate', '/batch'),
+                              help='нагружаемый эндпоинт')
+        loadtest.add_argument('--requests', '-n', type=int, default=2000, help='всего запросов')
+        loadtest.add_argument('--concurrency', '-c', type=int, default=16, help='параллельных соединений')
+        loadtest.add_argument('--repeat-ratio', type=float, default=0.5,
+                              help='доля повторяющихся заданий (попадания в кэш)')
+        loadtest.add_argument('--seed', type=int, default=42, help='зерно генератора случайных чисел')
+        loadtest.set_defaults(handler=ConsoleInterface.run_loadtest)
+        
+        stress = subparsers.add_parser('stress', help='одновременная запись истории несколькими процессами')
+        stress.add_argument('--writers', '-w', type=int, default=4, help='процессов-писателей')
+        stress.add_argument('--entries', '-n', type=int, default=250, help='записей от каждого писателя')
+        stress.add_argument('--store', help='файл истории (.db или .json), будет очищен; по умолчанию временный .db')
+        stress.add_argument('--max-latency-ms', type=float, default=250.0,
+                            help='допустимая p99 задержка записи, мс')
+        stress.set_defaults(handler=ConsoleInterface.run_stress)
+        
+        return parser
+    
+    @staticmethod
+    def _sheet_size(text):
+        """Размер листа из строки вида 3000x1500"""
+        try:
+            width, height = (float(value) for value in text.lower().replace('×', 'x').split('x'))
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"ожидается ШxВ в мм, получено '{text}'")
+        if width <= 0 or height <= 0:
+            raise argparse.ArgumentTypeError("размеры листа должны быть положительными")
+        return width, height
+    
+    @staticmethod
+    def _drawing_file(text):
+        """Имя файла чертежа с поддерживаемым расширением"""
+        if not text.lower().endswith(CalculationExporter.VECTOR_EXTENSIONS):
+            raise argparse.ArgumentTypeError(f"ожидается файл .dxf или .svg, получено '{text}'")
+        return text
+    
+    @staticmethod
+    def _read_jobs(args):
+        """Задания из файла или stdin списком (строка, задание)"""
+        input_format = args.input_format or BatchProcessor.detect_format(
+            None if args.input == '-' else args.input
         )
+        source = sys.stdin if args.input == '-' else open(args.input, 'r', encoding='utf-8-sig', newline='')
+        try:
+            return list(BatchProcessor.read_jobs(source, input_format))
+        finally:
+            if source is not sys.stdin:
+                source.close()
+    
+    @staticmethod
+    def main(argv):
+        """Точка входа консольных режимов, возвращает код завершения"""
+        args = ConsoleInterface.build_parser().parse_args(argv)
+        try:
+            return args.handler(args)
+        except Exception as e:
+            error_logger.log_error(e, f"ConsoleInterface.main ({args.command})", recoverable=False)
+            print(f"ERROR: {e}", file=sys.stderr)
+            return 2
+    
+    @staticmethod
+    def run_bench(args):
+        """Запуск бенчмарков и сравнение с базовым прогоном"""
+        suite = BenchmarkSuite(repeat=args.repeat, seed=args.seed, quick=args.quick)
+        results = suite.run(args.group)
+        
+        over_budget = []
+        for name, result in results['results'].items():
+            if 'skipped' in result:
+                print(f"{name:45s} skipped: {result['skipped']}", file=sys.stderr)
+                continue
+            
+            parts = []
+            if 'median_ms' in result:
+                parts.append(f"{result['median_ms']:10.4f} ms")
+            if 'min_ms' in result:
+                parts.append(f"(min {result['min_ms']:.4f})")
+            if 'allocations' in result:
+                parts.append(f"allocations {result['allocations']} ({result['allocated_mb']:.1f} MB)")
+            if 'budget_ms' in result:
+                within = result['median_ms'] <= result['budget_ms']
+                parts.append(f"budget {result['budget_ms']:.1f} ms {'OK' if within else 'OVER'}")
+                if not within:
+                    over_budget.append(name)
+            if 'max_error_mm' in result:
+                parts.append(f"max error {result['max_error_mm']:.2e} mm")
+            if 'legacy_file_mb' in result:
+                parts.append(f"{result['entries']} entries -> {result['results']} results, "
+                             f"{result['legacy_file_mb']:.2f} -> {result['file_mb']:.2f} MB")
+            if 'flushes' in result:
+                parts.append(f"{result['appends']} appends -> {result['flushes']} file writes "
+                             f"(max {result['flush_max_ms']:.1f} ms)")
+            if 'bytes_per_entry' in result:
+                parts.append(f"{result['bytes_per_entry']} B/entry")
+            if 'reproducible' in result:
+                parts.append(f"{result['size_kb']:.0f} KB {'reproducible' if result['reproducible'] else 'NOT REPRODUCIBLE'}")
+            print(f"{name:45s} {' '.join(parts)}", file=sys.stderr)
+        
+        payload = json.dumps(results, indent=2, sort_keys=True)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                f.write(payload)
+        else:
+            print(payload)
+        
+        for name in over_budget:
+            print(f"OVER BUDGET {name}", file=sys.stderr)
+        
+        if args.save_baseline:
+            with open(args.baseline, 'w', encoding='utf-8') as f:
+                f.write(payload)
+            print(f"Baseline saved to {args.baseline}", file=sys.stderr)
+            return 1 if over_budget else 0
+        
+        if not os.path.exists(args.baseline):
+            print(f"No baseline at {args.baseline}, comparison skipped", file=sys.stderr)
+            return 1 if over_budget else 0
+        
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        
+        regressions = BenchmarkSuite.compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(
+                f"REGRESSION {regression['name']}: {regression['baseline_ms']:.4f} ms -> "
+                f"{regression['current_ms']:.4f} ms (x{regression['ratio']:.2f})",
+                file=sys.stderr
+            )
         
-        title = Label(
-            text=f'[b]РАСЧЕТ ОТ {calculation["date"]}[/b]',
-            font_size=AdaptiveMetrics.adaptive_sp(18),
-            markup=True,
-            color=AppConfig.COLORS['light'],
-            halign='center'
+        return 1 if regressions or over_budget else 0
+
+    @staticmethod
+    def run_batch(args):
+        """Пакетный расчет, код 1 при наличии ошибочных заданий"""
+        input_format = args.input_format or BatchProcessor.detect_format(
+            None if args.input == '-' else args.input
         )
+        output_format = args.output_format or (
+            BatchProcessor.detect_format(args.output, input_format) if args.output else input_format
+        )
+        workers = args.workers or os.cpu_count() or 1
         
-        details_text = f"""Диаметр: {calculation['diameter']} мм
-Высота: {calculation['height']} мм
-Тип среза: {calculation['cut_type']}
-Параметр среза: {calculation['cut_param']}
-Сегментов: {calculation['segments']}
-Образующая: {calculation.get('generatrix', 'N/A'):.1f} мм
-Угол развертки: {calculation.get('angle', 'N/A'):.1f}°"""
+        def report(processed, text):
+            print(f"... {processed} jobs ({processor.failed} failed), {processed / progress.elapsed:.0f} jobs/s",
+                  file=sys.stderr)
         
-        details = Label(
-            text=details_text,
-            font_size=AdaptiveMetrics.adaptive_sp(14),
-            color=AppConfig.COLORS['light'][:3] + (0.9,),
-            halign='left'
+        processor = BatchProcessor(workers=workers, chunk_size=args.chunk_size,
+                                   overrides={'thickness': args.thickness, 'kerf': args.kerf})
+        progress = None if args.quiet else ProgressReporter(
+            report, interval=AppConfig.BATCH['report_interval'], ui_thread=False
         )
-        
-        close_btn = self.create_professional_button(
-            'ЗАКРЫТЬ', 'primary',
-            size_hint_y=None,
-            height=AdaptiveMetrics.get_button_height()
+        source = sys.stdin if args.input == '-' else open(args.input, 'r', encoding='utf-8-sig', newline='')
+        sink = open(args.output, 'w', encoding='utf-8', newline='') if args.output else sys.stdout
+        try:
+            processed, failed = processor.run(source, sink, input_format, output_format, progress)
+        finally:
+            if source is not sys.stdin:
+                source.close()
+            if sink is not sys.stdout:
+                sink.close()
+        
+        throughput = processed / processor.elapsed if processor.elapsed > 0 else 0.0
+        print(
+            f"Batch: {processed} jobs, {processed - failed} ok, {failed} failed, "
+            f"{processor.elapsed:.2f} s, {throughput:.0f} jobs/s, workers {workers}",
+            file=sys.stderr
         )
+        error_logger.log_event(f"Batch finished: {processed} jobs, {failed} failed, {throughput:.0f} jobs/s")
+        return 1 if failed else 0
+
+    @staticmethod
+    def run_nest(args):
+        """Раскрой: сводка в stderr, JSON-отчет в файл или stdout; код 1 при неуложенных деталях"""
+        jobs = ConsoleInterface._read_jobs(args)
+        nester = SheetNester(args.sheet[0], args.sheet[1], args.grid, args.gap, args.rotation_step,
+                             pairs=not args.no_pairs, common_edge=args.common_edge)
+        failed = 0
+        for (line_no, job), record in zip(jobs, BatchProcessor().results(iter(jobs))):
+            try:
+                quantity = int(float(job.get('quantity') or 1))
+            except (TypeError, ValueError):
+                record = {'status': 'error', 'errors': ["quantity: ожидается целое число"]}
+            if record['status'] != 'ok':
+                failed += 1
+                print(f"line {line_no}: {'; '.join(record['errors'])}", file=sys.stderr)
+                continue
+            try:
+                nester.add_part(record, quantity, line_no)
+            except ValueError as e:
+                failed += 1
+                print(f"line {line_no}: {e}", file=sys.stderr)
         
-        content.add_widget(title)
-        content.add_widget(details)
-        content.add_widget(close_btn)
+        def report_progress(elapsed, runs):
+            print(f"... nesting {elapsed:.1f}/{args.time:g} s" + (f", {runs}" if runs else ""), file=sys.stderr)
         
-        popup = Popup(
-            title='Детали расчета',
-            content=content,
-            size_hint=(0.8, 0.6),
-            background_color=(0.1, 0.1, 0.2, 0.95)
+        progress = None if args.quiet else ProgressReporter(
+            report_progress, interval=AppConfig.BATCH['report_interval'], ui_thread=False
         )
-        
-        close_btn.bind(on_press=popup.dismiss)
-        popup.open()
-    
-    def clear_history(self, instance):
-        """Очистка истории с подтверждением"""
-        content = BoxLayout(
-            orientation='vertical',
-            spacing=AdaptiveMetrics.adaptive_dp(15),
-            padding=AdaptiveMetrics.adaptive_dp(20)
+        report = nester.optimize(args.time, args.workers or os.cpu_count() or 1, args.seed, progress)
+        print(
+            f"Nesting: {report['placed']}/{report['parts']} parts on {report['sheets']} sheets "
+            f"{nester.sheet_width:g}x{nester.sheet_height:g}, utilization {report['utilization'] * 100:.1f}%, "
+            f"scrap {report['scrap_area_m2']:.2f} m2, {report['runs']} runs in {report['elapsed_s']:.1f} s"
+            + (f", common cut {report['common_cut_length_mm'] / 1000:.2f} m in {report['common_edge_groups']} groups"
+               if args.common_edge else ""),
+            file=sys.stderr
         )
-        
-        message = Label(
-            text='Вы уверены, что хотите очистить всю историю расчетов?',
-            font_size=AdaptiveMetrics.adaptive_sp(16),
-            color=AppConfig.COLORS['light'],
-            halign='center'
+        output = json.dumps(report, indent=2, ensure_ascii=False)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                f.write(output)
+        else:
+            print(output)
+        
+        if args.drawing:
+            pitch = nester.sheet_height + AppConfig.EXPORT['part_spacing']
+            items = itertools.chain(
+                CalculationExporter.sheet_items(nester.sheet_width, nester.sheet_height, report['sheets']),
+                itertools.chain.from_iterable(
+                    CalculationExporter.part_items(nester.parts[placement['part']]['record'],
+                                                   placement['rotation'], placement['mirrored'],
+                                                   placement['x'], placement['y'] + placement['sheet'] * pitch)
+                    for placement in report['placements']
+                )
+            )
+            CalculationExporter.write_drawing(args.drawing, items)
+            print(f"Drawing written to {args.drawing}", file=sys.stderr)
+        
+        if args.gcode:
+            planner = ToolpathPlanner(marking=args.marking)
+            for index in range(report['sheets']):
+                planner.new_sheet()
+                for edge in report['shared_edges']:
+                    if edge['sheet'] == index:
+                        planner.add_shared(edge['from'], edge['to'])
+                for placement in report['placements']:
+                    if placement['sheet'] == index:
+                        planner.add_part(nester.parts[placement['part']]['record'], placement['rotation'],
+                                         placement['mirrored'], placement['x'], placement['y'])
+            ConsoleInterface._print_toolpath(planner.optimize(), args.gcode)
+            planner.write(args.gcode)
+        return 1 if report['unplaced'] or failed else 0
+    
+    @staticmethod
+    def _print_toolpath(summary, filename):
+        """Сводка по траекториям в stderr"""
+        saved = summary['rapid_length_unordered_mm'] - summary['rapid_length_mm']
+        print(
+            f"Toolpath: {summary['contours']} contours, {summary['marks']} marks on {summary['sheets']} sheets, "
+            f"cut {summary['cut_length_mm'] / 1000:.1f} m, rapid {summary['rapid_length_mm'] / 1000:.1f} m "
+            f"(-{saved / 1000:.1f} m vs input order), "
+            + (f"common cut -{summary['shared_cut_length_mm'] / 1000:.1f} m, " if summary['shared_cut_length_mm'] else "")
+            + f"~{summary['estimated_time_s'] / 60:.1f} min, "
+            f"optimized in {summary['elapsed_s']:.2f} s -> {filename}",
+            file=sys.stderr
         )
-        
-        buttons_layout = BoxLayout(
-            orientation='horizontal',
-            spacing=AdaptiveMetrics.adaptive_dp(15),
-            size_hint_y=None,
-            height=AdaptiveMetrics.get_button_height()
+    
+    @staticmethod
+    def run_drawing(args):
+        """Развертки заданий одним чертежом, детали рядами; код 1 при ошибочных заданиях"""
+        jobs = ConsoleInterface._read_jobs(args)
+        counts = {'parts': 0, 'failed': 0}
+        
+        def records():
+            for (line_no, _), record in zip(jobs, BatchProcessor().results(iter(jobs))):
+                if record['status'] != 'ok':
+                    counts['failed'] += 1
+                    print(f"line {line_no}: {'; '.join(record['errors'])}", file=sys.stderr)
+                    continue
+                counts['parts'] += 1
+                yield record
+        
+        def skip(record, error):
+            counts['parts'] -= 1
+            counts['failed'] += 1
+            print(f"line {record['line']}: {error}", file=sys.stderr)
+        
+        start = time.perf_counter()
+        CalculationExporter.write_drawing(
+            args.output, CalculationExporter.row_items(records(), args.row_width, on_error=skip)
         )
-        
-        cancel_btn = self.create_professional_button('ОТМЕНА', 'secondary')
-        clear_btn = self.create_professional_button('ОЧИСТИТЬ', 'danger')
-        
-        buttons_layout.add_widget(cancel_btn)
-        buttons_layout.add_widget(clear_btn)
-        
-        content.add_widget(message)
-        content.add_widget(buttons_layout)
-        
-        popup = Popup(
-            title='Очистка истории',
-            content=content,
-            size_hint=(0.7, 0.4),
-            background_color=(0.1, 0.1, 0.2, 0.95)
+        print(
+            f"Drawing: {counts['parts']} parts, {counts['failed']} failed, "
+            f"{time.perf_counter() - start:.2f} s -> {args.output}",
+            file=sys.stderr
         )
-        
-        def perform_clear(btn):
-            try:
-                global store
-                if store:
-                    store.put('history', calculations=[])
-                popup.dismiss()
-                self.load_history()
-                self.show_toast("🗑️ История очищена!", 2.0, "success")
-                error_logger.log_event("History cleared by user")
-            except Exception as e:
-                error_logger.log_error(e, "ProfessionalHistoryScreen.clear_history.perform_clear")
-                self.show_toast("❌ Ошибка очистки!", 2.0, "error")
-        
-        cancel_btn.bind(on_press=popup.dismiss)
-        clear_btn.bind(on_press=perform_clear)
-        popup.open()
-
-# === ГЛАВНОЕ ПРИЛОЖЕНИЕ ===
-class ConeCalculator(App):
-    """Главное приложение с профессиональной архитектурой"""
+        return 1 if counts['failed'] else 0
     
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        self.title = f"{AppConfig.APP_NAME} v{AppConfig.VERSION}"
+    @staticmethod
+    def run_toolpath(args):
+        """G-код разверток, разложенных рядами; код 1 при ошибочных заданиях"""
+        jobs = ConsoleInterface._read_jobs(args)
+        planner = ToolpathPlanner(args.lead_in, args.lead_out, args.marking)
+        failed = 0
+        ok = []
+        for (line_no, _), record in zip(jobs, BatchProcessor().results(iter(jobs))):
+            if record['status'] != 'ok':
+                failed += 1
+                print(f"line {line_no}: {'; '.join(record['errors'])}", file=sys.stderr)
+                continue
+            ok.append(record)
+        
+        def skip(record, error):
+            nonlocal failed
+            failed += 1
+            print(f"line {record['line']}: {error}", file=sys.stderr)
+        
+        for record, outline, dx, dy in CalculationExporter.row_layout(ok, args.row_width, on_error=skip):
+            planner.add_part(record, dx=dx, dy=dy, outline=outline)
+        
+        ConsoleInterface._print_toolpath(planner.optimize(args.time), args.output)
+        planner.write(args.output)
+        return 1 if failed else 0
     
-    def build(self):
-        """Сборка приложения"""
-        error_logger.log_event("=== APPLICATION START ===")
-        error_logger.log_event(f"Starting {self.title}")
-        
-        # Настройка окна для разных платформ
-        self._setup_window()
-        
-        # Инициализация хранилища
-        global store
-        try:
-            store = JsonStore('cone_calculator_data.json')
-            error_logger.log_event("JSON store initialized successfully")
-        except Exception as e:
-            error_logger.log_error(e, "ConeCalculator.build - store init")
-            store = None
-        
-        # Создание менеджера экранов
-        self.sm = ScreenManager(transition=FadeTransition(duration=0.3))
-        
-        # Добавление экранов
-        self.sm.add_widget(ProfessionalCalculatorScreen(name='calculator'))
-        self.sm.add_widget(ProfessionalHistoryScreen(name='history'))
-        # TODO: Добавить ProfessionalSettingsScreen
-        
-        error_logger.log_event("All screens initialized successfully")
+    @staticmethod
+    def run_history(args):
+        """Перенос истории между файлом и хранилищем; код 1 при ошибочных строках импорта"""
+        history = HistoryStore.open(args.store)
+        start = time.perf_counter()
+        if args.action == 'export':
+            entries = HistoryTransfer.select(history.load(), args.cut_type, args.since, args.until)
+            count = HistoryTransfer.export(entries, args.file, args.format)
+            elapsed = time.perf_counter() - start
+            print(f"History export: {count} records -> {args.file}, {elapsed:.2f} s", file=sys.stderr)
+            return 0
         
-        return self.sm
+        errors = []
+        entries = HistoryTransfer.select(HistoryTransfer.read(args.file, args.format, errors),
+                                         args.cut_type, args.since, args.until)
+        added, duplicates = history.extend(entries)
+        elapsed = time.perf_counter() - start
+        for line_no, message in errors[:20]:
+            print(f"line {line_no}: {message}", file=sys.stderr)
+        print(
+            f"History import: {added} added, {duplicates} duplicates, {len(errors)} failed, "
+            f"{elapsed:.2f} s (history keeps the newest {AppConfig.LIMITS['max_history_items']} by timestamp)",
+            file=sys.stderr
+        )
+        return 1 if errors else 0
     
-    def _setup_window(self):
-        """Настройка окна приложения"""
+    @staticmethod
+    def run_serve(args):
+        """HTTP-сервис расчетов до Ctrl+C"""
+        service = CalculationService(args.host, args.port, args.max_concurrent)
         try:
-            profile = AdaptiveMetrics.get_screen_profile()
-            
-            if profile['name'] in ['large', 'xlarge']:
-                # Десктопный режим
-                Window.size = (1000, 700)
-                Window.minimum_width = 800
-                Window.minimum_height = 600
-            else:
-                # Мобильный режим
-                Window.fullscreen = 'auto'
-            
-            # Настройка иконки (если есть)
-            try:
-                self.icon = 'icon.png'  # Будет искать в директории приложения
-            except:
-                pass
-                
-        except Exception as e:
-            error_logger.log_error(e, "ConeCalculator._setup_window")
-    
-    def on_start(self):
-        """Вызывается при запуске приложения"""
-        error_logger.log_event("Application started successfully")
-        self._check_system_health()
+            asyncio.run(service.serve_forever())
+        except KeyboardInterrupt:
+            print("Service stopped", file=sys.stderr)
+        return 0
     
-    def on_stop(self):
-        """Вызывается при закрытии приложения"""
-        error_logger.log_event("=== APPLICATION STOPPED ===")
-        error_logger.log_event("")  # Пустая строка для разделения сессий
-    
-    def _check_system_health(self):
-        """Проверка здоровья системы"""
-        try:
-            issues = []
-            
-            # Проверка хранилища
-            if store is None:
-                issues.append("Хранилище данных не доступно")
-            
-            # Проверка PyGame
-            if not PYGAME_AVAILABLE:
-                issues.append("PyGame не доступен - графика будет ограничена")
+    @staticmethod
+    def run_loadtest(args):
+        """Нагрузочный тест: сводка в stderr, JSON в stdout"""
+        async def scenario():
+            service = None
+            host, port = args.host, args.port
+            if args.spawn:
+                service = CalculationService(host, 0)
+                server = await service.start()
+                port = service.port
             
-            # Проверка свободного места
+            tester = LoadTester(host, port, args.concurrency, args.requests, args.endpoint,
+                                args.repeat_ratio, args.seed)
+            report = await tester.run()
+            if service is not None:
+                report['server'] = service.metrics()
+                server.close()
+                await server.wait_closed()
+            return report
+        
+        report = asyncio.run(scenario())
+        latency = report['latency']
+        print(
+            f"{report['endpoint']}: {report['requests']} requests, concurrency {report['concurrency']}, "
+            f"{report['requests_per_s']:.0f} req/s, p50 {latency['p50_ms']:.2f} ms, "
+            f"p95 {latency['p95_ms']:.2f} ms, p99 {latency['p99_ms']:.2f} ms, statuses {report['statuses']}",
+            file=sys.stderr
+        )
+        print(json.dumps(report, indent=2, sort_keys=True))
+        return 0 if set(report['statuses']) <= {'200', '422'} else 1
+
+    @staticmethod
+    def _stress_writer(task):
+        """Процесс-писатель: записи с уникальными метками, гистограмма задержек"""
+        filename, writer, count, limit = task
+        AppConfig.LIMITS['max_history_items'] = limit
+        history = HistoryStore.open(filename)
+        histogram = LatencyHistogram()
+        for i in range(count):
+            entry = BenchmarkSuite._sample_entry(writer * count + i)
+            entry['timestamp'] = f'stress-{writer}-{i}'
+            start = time.perf_counter()
+            history.append(entry)
+            histogram.record(time.perf_counter() - start)
+        # Процессы пула завершаются без atexit
+        history.flush()
+        return histogram.counts, histogram.sum, histogram.max
+    
+    @staticmethod
+    def run_stress(args):
+        """Писатели в отдельных процессах и читатель в этом; код 1 при потерях или превышении задержки"""
+        with tempfile.TemporaryDirectory() as workdir:
+            filename = args.store or os.path.join(workdir, 'stress.db')
+            expected = args.writers * args.entries
+            limit = max(AppConfig.LIMITS['max_history_items'], expected)
+            AppConfig.LIMITS['max_history_items'] = limit
+            reader = HistoryStore.open(filename)
+            store_name = type(reader).__name__
             try:
-                import shutil
-                total, used, free = shutil.disk_usage(".")
-                if free < 100 * 1024 * 1024:  # 100 MB
-                    issues.append("Мало свободного места на диске")
-            except:
-                pass
-            
-            if issues:
-                error_logger.log_event(f"System health issues: {', '.join(issues)}", "WARNING")
-            else:
-                error_logger.log_event("System health: OK")
+                # Очистка записывается до запуска писателей, а не отложенно поверх их записей
+                reader.clear()
+                reader.flush()
+                shared = isinstance(reader, SharedHistoryStore)
                 
-        except Exception as e:
-            error_logger.log_error(e, "ConeCalculator._check_system_health")
+                start = time.perf_counter()
+                tasks = [(filename, writer, args.entries, limit) for writer in range(args.writers)]
+                refreshes = 0
+                with multiprocessing.Pool(args.writers) as pool:
+                    pending = pool.map_async(ConsoleInterface._stress_writer, tasks, chunksize=1)
+                    # Читатель дочитывает новые записи, пока идет запись (JSON - только перечитыванием файла)
+                    while shared and not pending.ready():
+                        reader.load()
+                        refreshes += 1
+                        pending.wait(0.05)
+                    histograms = pending.get()
+                elapsed = time.perf_counter() - start
+                
+                if not shared:
+                    reader.close()
+                    reader = HistoryStore.open(filename)
+                seen = Counter(entry['timestamp'] for entry in reader.load())
+            finally:
+                # Соединение SQLite (файлы -wal и -shm) закрывается до удаления временного каталога
+                reader.close()
+            latency = LatencyHistogram()
+            for counts, total, longest in histograms:
+                latency.counts = [a + b for a, b in zip(latency.counts, counts)]
+                latency.total += sum(counts)
+                latency.sum += total
+                latency.max = max(latency.max, longest)
+        
+        expected_keys = {f'stress-{writer}-{i}' for writer in range(args.writers) for i in range(args.entries)}
+        lost = len(expected_keys - set(seen))
+        duplicated = sum(1 for count in seen.values() if count > 1)
+        report = {
+            'store': store_name,
+            'writers': args.writers,
+            'entries': expected,
+            'lost': lost,
+            'duplicated': duplicated,
+            'reader_refreshes': refreshes,
+            'elapsed_s': elapsed,
+            'latency': latency.snapshot()
+        }
+        p99 = report['latency']['p99_ms']
+        print(
+            f"{report['store']}: {args.writers} writers x {args.entries} entries in {elapsed:.2f} s, "
+            f"lost {lost}, duplicated {duplicated}, reader refreshes {refreshes}, "
+            f"p50 {report['latency']['p50_ms']:.2f} ms, p99 {p99:.2f} ms, max {report['latency']['max_ms']:.2f} ms",
+            file=sys.stderr
+        )
+        print(json.dumps(report, indent=2, sort_keys=True))
+        return 0 if not lost and not duplicated and p99 <= args.max_latency_ms else 1
 
 # === ТОЧКА ВХОДА ===
 if __name__ == '__main__':
+    if HEADLESS:
+        sys.exit(ConsoleInterface.main(sys.argv[1:]))
+    
     try:
         # Инициализация и запуск
         error_logger.set_recovery_callback(lambda: None)  # Базовый recovery callback